@@ -0,0 +1,103 @@
+"""
+Compare eval() of the python API against the json decoders on recorded payloads.
+
+Record a payload pair from a live server (the python and json flavours of the
+same object), then time each parser on it:
+
+    python -m benchmarks.decoders --record http://localhost:8080/jenkins/ -d payloads
+    python -m benchmarks.decoders -d payloads
+
+Without a payload directory a synthetic top-level payload with many jobs is used.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import optparse
+import urllib2
+from StringIO import StringIO
+
+from jenkinsapi.utils.decoders import JsonDecoder, StreamingJsonDecoder
+
+PYTHON_SUFFIX = ".python"
+JSON_SUFFIX = ".json"
+
+def record(url, dirpath, name="payload"):
+    """
+    Save the python and json representations of url in dirpath.
+    """
+    if not os.path.isdir(dirpath):
+        os.makedirs(dirpath)
+    url = url.rstrip("/")
+    for api, suffix in [("api/python/", PYTHON_SUFFIX), ("api/json/", JSON_SUFFIX)]:
+        data = urllib2.urlopen("%s/%s?depth=1" % (url, api)).read()
+        with open(os.path.join(dirpath, name + suffix), "wb") as f:
+            f.write(data)
+
+def synthetic(njobs=5000):
+    """
+    Build a python/json payload pair shaped like a top-level Jenkins poll.
+    """
+    data = {"jobs": [{"name": "job-%i" % i,
+                      "url": "http://localhost:8080/job/job-%i/" % i,
+                      "color": "blue",
+                      "inQueue": False,
+                      "buildable": True,
+                      "healthReport": [{"score": 100, "description": "Build stability: No recent builds failed."}],
+                      "lastBuild": {"number": i, "url": "http://localhost:8080/job/job-%i/%i/" % (i, i)}}
+                     for i in range(njobs)],
+            "views": [{"name": "All", "url": "http://localhost:8080/"}],
+            "useSecurity": True}
+    return repr(data), json.dumps(data)
+
+def load_payloads(dirpath):
+    for python_path in sorted(glob.glob(os.path.join(dirpath, "*" + PYTHON_SUFFIX))):
+        name = os.path.basename(python_path)[:-len(PYTHON_SUFFIX)]
+        json_path = os.path.join(dirpath, name + JSON_SUFFIX)
+        if not os.path.exists(json_path):
+            continue
+        yield name, open(python_path, "rb").read(), open(json_path, "rb").read()
+
+def timeit(fn, payload, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        fn(payload)
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def run(name, python_payload, json_payload, repeat):
+    parsers = [("eval", lambda p: eval(python_payload), python_payload),
+               ("json", lambda p: JsonDecoder().decode(StringIO(p)), json_payload),
+               ("stream", lambda p: StreamingJsonDecoder().decode(StringIO(p)), json_payload)]
+    print "%s (python %i bytes, json %i bytes)" % (name, len(python_payload), len(json_payload))
+    for parser_name, fn, payload in parsers:
+        print "  %-8s %8.2fms" % (parser_name, timeit(fn, payload, repeat) * 1000)
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option("-d", "--dir", dest="dirpath", default=None,
+                      help="Directory of recorded payloads", type="str")
+    parser.add_option("--record", dest="record", default=None,
+                      help="Record payloads from this Jenkins URL into --dir", type="str")
+    parser.add_option("-n", "--repeat", dest="repeat", default=5,
+                      help="Number of runs per parser, the best is reported", type="int")
+    options, _ = parser.parse_args()
+    if options.record:
+        if not options.dirpath:
+            parser.error("--record needs --dir")
+        record(options.record, options.dirpath)
+    if options.dirpath:
+        payloads = list(load_payloads(options.dirpath))
+        if not payloads:
+            parser.error("No recorded payloads in %s" % options.dirpath)
+    else:
+        payloads = [("synthetic",) + synthetic()]
+    for name, python_payload, json_payload in payloads:
+        run(name, python_payload, json_payload, options.repeat)
+
+if __name__ == "__main__":
+    sys.exit(main())
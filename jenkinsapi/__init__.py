@@ -41,6 +41,7 @@ Current code lives on github: https://github.com/salimfadhley/jenkinsapi
 
 """
 __all__= [ "command_line", "utils",
-           "api", "artifact", "build", "config", "constants", "exceptions", "fingerprint",
-           "jenkins", "jenkinsbase", "job", "node", "result_set", "result", "view"]
+           "aio", "api", "artifact", "artifact_index", "build", "build_graph", "build_index", "config", "constants",
+           "exceptions", "fingerprint", "jenkins", "jenkinsbase", "job", "job_graph", "job_walker", "node", "queue",
+           "result_history", "result_set", "result", "revision_index", "view", "waiter"]
 __docformat__ = "epytext"
\ No newline at end of file
@@ -0,0 +1,246 @@
+"""
+Non-blocking flavour of the Jenkins object model.
+
+Each Async class wraps the regular object and reuses all of its parsing and
+URL building. Methods which talk to Jenkins return a Future and run the
+request on the event loop's worker pool; waiting (invoke, block_until_complete)
+sleeps on the loop instead, so watching hundreds of builds takes a handful of
+threads instead of one per build. Use them from coroutines:
+
+    @coroutine
+    def watch(ajenkins, jobname):
+        job = yield ajenkins.get_job(jobname)
+        yield job.invoke(block=True)
+        build = yield job.get_last_build()
+        raise Return(build.get_status())
+
+    loop = get_event_loop()
+    ajenkins = loop.run_until_complete(AsyncJenkins.create("http://localhost:8080"))
+    print loop.run_until_complete(watch(ajenkins, "my-job"))
+
+Attributes and methods not defined here are those of the wrapped object. They
+read the data fetched by the last poll and can block if a field still has to
+be fetched, so poll() first.
+"""
+from jenkinsapi import config
+from jenkinsapi.jenkins import Jenkins
+from jenkinsapi.job import Job
+from jenkinsapi.utils.eventloop import coroutine, Return, run_in_executor, sleep, get_event_loop
+from jenkinsapi.waiter import STATUS_FIELDS, get_check_interval, needs_backoff
+
+import time
+import logging
+
+log = logging.getLogger(__name__)
+
+class AsyncBase(object):
+    """
+    Wraps a JenkinsBase obj.
+    """
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __getattr__(self, name):
+        return getattr(self.obj, name)
+
+    def __repr__(self):
+        return "<%s.%s %s>" % (self.__class__.__module__, self.__class__.__name__, self.obj.baseurl)
+
+    @coroutine
+    def poll(self, tree=None):
+        """
+        Refresh the wrapped object, see JenkinsBase.poll
+        :return: Future of self
+        """
+        yield run_in_executor(self.obj.poll, tree=tree)
+        raise Return(self)
+
+class AsyncJenkins(AsyncBase):
+    """
+    Wraps a Jenkins obj. Its jobs are built lazily, see Jenkins(lazy=True).
+    """
+    @classmethod
+    @coroutine
+    def create(cls, baseurl, **kwargs):
+        """
+        Connect to a Jenkins instance, takes the same arguments as Jenkins
+        :return: Future of AsyncJenkins obj
+        """
+        kwargs.setdefault("lazy", True)
+        jenkins = yield run_in_executor(Jenkins, baseurl, **kwargs)
+        raise Return(cls(jenkins))
+
+    @coroutine
+    def get_job(self, jobname):
+        """
+        :return: Future of AsyncJob obj
+        """
+        job = yield run_in_executor(self.obj.get_job, jobname)
+        raise Return(AsyncJob(job))
+
+    @coroutine
+    def get_jobs(self):
+        """
+        :return: Future of a list of (name, AsyncJob obj)
+        """
+        jobs = yield run_in_executor(lambda: list(self.obj.get_jobs()))
+        raise Return([(name, AsyncJob(job)) for name, job in jobs])
+
+    def iter_jobs(self):
+        """
+        Poll every job concurrently.
+        :return: list of Futures of AsyncJob obj, in the order of the jobs
+        """
+        return [AsyncJob(Job(url, name, jenkins_obj=self.obj, data={"name": name, "url": url})).poll()
+                for url, name in self.obj.get_jobs_info()]
+
+    @coroutine
+    def get_view(self, str_view_name):
+        view = yield run_in_executor(self.obj.get_view, str_view_name)
+        raise Return(AsyncView(view))
+
+    @coroutine
+    def get_node(self, nodename):
+        node = yield run_in_executor(self.obj.get_node, nodename)
+        raise Return(AsyncNode(node))
+
+class AsyncJob(AsyncBase):
+    """
+    Wraps a Job obj.
+    """
+    @coroutine
+    def is_queued(self):
+        result = yield run_in_executor(self.obj.is_queued)
+        raise Return(result)
+
+    @coroutine
+    def is_running(self):
+        result = yield run_in_executor(self.obj.is_running)
+        raise Return(result)
+
+    @coroutine
+    def is_queued_or_running(self):
+        queued = yield self.is_queued()
+        if queued:
+            raise Return(True)
+        running = yield self.is_running()
+        raise Return(running)
+
+    @coroutine
+    def get_build(self, buildnumber):
+        """
+        :return: Future of AsyncBuild obj
+        """
+        build = yield run_in_executor(self.obj.get_build, buildnumber)
+        raise Return(AsyncBuild(build))
+
+    @coroutine
+    def get_last_build(self):
+        build = yield run_in_executor(self.obj.get_last_build)
+        raise Return(AsyncBuild(build))
+
+    def iter_builds(self, buildnumbers=None):
+        """
+        Poll builds concurrently, newest first by default.
+        :param buildnumbers: build numbers, [int], defaults to get_build_ids()
+        :return: list of Futures of AsyncBuild obj, in the order of buildnumbers
+        """
+        if buildnumbers is None:
+            buildnumbers = list(self.obj.get_build_ids())
+        return [self.get_build(buildnumber) for buildnumber in buildnumbers]
+
+    @coroutine
+    def invoke(self, securitytoken=None, block=False, invoke_pre_check_delay=3, invoke_block_delay=15, params={}):
+        """
+        Trigger a build, see Job.invoke. Waiting happens on the event loop.
+        :return: Future of the QueueItem obj, or of None if Jenkins is too old to name it
+        """
+        url = self.obj.get_build_triggerurl(securitytoken, params)
+        original_build_no = yield run_in_executor(self._last_buildnumber)
+        log.info("Attempting to start %s on %s" % (self.obj.name, repr(self.obj.get_jenkins_obj())))
+        queue_item = yield run_in_executor(self.obj._trigger, url)
+        if queue_item is not None:
+            if block:
+                checks = 0
+                while True:
+                    build = yield run_in_executor(queue_item.get_build)
+                    if build is not None:
+                        break
+                    yield sleep(get_check_interval(None, checks, config.WAIT_MIN_INTERVAL, invoke_block_delay))
+                    checks += 1
+                yield AsyncBuild(build).block_until_complete(delay=invoke_block_delay)
+                yield run_in_executor(self.obj.poll, tree=self.obj.RUNNING_TREE)
+            raise Return(queue_item)
+        if invoke_pre_check_delay > 0:
+            yield sleep(invoke_pre_check_delay)
+        if not block:
+            return
+        total_wait = 0
+        while (yield self.is_queued()):
+            log.info("Waited %is for %s to begin..." % (total_wait, self.obj.name))
+            yield sleep(invoke_block_delay)
+            total_wait += invoke_block_delay
+        if (yield self.is_running()):
+            running_build = yield self.get_last_build()
+            yield running_build.block_until_complete(delay=invoke_block_delay)
+        last_build_no = yield run_in_executor(self._last_buildnumber)
+        assert last_build_no > original_build_no, "Job does not appear to have run."
+
+    def _last_buildnumber(self):
+        self.obj.poll(tree="lastBuild[number,url]")
+        return self.obj.get_last_buildnumber()
+
+class AsyncBuild(AsyncBase):
+    """
+    Wraps a Build obj.
+    """
+    @coroutine
+    def is_running(self):
+        result = yield run_in_executor(self.obj.is_running)
+        raise Return(result)
+
+    @coroutine
+    def block_until_complete(self, delay=15):
+        """
+        Checks more often as the estimated end of the build approaches, see BuildWaiter
+        :param delay: longest time between two checks, seconds
+        :return: Future which is done once the build has finished
+        """
+        started = time.time()
+        overdue_checks = 0
+        while True:
+            yield run_in_executor(self.obj.poll, tree=STATUS_FIELDS)
+            data = self.obj._data
+            if not data["building"]:
+                break
+            if needs_backoff(data):
+                overdue_checks += 1
+            log.info("Waited %is for %s #%s to complete" % (time.time() - started, self.obj.job.name, self.obj.buildno))
+            yield sleep(get_check_interval(data, overdue_checks, config.WAIT_MIN_INTERVAL, delay))
+        raise Return(self)
+
+class AsyncView(AsyncBase):
+    """
+    Wraps a View obj.
+    """
+    @coroutine
+    def get_jobs(self):
+        """
+        :return: Future of a list of (name, AsyncJob obj)
+        """
+        jobs = yield run_in_executor(self.obj.items)
+        raise Return([(name, AsyncJob(job)) for name, job in jobs])
+
+class AsyncNode(AsyncBase):
+    """
+    Wraps a Node obj.
+    """
+    @coroutine
+    def is_online(self):
+        yield self.poll()
+        raise Return(self.obj.is_online())
+
+    @coroutine
+    def is_idle(self):
+        yield self.poll()
+        raise Return(self.obj.is_idle())
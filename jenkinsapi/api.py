@@ -1,11 +1,12 @@
-from jenkinsapi.artifact import Artifact
-from jenkinsapi import constants
+from jenkinsapi.artifact import Artifact, save_artifacts
+from jenkinsapi.artifact_index import ArtifactIndex
+from jenkinsapi import config, constants
 from jenkinsapi.jenkins import Jenkins
 from jenkinsapi.exceptions import ArtifactsMissing, TimeOut, BadURL
+from jenkinsapi.waiter import wait_for_jobs
 from urllib2 import urlparse
 
 import os
-import time
 import logging
 
 log = logging.getLogger(__name__)
@@ -48,25 +49,22 @@ def get_artifacts( jenkinsurl, jobid=None, build_no=None, proxyhost=None, proxyp
     log.info("Found %i artifacts in '%s'" % ( len(artifacts.keys() ), build_no ))
     return artifacts
 
-def search_artifacts(jenkinsurl, jobid, artifact_ids=None ):
+def search_artifacts(jenkinsurl, jobid, artifact_ids=None, index_path=None ):
     """
-    Search the entire history of a jenkins job for a list of artifact names. If same_build
-    is true then ensure that all artifacts come from the same build of the job
+    Search the entire history of a jenkins job for a build with all of the named artifacts,
+    and return those of the most recent one. The history is read through an ArtifactIndex,
+    which only has to fetch the builds added since its last refresh when index_path is given.
     """
     if len(artifact_ids) == 0 or artifact_ids is None:
         return []
     
     jenkinsci = Jenkins( jenkinsurl )
     job = jenkinsci[ jobid ]
-    build_ids = job.get_build_ids()
-    for build_id in build_ids:
-        build = job.get_build( build_id )
-        artifacts = build.get_artifact_dict()
-        if set( artifact_ids ).issubset( set( artifacts.keys() ) ):
-            return dict( ( a,artifacts[a] ) for a in artifact_ids )
-        missing_artifacts =  set( artifact_ids ) - set( artifacts.keys() )
-        log.debug("Artifacts %s missing from %s #%i" % ( ", ".join( missing_artifacts ), jobid, build_id ))
-    #noinspection PyUnboundLocalVariable
+    index = ArtifactIndex( job, index_path )
+    index.refresh()
+    for build_id in index.find_all( artifact_ids ):
+        return index.get_artifacts( build_id, artifact_ids )
+    missing_artifacts = [ a for a in artifact_ids if not index.find( a ) ] or artifact_ids
     raise ArtifactsMissing( missing_artifacts )
 
 def grab_artifact(jenkinsurl, jobid, artifactid, targetdir):
@@ -82,23 +80,17 @@ def grab_artifact(jenkinsurl, jobid, artifactid, targetdir):
 
 def block_until_complete(jenkinsurl, jobs, maxwait=12000, interval=30, raise_on_timeout=True):
     """
-    Wait until all of the jobs in the list are complete.
+    Wait until all of the jobs in the list are complete. All the jobs are checked
+    with one request, every interval seconds at most.
     """
     assert maxwait > 0
     assert maxwait > interval
     assert interval > 0
 
     obj_jenkins = Jenkins(jenkinsurl)
-    obj_jobs = [obj_jenkins[jid] for jid in jobs]
-    for time_left in xrange(maxwait, 0, -interval):
-        still_running = [j for j in obj_jobs if j.is_queued_or_running()]
-        if not still_running:
-            return
+    still_running = wait_for_jobs(obj_jenkins, jobs, maxwait, max_interval=interval)
+    if still_running and raise_on_timeout:
         str_still_running = ", ".join('"%s"' % str(a) for a in still_running)
-        log.warn( "Waiting for jobs %s to complete. Will wait another %is" % (str_still_running, time_left ))
-        time.sleep(interval)
-    if raise_on_timeout:
-        #noinspection PyUnboundLocalVariable
         raise TimeOut("Waited too long for these jobs to complete: %s" % str_still_running)
 
 def get_view_from_url(url):
@@ -112,12 +104,14 @@ def get_view_from_url(url):
     jenkinsci = Jenkins(jenkinsurl)
     return jenkinsci.get_view(view_name)
 
-def install_artifacts(artifacts, dirstruct, installdir, basestaticurl):
+def install_artifacts(artifacts, dirstruct, installdir, basestaticurl, parallel=config.DOWNLOAD_PARALLEL,
+                      progress=None, total_progress=None):
         """
-        Install the artifacts.
+        Install the artifacts, downloading up to parallel of them at once.
+        See save_artifacts for the progress callbacks.
         """
         assert basestaticurl.endswith("/"), "Basestaticurl should end with /"
-        installed = []
+        targets = []
         for reldir, artifactnames in dirstruct.items():
             destdir = os.path.join(installdir, reldir)
             if not os.path.exists(destdir):
@@ -134,15 +128,15 @@ def install_artifacts(artifacts, dirstruct, installdir, basestaticurl):
                     # It's probably a static file, we can get it from the static collection
                     staticurl = urlparse.urljoin(basestaticurl, artifactname)
                     theartifact = Artifact(artifactname, staticurl)
-                theartifact.save(destpath)
-                installed.append(destpath)
-        return installed
+                targets.append((theartifact, destpath))
+        return save_artifacts(targets, parallel, progress, total_progress)
     
-def search_artifact_by_regexp( jenkinsurl, jobid, artifactRegExp ): 
+def search_artifact_by_regexp( jenkinsurl, jobid, artifactRegExp, index_path=None ):
     '''
     @param jenkinsurl: The base URL of the jenkins server
     @param jobid: The name of the job we are to search through
     @param artifactRegExp: A compiled regular expression object (not a re-string)
+    @param index_path: file to keep the ArtifactIndex of the job in between runs
     '''
     """
     Search the entire history of a hudson job for a build which has an artifact whose
@@ -150,18 +144,9 @@ def search_artifact_by_regexp( jenkinsurl, jobid, artifactRegExp ):
     """
     J = Jenkins( jenkinsurl )
     j = J[ jobid ] 
-    
-    build_ids = j.getBuildIds()
-    
-    for build_id in build_ids:
-        build = j.getBuild( build_id )
-        
-        artifacts = build.getArtifactDict()
-        
-        for name, art in artifacts.iteritems():
-            md_match = artifactRegExp.search( name )
-            
-            if md_match:
-                return art
+    index = ArtifactIndex( j, index_path )
+    index.refresh()
+    for build_id, name, _ in index.search( artifactRegExp ):
+        return index.get_artifact( build_id, name )
         
     raise ArtifactsMissing( )
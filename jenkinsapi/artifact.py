@@ -8,13 +8,18 @@ This module provides a class called Artifact which allows you to download object
 and also access them as a stream.
 """
 from __future__ import with_statement
-import urllib
+import urllib2
+import httplib
 import os
 import logging
 import hashlib
+import threading
 
+from jenkinsapi import config
 from jenkinsapi.exceptions import ArtifactBroken
 from jenkinsapi.fingerprint import Fingerprint
+from jenkinsapi.utils.downloader import Downloader
+from jenkinsapi.utils.threadpool import bounded_imap
 
 log = logging.getLogger(__name__)
 
@@ -29,12 +34,15 @@ class Artifact(object):
         self.url = url
         self.build = build
 
-    def save(self, fspath):
+    def save(self, fspath, downloader=None, fingerprints=None):
         """
         Save the artifact to an explicit path. The containing directory must exist.
         Returns a reference to the file which has just been writen to.
 
         :param fspath: full pathname including the filename, str
+        :param downloader: Downloader obj to download with, for its progress callbacks
+        :param fingerprints: the fingerprints of the build, from Build.get_fingerprints,
+                             to verify against instead of fetching the fingerprint of the file
         :return: filepath
         """
         log.info("Saving artifact @ %s to %s" % (self.url, fspath))
@@ -43,7 +51,7 @@ class Artifact(object):
         if os.path.exists(fspath):
             if self.build:
                 try:
-                    if self._verify_download(fspath):
+                    if self._verify_download(fspath, fingerprints=fingerprints):
                         log.info("Local copy of %s is already up to date." % self.filename)
                         return fspath
                 except ArtifactBroken:
@@ -52,25 +60,53 @@ class Artifact(object):
                 log.info("This file did not originate from Jenkins, so cannot check.")
         else:
             log.info("Local file is missing, downloading new.")
-        filename = self._do_download(fspath)
-        try:
-            self._verify_download(filename)
-        except ArtifactBroken:
-            log.warning("fingerprint of the downloaded artifact could not be verified")
-        return filename
+        download = self._do_download(fspath, downloader, fingerprints)
+        if self.build and not download.verified:
+            try:
+                self._verify_download(download.fspath, download.md5, fingerprints)
+            except ArtifactBroken:
+                log.warning("fingerprint of the downloaded artifact could not be verified")
+        return download.fspath
+
+    def _do_download(self, fspath, downloader=None, fingerprints=None):
+        """
+        Download the the artifact to a path, resuming an interrupted download.
+        A download of unknown size is checked against the fingerprints before it is put in place.
+        :return: Download obj
+        """
+        if downloader is None:
+            downloader = Downloader()
+        verify = None
+        if self.build:
+            def verify(md5):
+                try:
+                    return self._verify_download(fspath, md5, fingerprints)
+                except ArtifactBroken:
+                    return False
+        return downloader.download(self.url, fspath, self.get_opener(), verify)
 
-    def _do_download(self, fspath):
+    def get_opener(self):
         """
-        Download the the artifact to a path.
+        The Jenkins opener, with its authentication and proxy, for the artifacts of a build
         """
-        filename, _ = urllib.urlretrieve(self.url, filename=fspath)
-        return filename
+        if self.build is None:
+            return urllib2.urlopen
+        return self.build.get_jenkins_obj().get_opener()
 
-    def _verify_download(self, fspath):
+    def _verify_download(self, fspath, local_md5=None, fingerprints=None):
         """
         Verify that a downloaded object has a valid fingerprint.
+        The file is only hashed if its md5 is not given.
         """
-        local_md5 = self._md5sum(fspath)
+        if local_md5 is None:
+            local_md5 = self._md5sum(fspath)
+        if fingerprints is not None:
+            data = fingerprints.get(local_md5)
+            if data is None:
+                log.info("Unknown to jenkins.")
+                return False
+            return Fingerprint.validate_data_for_build(data, os.path.basename(fspath), self.build.job.name,
+                                                       self.build.buildno)
         fp = Fingerprint(self.build.job.jenkins.baseurl, local_md5, self.build.job.jenkins)
         return fp.validate_for_build(os.path.basename(fspath), self.build.job.name, self.build.buildno)
 
@@ -106,3 +142,37 @@ class Artifact(object):
         return """<%s.%s %s>""" % (self.__class__.__module__,
                                     self.__class__.__name__,
                                     self.url)
+
+def save_artifacts(targets, parallel=config.DOWNLOAD_PARALLEL, progress=None, total_progress=None):
+    """
+    Save many artifacts at once, see Artifact.save. The fingerprints of each
+    build are fetched once, by the first of its artifacts to be saved, and checked
+    against the md5 computed while downloading. If they cannot be fetched, the
+    artifacts of that build are checked one by one.
+    :param targets: (Artifact obj, full pathname) pairs
+    :param parallel: max number of artifacts saved at once, int
+    :param progress: called with a Download obj after each chunk of each artifact
+    :param total_progress: called with the bytes done and the bytes due after each chunk
+    :return: list of filepaths, in the order of targets
+    """
+    downloader = Downloader(parallel=parallel, progress=progress, total_progress=total_progress)
+    fingerprints = {}
+    locks = dict((id(artifact.build), threading.Lock()) for artifact, _ in targets if artifact.build is not None)
+
+    def get_fingerprints(build):
+        with locks[id(build)]:
+            if id(build) not in fingerprints:
+                try:
+                    fingerprints[id(build)] = build.get_fingerprints()
+                except (IOError, httplib.HTTPException), e:
+                    log.warn("Could not fetch the fingerprints of %s, checking its artifacts one by one: %s"
+                             % (build.baseurl, e))
+                    fingerprints[id(build)] = None
+            return fingerprints[id(build)]
+
+    def save(target):
+        artifact, fspath = target
+        if artifact.build is None:
+            return artifact.save(fspath, downloader)
+        return artifact.save(fspath, downloader, get_fingerprints(artifact.build))
+    return list(bounded_imap(save, targets, parallel))
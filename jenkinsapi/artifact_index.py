@@ -0,0 +1,97 @@
+"""
+A local index of the artifacts of every build of a job.
+
+The index maps artifact file names and relative paths to the numbers of the
+builds which archived them, so searching the history of a job does not need a
+request per build. It is refreshed incrementally and can be saved to a file,
+see BuildIndex.
+"""
+from jenkinsapi import config
+from jenkinsapi.artifact import Artifact
+from jenkinsapi.build import Build
+from jenkinsapi.build_index import BuildIndex
+
+class ArtifactIndex(BuildIndex):
+    """
+    Index of the artifacts of a job, newest builds first in every result
+    """
+    TREE = "number,url,building,artifacts[fileName,relativePath]"
+
+    def __init__(self, job, path=None, page_size=config.HISTORY_PAGE_SIZE):
+        """
+        :param job: Job obj
+        :param path: file the index is loaded from and saved to, str, or None to keep it in memory
+        :param page_size: number of builds fetched per request, int
+        """
+        # builds holds buildnumber -> (build url, [(fileName, relativePath)]),
+        # and this artifact name -> set of buildnumbers
+        self._by_name = {}
+        BuildIndex.__init__(self, job, path, page_size)
+
+    def _reindex(self):
+        self._by_name = {}
+        BuildIndex._reindex(self)
+
+    def _get_entry(self, data):
+        return (data["url"], [(a["fileName"], a["relativePath"]) for a in data["artifacts"]])
+
+    def _add(self, number):
+        for filename, relative_path in self.builds[number][1]:
+            self._by_name.setdefault(filename, set()).add(number)
+            self._by_name.setdefault(relative_path, set()).add(number)
+
+    def find(self, name):
+        """
+        :param name: artifact file name or relative path, str
+        :return: numbers of the builds having that artifact, newest first, [int]
+        """
+        return sorted(self._by_name.get(name, ()), reverse=True)
+
+    def find_all(self, names):
+        """
+        :param names: artifact file names or relative paths, [str]
+        :return: numbers of the builds having all of those artifacts, newest first, [int]
+        """
+        numbers = None
+        for name in names:
+            found = self._by_name.get(name, set())
+            numbers = found if numbers is None else numbers & found
+        return sorted(numbers or (), reverse=True)
+
+    def search(self, regexp):
+        """
+        :param regexp: compiled regular expression matched against artifact file names
+        :return: (build number, fileName, relativePath) of every match, newest builds first
+        """
+        matches = []
+        for number in sorted(self.builds, reverse=True):
+            for filename, relative_path in self.builds[number][1]:
+                if regexp.search(filename):
+                    matches.append((number, filename, relative_path))
+        return matches
+
+    def get_artifact(self, number, name):
+        """
+        :param number: build number, int
+        :param name: artifact file name or relative path, str
+        :return: Artifact obj
+        """
+        return self.get_artifacts(number, [name])[name]
+
+    def get_artifacts(self, number, names):
+        """
+        :param number: build number, int
+        :param names: artifact file names or relative paths, [str]
+        :return: dict of name to Artifact obj, all sharing one Build obj
+        """
+        url, artifacts = self.builds[number]
+        build = Build(url, number, job=self.job, data=self.job.get_summary({"number": number, "url": url}))
+        found = {}
+        for name in names:
+            for filename, relative_path in artifacts:
+                if name in (filename, relative_path):
+                    found[name] = Artifact(filename, "%sartifact/%s" % (url, relative_path), build)
+                    break
+            else:
+                raise KeyError(name)
+        return found
@@ -1,12 +1,20 @@
 from jenkinsapi.artifact import Artifact
 from jenkinsapi import config
 from jenkinsapi.jenkinsbase import JenkinsBase
+from jenkinsapi.fingerprint import Fingerprint
 from jenkinsapi.exceptions import NoResults, FailedNoResults
 from jenkinsapi.constants import STATUS_FAIL, STATUS_ABORTED, RESULTSTATUS_FAILURE
 from jenkinsapi.result_set import ResultSet
+from jenkinsapi.utils.cache import FOREVER
+from jenkinsapi.utils.retry import retry_function
+from jenkinsapi.waiter import BuildWaiter
 
-from time import sleep
+from collections import namedtuple
+import functools
+import httplib
 import logging
+import socket
+import time
 
 log = logging.getLogger(__name__)
 
@@ -18,15 +26,34 @@ class Build(JenkinsBase):
     STR_TOTALCOUNT = "totalCount"
     STR_TPL_NOTESTS_ERR = "%s has status %s, and does not have any test results"
 
-    def __init__( self, url, buildno, job ):
+    # actions and changeSet can be huge, they are only fetched when read.
+    TREE = "number,url,fullDisplayName,building,result,duration,estimatedDuration,timestamp,artifacts[fileName,relativePath]"
+    STATUS_TREE = "building,result,duration"
+    DOWNSTREAM_TREE = "fingerprint[usage[name,ranges[ranges[start,end]]]]"
+    FINGERPRINT_TREE = "fingerprint[fileName,hash,original[name,number],usage[name,ranges[ranges[start,end]]]]"
+    # Freestyle builds have a changeSet, pipeline and multi-SCM builds a list of changeSets
+    REVISION_TREE = ("changeSet[kind,revisions[revision],items[date,node]],"
+                     "changeSets[kind,revisions[revision],items[date,node]],"
+                     "actions[buildsByBranchName[*[*[*]]]]")
+
+    def __init__( self, url, buildno, job, data=None, disk_cache=None ):
         assert type(buildno) == int
         self.buildno = buildno
         self.job = job
-        JenkinsBase.__init__( self, url )
+        self.disk_cache = disk_cache
+        JenkinsBase.__init__( self, url, data=data )
 
     def __str__(self):
         return self._data['fullDisplayName']
 
+    def get_cache_ttl(self, data):
+        """
+        A finished build never changes, so it is cached forever
+        """
+        if data.get("building") is False:
+            return FOREVER
+        return self.CACHE_TTL
+
     def id(self):
         return self._data["number"]
 
@@ -34,25 +61,59 @@ class Build(JenkinsBase):
         return self._data["result"]
 
     def get_revision(self):
-        vcs = self._data['changeSet']['kind'] or 'git'
-        return getattr(self, '_get_%s_rev' % vcs, lambda: None)()
+        return self.revision_from_data(self._data)
+
+    @classmethod
+    def revision_from_data(cls, data):
+        """
+        Get the revision a build was made from, out of its svn, git or hg data
+        :param data: build data including the fields of REVISION_TREE, dict
+        :return: revision or None
+        """
+        vcs = cls.vcs_from_data(data) or 'git'
+        return getattr(cls, '_get_%s_rev' % vcs, lambda data: None)(data)
 
-    def _get_svn_rev(self):
+    @classmethod
+    def vcs_from_data(cls, data):
+        """
+        :param data: build data including the fields of REVISION_TREE, dict
+        :return: kind of the first change set which has one, e.g. 'svn', or None
+        """
+        for change_set in cls._get_change_sets(data):
+            if change_set.get('kind'):
+                return change_set['kind']
+        return None
+
+    @staticmethod
+    def _get_change_sets(data):
+        change_sets = data.get('changeSets')
+        if change_sets is None:
+            change_sets = [data['changeSet']] if data.get('changeSet') else []
+        return [change_set for change_set in change_sets if change_set]
+
+    @classmethod
+    def _get_svn_rev(cls, data):
         maxRevision = 0
-        for repoPathSet in self._data["changeSet"]["revisions"]:
-            maxRevision = max(repoPathSet["revision"], maxRevision)
+        for change_set in cls._get_change_sets(data):
+            for repoPathSet in change_set.get("revisions") or []:
+                maxRevision = max(repoPathSet["revision"], maxRevision)
         return maxRevision
 
-    def _get_git_rev(self):
-        for item in self._data['actions']:
-            branch = item.get('buildsByBranchName')
+    @staticmethod
+    def _get_git_rev(data):
+        for item in data.get('actions') or []:
+            branch = (item or {}).get('buildsByBranchName')
             head = branch and branch.get('origin/HEAD')
             if head:
                 return head['revision']['SHA1']
 
-    def _get_hg_rev(self):
+    @classmethod
+    def _get_hg_rev(cls, data):
         revs = [(item['date'], item['node'])
-                for item in self._data['changeSet']['items']]
+                for change_set in cls._get_change_sets(data)
+                for item in change_set.get('items') or []]
+        if not revs:
+            return None
         revs = sorted(revs, key=lambda tup: float(tup[0].split('-')[0]))
         return revs[-1][1] # get last commit revision
 
@@ -69,6 +130,32 @@ class Build(JenkinsBase):
     def get_artifact_dict(self):
         return dict( (a.filename, a) for a in self.get_artifacts() )
 
+    def get_fingerprints(self):
+        """
+        Fetch the fingerprints of all the files recorded by this build, with one request
+        :return: dict of md5 to fingerprint data, see Fingerprint.validate_data_for_build
+        """
+        url = self.python_api_url(self.baseurl, tree=self.FINGERPRINT_TREE)
+        data = retry_function(self.RETRY_ATTEMPTS, self.get_data, url)
+        return dict( (fp["hash"], fp) for fp in data.get("fingerprint") or [] )
+
+    def verify_artifacts(self, md5s):
+        """
+        Check local copies of many artifacts against the fingerprints of this build
+        :param md5s: dict of artifact filename to the md5 of its local copy
+        :return: dict of artifact filename to bool
+        """
+        fingerprints = self.get_fingerprints()
+        verified = {}
+        for filename, md5 in md5s.items():
+            data = fingerprints.get(md5)
+            if data is None:
+                log.info("%s is unknown to jenkins." % filename)
+                verified[filename] = False
+            else:
+                verified[filename] = Fingerprint.validate_data_for_build(data, filename, self.job.name, self.buildno)
+        return verified
+
     def get_upstream_job_name(self):
         """
         Get the upstream job name if it exist, None otherwise
@@ -156,57 +243,58 @@ class Build(JenkinsBase):
         Get the downstream jobs for this build
         :return List of jobs or None
         """
-        downstream_jobs_names = self.job.get_downstream_job_names()
-        fingerprint_data = self.get_data("%s?depth=2&tree=fingerprint[usage[name]]" % self.python_api_url(self.baseurl))
-        downstream_jobs = []
-        try:
-            fingerprints = fingerprint_data['fingerprint'][0]
-            for f in fingerprints['usage']:
-                if f['name'] in downstream_jobs_names:
-                    downstream_jobs.append(self.get_jenkins_obj().get_job(f['name']))
-            return downstream_jobs
-        except (IndexError, KeyError):
+        refs = self._get_downstream_refs()
+        if refs is None:
             return None
+        return self.get_jenkins_obj().get_jobs_by_name([name for name, _ in refs])
 
     def get_downstream_job_names(self):
         """
         Get the downstream job names for this build
         :return List of string or None
         """
-        downstream_jobs_names = self.job.get_downstream_job_names()
-        fingerprint_data = self.get_data("%s?depth=2&tree=fingerprint[usage[name]]" % self.python_api_url(self.baseurl))
-        downstream_names = []
-        try:
-            fingerprints = fingerprint_data['fingerprint'][0]
-            for f in fingerprints['usage']:
-                if f['name'] in downstream_jobs_names:
-                    downstream_names.append(f['name'])
-            return downstream_names
-        except (IndexError, KeyError):
+        refs = self._get_downstream_refs()
+        if refs is None:
             return None
+        return [name for name, _ in refs]
 
     def get_downstream_builds(self):
         """
         Get the downstream builds for this build
         :return List of Build or None
         """
+        refs = self._get_downstream_refs()
+        if refs is None:
+            return None
+        build_refs = [functools.partial(self._get_job_build, name, number) for name, number in refs]
+        return list(self.get_jenkins_obj().fetch_many(build_refs))
+
+    def _get_downstream_refs(self):
+        """
+        The downstream jobs which used the first file fingerprinted by this build, with one request.
+        See jenkinsapi.build_graph for more than one hop.
+        :return: list of (job name, first build number using the file), or None without fingerprints
+        """
         downstream_jobs_names = self.job.get_downstream_job_names()
-        fingerprint_data = self.get_data("%s?depth=2&tree=fingerprint[usage[name,ranges[ranges[end,start]]]]" % self.python_api_url(self.baseurl))
-        downstream_builds = []
+        fingerprint_data = self.get_data(self.python_api_url(self.baseurl, tree=self.DOWNSTREAM_TREE))
+        refs = []
         try:
             fingerprints = fingerprint_data['fingerprint'][0]
             for f in fingerprints['usage']:
                 if f['name'] in downstream_jobs_names:
-                    downstream_builds.append(self.get_jenkins_obj().get_job(f['name']).get_build(f['ranges']['ranges'][0]['start']))
-            return downstream_builds
+                    refs.append((f['name'], f['ranges']['ranges'][0]['start']))
+            return refs
         except (IndexError, KeyError):
             return None
 
+    def _get_job_build(self, jobname, buildnumber):
+        return self.get_jenkins_obj().get_job(jobname).get_build(buildnumber)
+
     def is_running( self ):
         """
         Return a bool if running.
         """
-        self.poll()
+        self.poll(tree=self.STATUS_TREE)
         return self._data["building"]
 
     def is_good( self ):
@@ -216,18 +304,115 @@ class Build(JenkinsBase):
         """
         return ( not self.is_running() ) and self._data["result"] == 'SUCCESS'
 
-    def block_until_complete(self, delay=15):
+    def block_until_complete(self, delay=15, timeout=None):
+        """
+        Wait for the build to finish, checking more often as its estimated end approaches.
+        :param delay: longest time between two checks, seconds
+        :param timeout: seconds, raises TimeOut when exceeded
+        """
         assert isinstance( delay, int )
-        count = 0
-        while self.is_running():
-            total_wait = delay * count
-            log.info("Waited %is for %s #%s to complete" % ( total_wait, self.job.id(), self.id() ) )
-            sleep( delay )
-            count += 1
+        waiter = BuildWaiter(self.get_jenkins_obj(), max_interval=delay)
+        waiter.watch(self)
+        waiter.wait(timeout)
+
+    def stream_console(self, start=0, tail=False, lines=True, chunk_size=config.CONSOLE_CHUNK_SIZE,
+                       interval=config.CONSOLE_POLL_INTERVAL, max_line=config.CONSOLE_MAX_LINE):
+        """
+        Read the console log of this build as it is streamed in, through the progressiveText
+        of the build. With tail, a running build is read again from where the last read
+        stopped until Jenkins says the log is complete, so no byte is fetched twice. A read
+        which fails or is cut short is resumed from the last byte received.
+        :param start: byte offset in the log to start from, int
+        :param tail: keep reading until the build is over, bool, otherwise stop at the end of the log so far
+        :param lines: yield lines, with their line ends, rather than chunks of at most chunk_size bytes,
+                      so that no more than one chunk is held at a time, bool
+        :param chunk_size: bytes read at a time, int
+        :param interval: seconds between two reads of the log of a running build, when tailing
+        :param max_line: in lines mode, a longer line is yielded in pieces of at least that many
+                         bytes, only the last one ending with the line end, int
+        :return: generator of str
+        """
+        chunks = self._iter_console_chunks(start, tail, chunk_size, interval)
+        if not lines:
+            return chunks
+        return self._split_lines(chunks, max_line)
+
+    def _iter_console_chunks(self, start, tail, chunk_size, interval):
+        opener = self.get_jenkins_obj().get_opener()
+        offset = start
+        failures = 0
+        while True:
+            url = "%s/logText/progressiveText?start=%i" % (self.baseurl.rstrip("/"), offset)
+            stream = retry_function(self.RETRY_ATTEMPTS, opener, url)
+            failed = None
+            try:
+                more = stream.info().getheader("X-More-Data") == "true"
+                size = stream.info().getheader("X-Text-Size")
+                try:
+                    for chunk in iter(lambda: stream.read(chunk_size), ""):
+                        offset += len(chunk)
+                        failures = 0
+                        yield chunk
+                except (socket.error, httplib.HTTPException), e:
+                    failed = e
+            finally:
+                stream.close()
+            # httplib reads a body cut short as a shorter one
+            if failed is None and size is not None and offset < int(size):
+                failed = "%i bytes short" % (int(size) - offset)
+            if failed is not None:
+                failures += 1
+                if failures >= self.RETRY_ATTEMPTS:
+                    raise IOError("Reading the console of %s failed at byte %i: %s" % (self, offset, failed))
+                log.warn("Reading the console of %s failed at byte %i, resuming: %s" % (self, offset, failed))
+                continue
+            if size is not None:
+                # Where the next read starts, as told by Jenkins
+                offset = int(size)
+            if not (tail and more):
+                return
+            time.sleep(interval)
+
+    def _split_lines(self, chunks, max_line):
+        # The pieces of the line being read, joined once it ends or grows past max_line
+        pieces = []
+        length = 0
+        for chunk in chunks:
+            lines = chunk.split("\n")
+            rest = lines.pop()
+            if lines:
+                pieces.append(lines[0])
+                lines[0] = "".join(pieces)
+                pieces = []
+                length = 0
+                for line in lines:
+                    yield line + "\n"
+            if rest:
+                pieces.append(rest)
+                length += len(rest)
+                if length >= max_line:
+                    yield "".join(pieces)
+                    pieces = []
+                    length = 0
+        if pieces:
+            yield "".join(pieces)
+
+    def get_console(self):
+        """
+        Get the whole console log of this build, as it is so far.
+        Use stream_console for long logs.
+        :return: str
+        """
+        return "".join(self.stream_console(lines=False))
 
     def get_jenkins_obj(self):
         return self.job.get_jenkins_obj()
 
+    def get_disk_cache(self):
+        if self.disk_cache is not None:
+            return self.disk_cache
+        return self.job.get_disk_cache()
+
     def get_result_url(self):
         """
         Return the URL for the object which provides the job's result summary.
@@ -235,9 +420,11 @@ class Build(JenkinsBase):
         url_tpl = r"%stestReport/%s"
         return  url_tpl % ( self._data["url"] , config.JENKINS_API )
 
-    def get_resultset(self):
+    def get_resultset(self, stream=False, query=None):
         """
         Obtain detailed results for this build.
+        :param stream: parse the test report incrementally instead of holding all of it, see ResultSet
+        :param query: ResultQuery obj selecting the cases and fields to fetch, e.g. ResultQuery.failures()
         """
         result_url = self.get_result_url()
         if self.STR_TOTALCOUNT not in self.get_actions():
@@ -245,7 +432,7 @@ class Build(JenkinsBase):
         buildstatus = self.get_status()
         if not self.get_actions()[self.STR_TOTALCOUNT]:
             raise NoResults( self.STR_TPL_NOTESTS_ERR % ( str(self), buildstatus ) )
-        obj_results = ResultSet( result_url, build=self )
+        obj_results = ResultSet( result_url, build=self, stream=stream, query=query )
         return obj_results
 
     def has_resultset(self):
@@ -262,3 +449,16 @@ class Build(JenkinsBase):
 
     def get_timestamp(self):
         return self._data['timestamp']
+
+class BuildRecord(namedtuple("BuildRecord", "number url result timestamp duration building revision artifacts")):
+    """
+    A lightweight summary of a build, as fetched by Job.get_build_history.
+    artifacts is a list of dicts with fileName and relativePath.
+    """
+    __slots__ = ()
+    TREE = "number,url,result,timestamp,duration,building,artifacts[fileName,relativePath],%s" % Build.REVISION_TREE
+
+    @classmethod
+    def from_data(cls, data):
+        return cls(data["number"], data["url"], data["result"], data["timestamp"], data["duration"],
+                   data["building"], Build.revision_from_data(data), data["artifacts"])
@@ -0,0 +1,241 @@
+"""
+The upstream and downstream builds of a build, several hops away.
+
+Upstream builds are found in the causes of a build, and downstream builds in
+the usage of its fingerprints by the downstream projects of its job (see
+Jenkins.get_job_graph), as Build.get_upstream_build and
+Build.get_downstream_builds do. A BuildGraph gets both with tree-filtered
+requests, fetches all the builds of a hop at once, and never fetches a build
+twice, so a whole pipeline is traced with a few rounds of requests. The
+builds of a hop which belong to the same job are fetched together, as ranges
+of the job's allBuilds. The position of a build in allBuilds is taken to be
+its distance from the last build of the job, which holds until builds are
+deleted: the builds which are not found where expected are then fetched one
+by one. The builds are held as BuildRef tuples and the data of their request,
+and only become Build objs on demand.
+"""
+from collections import namedtuple
+import urllib2
+import logging
+
+from jenkinsapi import config
+from jenkinsapi.build import Build
+from jenkinsapi.exceptions import UnknownJob
+from jenkinsapi.job import Job
+
+log = logging.getLogger(__name__)
+
+BuildRef = namedtuple("BuildRef", "job number")
+
+class BuildGraph(object):
+    """
+    Builds linked by upstream causes and downstream fingerprint usage
+    """
+    TREE = ("number,url,result,building,timestamp,"
+            "actions[causes[upstreamProject,upstreamBuild,upstreamUrl]],"
+            "fingerprint[usage[name,ranges[ranges[start,end]]]]")
+    DATA_FIELDS = ("number", "url", "result", "building", "timestamp")
+    # Builds of a job this close in its history share a range, with those in between
+    SPAN_GAP = 10
+
+    def __init__(self, jenkins, parallel=config.FETCH_PARALLEL):
+        """
+        :param jenkins: Jenkins obj
+        :param parallel: number of builds fetched at once, int
+        """
+        self.jenkins = jenkins
+        self.parallel = parallel
+        # BuildRef -> data of the build, for the builds fetched so far
+        self.builds = {}
+        # BuildRef -> set of BuildRef, for the builds fetched so far and their neighbours
+        self.upstream = {}
+        self.downstream = {}
+        self._job_urls = {}
+        # job name -> number of its last build, for the jobs with several builds in a hop
+        self._last_numbers = {}
+        self._downstream_projects = None
+
+    def resolve(self, build, upstream_depth=config.BUILD_GRAPH_DEPTH, downstream_depth=config.BUILD_GRAPH_DEPTH):
+        """
+        Fetch the builds up to some hops upstream and downstream of a build.
+        Builds fetched by an earlier call are not fetched again.
+        :param build: Build obj
+        :param upstream_depth: number of upstream hops, int
+        :param downstream_depth: number of downstream hops, int
+        :return: BuildRef of build
+        """
+        start = BuildRef(build.job.name, build.buildno)
+        self._job_urls.setdefault(build.job.name, build.job.baseurl)
+        self._fetch([start])
+        upstream, downstream = set([start]), set([start])
+        for hop in range(max(upstream_depth, downstream_depth)):
+            upstream = self._neighbours(upstream, self.upstream) if hop < upstream_depth else set()
+            downstream = self._neighbours(downstream, self.downstream) if hop < downstream_depth else set()
+            if not upstream and not downstream:
+                break
+            self._fetch(upstream | downstream)
+        return start
+
+    def _neighbours(self, refs, edges):
+        found = set()
+        for ref in refs:
+            found.update(edges.get(ref, ()))
+        return found
+
+    def _fetch(self, refs):
+        wanted = {}
+        for ref in refs:
+            if ref not in self.builds:
+                wanted.setdefault(ref.job, set()).add(ref.number)
+        fetches = []
+        for jobname, numbers in wanted.items():
+            try:
+                job_url = self.get_job_url(jobname)
+            except UnknownJob:
+                log.warn("Cannot find job %s of builds %s" % (jobname, sorted(numbers)))
+                continue
+            if len(numbers) == 1:
+                fetches.append(self._get_build_fetch(BuildRef(jobname, min(numbers)), job_url))
+            else:
+                fetches.append(self._get_job_fetch(jobname, job_url, numbers))
+        missing = []
+        for jobname, numbers, datas in self.jenkins.fetch_many(fetches, self.parallel, ordered=False):
+            for data in datas:
+                if data["number"] in numbers:
+                    self._add(BuildRef(jobname, data["number"]), data)
+            if len(numbers) > 1:
+                missing.extend(BuildRef(jobname, number) for number in numbers if BuildRef(jobname, number) not in self)
+        if missing:
+            # Builds which were not at their expected position, as some were deleted or started since
+            fetches = [self._get_build_fetch(ref, self.get_job_url(ref.job)) for ref in missing]
+            for jobname, numbers, datas in self.jenkins.fetch_many(fetches, self.parallel, ordered=False):
+                for data in datas:
+                    self._add(BuildRef(jobname, data["number"]), data)
+
+    def _get_build_fetch(self, ref, job_url):
+        def fetch():
+            url = self.jenkins.python_api_url("%s%i/" % (job_url, ref.number), tree=self.TREE)
+            try:
+                datas = [self.jenkins.get_data(url)]
+            except urllib2.HTTPError, e:
+                if e.code != 404:
+                    raise
+                log.warn("Cannot find build %s #%i" % ref)
+                datas = []
+            return ref.job, set([ref.number]), datas
+        return fetch
+
+    def _get_job_fetch(self, jobname, job_url, numbers):
+        def fetch():
+            last = self._get_last_number(jobname, job_url)
+            datas = []
+            for start, end in self._get_spans(sorted(last - n for n in numbers if n <= last)):
+                url = self.jenkins.python_api_url(job_url, tree="allBuilds[%s]{%i,%i}" % (self.TREE, start, end))
+                datas.extend(self.jenkins.get_data(url).get("allBuilds") or [])
+            return jobname, numbers, datas
+        return fetch
+
+    def _get_last_number(self, jobname, job_url):
+        """
+        :return: number of the last build of the job, from which the positions of its builds are counted, int
+        """
+        last = self._last_numbers.get(jobname)
+        if last is None:
+            url = self.jenkins.python_api_url(job_url, tree="lastBuild[number]")
+            last = self._last_numbers[jobname] = (self.jenkins.get_data(url).get("lastBuild") or {}).get("number", 0)
+        return last
+
+    def _get_spans(self, positions):
+        """
+        :param positions: sorted positions of builds in allBuilds, [int]
+        :return: (start, end) ranges holding them, near ones sharing a range, [(int, int)]
+        """
+        spans = []
+        for position in positions:
+            if spans and position - spans[-1][1] < self.SPAN_GAP:
+                spans[-1][1] = position + 1
+            else:
+                spans.append([position, position + 1])
+        return [tuple(span) for span in spans]
+
+    def _add(self, ref, data):
+        self.builds[ref] = dict((field, data.get(field)) for field in self.DATA_FIELDS)
+        self.upstream.setdefault(ref, set())
+        self.downstream.setdefault(ref, set())
+        for action in data.get("actions") or []:
+            for cause in (action or {}).get("causes") or []:
+                if cause.get("upstreamProject") and cause.get("upstreamBuild") is not None:
+                    upstream = BuildRef(cause["upstreamProject"], int(cause["upstreamBuild"]))
+                    if cause.get("upstreamUrl"):
+                        self._job_urls.setdefault(upstream.job, "%s/%s" % (self.jenkins.baseurl.rstrip("/"),
+                                                                           cause["upstreamUrl"]))
+                    self._link(upstream, ref)
+        fingerprints = data.get("fingerprint") or []
+        if fingerprints:
+            names = self._get_downstream_projects().get(ref.job, ())
+            for fingerprint in fingerprints:
+                for usage in fingerprint.get("usage") or []:
+                    ranges = usage["ranges"]["ranges"]
+                    if usage["name"] in names and ranges:
+                        self._link(ref, BuildRef(usage["name"], ranges[0]["start"]))
+
+    def _link(self, upstream, downstream):
+        self.downstream.setdefault(upstream, set()).add(downstream)
+        self.upstream.setdefault(downstream, set()).add(upstream)
+
+    def _get_downstream_projects(self):
+        if self._downstream_projects is None:
+            self._downstream_projects = self.jenkins.get_job_graph().downstream
+        return self._downstream_projects
+
+    def get_job_url(self, jobname):
+        url = self._job_urls.get(jobname)
+        if url is None:
+            url = self._job_urls[jobname] = self.jenkins.get_job_url(jobname)
+        return url
+
+    def __contains__(self, ref):
+        return ref in self.builds
+
+    def __len__(self):
+        return len(self.builds)
+
+    def get_data(self, ref):
+        """
+        :return: number, url, result, building and timestamp of a fetched build, dict
+        """
+        return self.builds[ref]
+
+    def get_upstream(self, ref):
+        """
+        :return: the builds which triggered a build, [BuildRef]
+        """
+        return sorted(self.upstream.get(ref, ()))
+
+    def get_downstream(self, ref):
+        """
+        :return: the builds which used the files of a build, [BuildRef]
+        """
+        return sorted(self.downstream.get(ref, ()))
+
+    def get_roots(self):
+        """
+        :return: the fetched builds without upstream builds, [BuildRef]
+        """
+        return sorted(ref for ref in self.builds if not self.upstream.get(ref))
+
+    def get_leaves(self):
+        """
+        :return: the fetched builds without downstream builds, [BuildRef]
+        """
+        return sorted(ref for ref in self.builds if not self.downstream.get(ref))
+
+    def get_build(self, ref):
+        """
+        :return: Build obj, built without polling its job
+        """
+        job_url = self.get_job_url(ref.job)
+        job = Job(job_url, ref.job, self.jenkins, data={"name": ref.job, "url": job_url})
+        url = "%s%i/" % (job_url, ref.number)
+        return Build(url, ref.number, job=job, data=self.jenkins.get_summary(dict(self.builds.get(ref) or {},
+                                                                                  number=ref.number, url=url)))
@@ -0,0 +1,202 @@
+"""
+A local index built from the history of a job, kept up to date incrementally.
+
+The builds of the job are read from its allBuilds, a page of builds per
+request, and each refresh only fetches the builds newer than the last one
+indexed, plus those which were still running then. A refresh starts with one
+small request for the first and last build numbers of the job and the builds
+at the end of its history: when nothing was added nor is running, that is the
+only request. The numbers of all the builds are only listed, to drop those
+which were discarded, when the oldest build or the count of builds no longer
+match the index. The index can be saved to a file to be reused by later runs.
+Subclasses choose the fields fetched for each build, and what is indexed from
+them.
+"""
+from __future__ import with_statement
+import os
+import marshal
+import tempfile
+import logging
+
+from jenkinsapi import config
+from jenkinsapi.utils.retry import retry_function
+
+log = logging.getLogger(__name__)
+
+class BuildIndex(object):
+    """
+    Abstract index of the finished builds of a job
+    """
+    TREE = "number,url,building"
+    FORMAT_VERSION = 1
+
+    def __init__(self, job, path=None, page_size=config.HISTORY_PAGE_SIZE):
+        """
+        :param job: Job obj
+        :param path: file the index is loaded from and saved to, str, or None to keep it in memory
+        :param page_size: number of builds fetched per request, int
+        """
+        self.job = job
+        self.path = path
+        self.page_size = page_size
+        # Highest build number indexed, and builds which were running when last seen
+        self.high_water = 0
+        self.pending = set()
+        # buildnumber -> what the subclass keeps of the build
+        self.builds = {}
+        if path is not None:
+            self.load()
+
+    def load(self):
+        """
+        Read the index saved at path, if there is a valid one
+        """
+        try:
+            with open(self.path, "rb") as f:
+                saved = marshal.loads(f.read())
+        except IOError:
+            return
+        except (EOFError, ValueError, TypeError), e:
+            log.warn("Ignoring corrupt index %s: %s" % (self.path, e))
+            return
+        if saved.get("version") != self.FORMAT_VERSION or saved.get("url") != self.job.baseurl:
+            log.info("Index %s does not belong to %s, rebuilding it" % (self.path, self.job.baseurl))
+            return
+        self.high_water = saved["high_water"]
+        self.pending = set(saved["pending"])
+        self.builds = saved["builds"]
+        self._reindex()
+
+    def save(self):
+        """
+        Write the index to path, atomically
+        """
+        saved = dict(version=self.FORMAT_VERSION, url=self.job.baseurl, high_water=self.high_water,
+                     pending=list(self.pending), builds=self.builds)
+        dirpath = os.path.dirname(os.path.abspath(self.path))
+        fd, tmppath = tempfile.mkstemp(dir=dirpath, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(marshal.dumps(saved, 2))
+            if os.path.exists(self.path):
+                # Windows does not rename over an existing file
+                os.remove(self.path)
+            os.rename(tmppath, self.path)
+        except OSError:
+            os.remove(tmppath)
+            raise
+
+    def refresh(self):
+        """
+        Index the builds added since the last refresh, and those which were running then,
+        and drop the builds which were deleted or discarded since.
+        :return: number of builds indexed, int
+        """
+        known = set(self.builds) | self.pending
+        state = None
+        if known:
+            state = self._get_state(len(known))
+        count = 0
+        added = 0
+        if state is None or self.pending or state["last"] > self.high_water:
+            count, added = self._index_new()
+        dropped = 0
+        if known and not self._is_intact(known, state, added):
+            dropped = self._prune()
+        log.info("Indexed %i new builds of %s, dropped %i" % (count, self.job.name, dropped))
+        if self.path is not None:
+            self.save()
+        return count
+
+    def _index_new(self):
+        """
+        Index the builds newer than high_water, and those which were pending
+        :return: number of builds indexed, number of builds newer than high_water, (int, int)
+        """
+        low = min(self.pending | set([self.high_water + 1]))
+        high_water = self.high_water
+        pending = set()
+        count = 0
+        added = 0
+        builds = self.job._iter_build_data(self.TREE, page_size=self.page_size)
+        try:
+            for data in builds:
+                number = data["number"]
+                if number < low:
+                    break
+                if number > high_water:
+                    added += 1
+                self.high_water = max(self.high_water, number)
+                if data["building"]:
+                    pending.add(number)
+                elif number not in self.builds:
+                    self.builds[number] = self._get_entry(data)
+                    self._add(number)
+                    count += 1
+        finally:
+            # Stop paging once the indexed builds are reached
+            builds.close()
+        self.pending = pending
+        return count, added
+
+    def _get_state(self, known):
+        """
+        The first and last build numbers of the job, and the builds from the position
+        the oldest known build should be at, newest first, up to a page further
+        :param known: number of builds indexed or pending, int
+        :return: dict of first, last and tail
+        """
+        tree = "firstBuild[number],lastBuild[number],allBuilds[number]{%i,%i}" % (known - 1, known + self.page_size)
+        url = self.job.python_api_url(self.job.baseurl, tree=tree)
+        data = retry_function(self.job.RETRY_ATTEMPTS, self.job.get_data, url)
+        return {"first": (data.get("firstBuild") or {}).get("number", 0),
+                "last": (data.get("lastBuild") or {}).get("number", 0),
+                "tail": [build["number"] for build in data.get("allBuilds") or []]}
+
+    def _is_intact(self, known, state, added):
+        """
+        Whether the job still had every known build, going by its builds counted from
+        the newest: with none of them gone, the oldest comes right after the added ones.
+        :param known: numbers of the builds indexed or pending before the refresh, set
+        :param state: from _get_state, before the refresh
+        :param added: number of builds newer than those known, int
+        """
+        oldest = min(known)
+        return (state["first"] == oldest and len(state["tail"]) == added + 1 <= self.page_size and
+                state["tail"][-1] == oldest)
+
+    def _prune(self):
+        """
+        Drop the indexed builds which the job no longer has, going by the numbers of all its builds
+        :return: number of builds dropped, int
+        """
+        url = self.job.python_api_url(self.job.baseurl, tree="allBuilds[number]")
+        data = retry_function(self.job.RETRY_ATTEMPTS, self.job.get_data, url)
+        numbers = set(build["number"] for build in data.get("allBuilds", []))
+        self.pending &= numbers
+        dropped = [number for number in self.builds if number not in numbers]
+        if dropped:
+            for number in dropped:
+                del self.builds[number]
+            self._reindex()
+        return len(dropped)
+
+    def _reindex(self):
+        """
+        Rebuild the lookup tables from builds, once loaded or pruned
+        """
+        for number in self.builds:
+            self._add(number)
+
+    def _get_entry(self, data):
+        """
+        What to keep of a finished build, it must be marshallable
+        :param data: the fields of TREE of the build, dict
+        """
+        raise NotImplementedError
+
+    def _add(self, number):
+        """
+        Add a build kept in builds to the lookup tables
+        """
+        raise NotImplementedError
@@ -1,3 +1,23 @@
-JENKINS_API = r"api/python/"
+JENKINS_API = r"api/json/"
 LOAD_TIMEOUT = 30
-LOAD_ATTEMPTS = 5
\ No newline at end of file
+LOAD_ATTEMPTS = 5
+CONNECTION_POOL_SIZE = 10
+CONNECTION_IDLE_TIMEOUT = 60
+DEFAULT_DECODER = "json"
+MAX_CONCURRENT_REQUESTS = 8
+FETCH_PARALLEL = 4
+HISTORY_PAGE_SIZE = 100
+CACHE_MAX_ENTRIES = 1000
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+DISK_CACHE_MAX_BYTES = 512 * 1024 * 1024
+WAIT_MIN_INTERVAL = 1
+WAIT_MAX_INTERVAL = 60
+WAIT_BATCH_BUILDS = 10
+DOWNLOAD_PARALLEL = 4
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+RESULT_HISTORY_BUILDS = 100
+WALK_DEPTH = 4
+BUILD_GRAPH_DEPTH = 5
+CONSOLE_CHUNK_SIZE = 64 * 1024
+CONSOLE_POLL_INTERVAL = 2
+CONSOLE_MAX_LINE = 1024 * 1024
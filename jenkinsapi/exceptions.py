@@ -56,3 +56,13 @@ class NotSupportVCS(Exception):
     """
     It's a job that doesn't support vcs
     """
+
+class DependencyCycle(Exception):
+    """
+    Jobs trigger each other in a cycle, so they cannot be ordered
+    """
+
+class ResultsChanged(Exception):
+    """
+    A test report changed while it was being read in several requests
+    """
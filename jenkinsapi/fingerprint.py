@@ -1,5 +1,6 @@
 from jenkinsapi.jenkinsbase import JenkinsBase
 from jenkinsapi.exceptions import ArtifactBroken
+from jenkinsapi.utils.cache import FOREVER
 
 import urllib2
 import re
@@ -13,6 +14,8 @@ class Fingerprint(JenkinsBase):
     Represents a jenkins fingerprint on a single artifact file ??
     """
     RE_MD5 = re.compile("^([0-9a-z]{32})$")
+    # Where a file first came from never changes, unlike its usage.
+    INFO_TREE = "fileName,original[name,number]"
 
     def __init__(self, baseurl, id, jenkins_obj):
         logging.basicConfig()
@@ -42,14 +45,22 @@ class Fingerprint(JenkinsBase):
         if not self.valid():
             log.info("Unknown to jenkins.")
             return False
-        if not self._data["original"] is None:
-            if self._data["original"]["name"] == job:
-                if self._data["original"]["number"] == build:
+        return self.validate_data_for_build(self._data, filename, job, build)
+
+    @staticmethod
+    def validate_data_for_build(data, filename, job, build):
+        """
+        Check fingerprint data, as fetched for one fingerprint or for all those of a build
+        (see Build.get_fingerprints), against the build which should have produced the file.
+        """
+        if not data["original"] is None:
+            if data["original"]["name"] == job:
+                if data["original"]["number"] == build:
                     return True
-        if self._data["fileName"] != filename:
-            log.info("Filename from jenkins (%s) did not match provided (%s)" % ( self._data["fileName"], filename ) )
+        if data["fileName"] != filename:
+            log.info("Filename from jenkins (%s) did not match provided (%s)" % ( data["fileName"], filename ) )
             return False
-        for usage_item in self._data["usage"]:
+        for usage_item in data["usage"]:
             if usage_item["name"] == job:
                 for range in usage_item["ranges"]["ranges"]:
                     if range["start"] <= build <= range["end"]:
@@ -66,9 +77,17 @@ class Fingerprint(JenkinsBase):
             raise ArtifactBroken( "Unable to validate artifact id %s using %s" % ( self.id, self.baseurl ) )
         return True
 
+    def get_cache_ttl(self, data):
+        """
+        The origin of a fingerprint never changes, so it is cached forever
+        """
+        if data.get("original") and "usage" not in data:
+            return FOREVER
+        return self.CACHE_TTL
+
     def get_info( self ):
         """
         Returns a tuple of build-name, build# and artifiact filename for a good build.
         """
-        self.poll()
+        self.poll(tree=self.INFO_TREE)
         return self._data["original"]["name"], self._data["original"]["number"], self._data["fileName"]
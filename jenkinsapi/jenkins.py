@@ -3,9 +3,19 @@ from jenkinsapi.fingerprint import Fingerprint
 from jenkinsapi.job import Job
 from jenkinsapi.view import View
 from jenkinsapi.node import Node
+from jenkinsapi.job_walker import walk_jobs
+from jenkinsapi.build_graph import BuildGraph
+from jenkinsapi.job_graph import JobGraph
 from jenkinsapi.exceptions import UnknownJob, NotAuthorized
+from jenkinsapi import config
 from utils.urlopener import mkurlopener, mkopener, NoAuto302Handler
+from utils.connectionpool import ConnectionPool, get_keepalive_handlers
+from utils.decoders import get_decoder
+from utils.threadpool import bounded_imap
+from utils.retry import retry_function
+import functools
 import logging
+import threading
 import time
 import urllib2
 import urllib
@@ -22,7 +32,10 @@ class Jenkins(JenkinsBase):
     """
     Represents a jenkins environment.
     """
-    def __init__(self, baseurl, username=None, password=None, proxyhost=None, proxyport=None, proxyuser=None, proxypass=None, formauth=False):
+    def __init__(self, baseurl, username=None, password=None, proxyhost=None, proxyport=None, proxyuser=None, proxypass=None, formauth=False,
+                 pool_size=config.CONNECTION_POOL_SIZE, idle_timeout=config.CONNECTION_IDLE_TIMEOUT, connection_pool=None,
+                 decoder=config.DEFAULT_DECODER, lazy=False, max_concurrency=config.MAX_CONCURRENT_REQUESTS,
+                 response_cache=None, disk_cache=None):
         """
 
         :param baseurl: baseurl for jenkins instance including port, str
@@ -32,6 +45,14 @@ class Jenkins(JenkinsBase):
         :param proxyport: proxyport, int
         :param proxyuser: proxyusername for proxy auth, str
         :param proxypass: proxypassword for proxyauth, str
+        :param pool_size: max idle keep-alive connections kept per host, int
+        :param idle_timeout: seconds an idle connection may be reused for, int
+        :param connection_pool: ConnectionPool obj to share, one is created if None
+        :param decoder: "json", "stream" or a decoder obj, see jenkinsapi.utils.decoders
+        :param lazy: build jobs, views and builds from the summary data of their parent and poll them on first use, bool
+        :param max_concurrency: max number of API reads in flight at once across all threads, int
+        :param response_cache: ResponseCache obj to serve repeated API reads from, see jenkinsapi.utils.cache
+        :param disk_cache: DiskCache obj for finished builds, test results and fingerprints, see jenkinsapi.utils.diskcache
         :return: a Jenkins obj
         """
         self.username = username
@@ -40,8 +61,28 @@ class Jenkins(JenkinsBase):
         self.proxyport = proxyport
         self.proxyuser = proxyuser
         self.proxypass = proxypass
+        if connection_pool is None:
+            connection_pool = ConnectionPool(pool_size, idle_timeout)
+        self.connection_pool = connection_pool
+        self._opener = None
+        self.decoder = get_decoder(decoder)
+        self.lazy = lazy
+        self.max_concurrency = max_concurrency
+        self.request_slots = threading.BoundedSemaphore(max_concurrency)
+        self.response_cache = response_cache
+        self.disk_cache = disk_cache
+        # (name -> job info, url -> name), built from the job list on first lookup after a poll
+        self._job_index = None
+        # JobGraph, refreshed on first use after a poll
+        self._job_graph = None
+        self._job_graph_stale = False
         JenkinsBase.__init__(self, baseurl, formauth=formauth)
 
+    def poll(self, tree=None):
+        self._job_index = None
+        self._job_graph_stale = True
+        JenkinsBase.poll(self, tree=tree)
+
     def get_proxy_auth(self):
         return self.proxyhost, self.proxyport, self.proxyuser, self.proxypass
 
@@ -56,12 +97,22 @@ class Jenkins(JenkinsBase):
         return auth_args
 
     def get_opener(self):
-        if self.formauth:
-            return self.get_login_opener()
-        return mkurlopener(*self.get_auth())
+        """
+        Get the url opener shared by every object of this Jenkins instance.
+        It is built once and reuses connections through the connection pool.
+        """
+        if self._opener is None:
+            if self.formauth:
+                self._opener = self.get_login_opener()
+            else:
+                self._opener = mkurlopener(*self.get_auth(), connection_pool=self.connection_pool)
+        return self._opener
+
+    def get_decoder(self):
+        return self.decoder
 
     def get_login_opener(self):
-        hdrs = []
+        hdrs = get_keepalive_handlers(self.connection_pool)
         if getattr(self, '_cookies', False):
             mcj = cookielib.MozillaCookieJar()
             for c in self._cookies:
@@ -82,8 +133,22 @@ class Jenkins(JenkinsBase):
         urlopen = mkopener(NoAuto302Handler, cookiehandler)
         res = urlopen(loginurl, data=formdata)
         self._cookies = [c for c in mcj]
+        self._opener = None
         return res.getcode() == 302
 
+    def _clone(self):
+        """
+        Get a freshly polled Jenkins obj which shares this one's settings and connection pool.
+        """
+        newjk = Jenkins(self.baseurl, username=self.username,
+                        password=self.password, proxyhost=self.proxyhost,
+                        proxyport=self.proxyport, proxyuser=self.proxyuser,
+                        proxypass=self.proxypass, formauth=self.formauth,
+                        connection_pool=self.connection_pool, decoder=self.decoder,
+                        lazy=self.lazy, max_concurrency=self.max_concurrency,
+                        response_cache=self.response_cache, disk_cache=self.disk_cache)
+        return newjk
+
     def validate_fingerprint(self, id):
         obj_fingerprint = Fingerprint(self.baseurl, id, jenkins_obj=self)
         obj_fingerprint.validate()
@@ -110,12 +175,117 @@ class Jenkins(JenkinsBase):
     def get_jenkins_obj(self):
         return self
 
+    def fetch_many(self, items, parallel=config.FETCH_PARALLEL, ordered=True, tree=None):
+        """
+        Fetch a batch of objects concurrently, yielding each one once it is populated.
+        Requests are retried with retry_function and never exceed max_concurrency.
+
+        :param items: any mix of API urls (yields their data), JenkinsBase objs
+                      (polled, e.g. lazily built ones) and callables which return a
+                      JenkinsBase obj when called (the obj is yielded)
+        :param parallel: number of worker threads, int
+        :param ordered: yield in the order of items rather than of completion, bool
+        :param tree: fields to fetch for JenkinsBase objs in Jenkins tree= syntax, str
+        :return: generator of data dicts or JenkinsBase objs
+        """
+        def fetch(item):
+            if isinstance(item, JenkinsBase):
+                if tree is not None:
+                    item.poll(tree=tree)
+                else:
+                    item.prefetch()
+                return item
+            if isinstance(item, basestring):
+                return retry_function(self.RETRY_ATTEMPTS, self.get_data, item)
+            return retry_function(self.RETRY_ATTEMPTS, item)
+        return bounded_imap(fetch, items, parallel, ordered=ordered)
+
+    def _get_job_index(self):
+        """
+        The jobs by name and by url, built once from the job list of the last poll.
+        """
+        index = self._job_index
+        if index is None:
+            by_name, by_url = {}, {}
+            for info in self._data["jobs"]:
+                by_name[info["name"]] = info
+                by_url[self._normalize_job_url(info["url"])] = info["name"]
+            index = self._job_index = (by_name, by_url)
+        return index
+
+    def _normalize_job_url(self, url):
+        return url.rstrip("/") + "/"
+
+    def _make_job(self, info):
+        return Job(info["url"], info["name"], jenkins_obj=self, data=self.get_summary(info))
+
+    def get_job_graph(self, refresh=False):
+        """
+        The upstream and downstream links of all the jobs, see jenkinsapi.job_graph.
+        It is fetched once, and refreshed on first use after this obj is polled.
+        :param refresh: fetch the links again now, bool
+        :return: JobGraph obj
+        """
+        if self._job_graph is None:
+            self._job_graph = JobGraph(self)
+            self._job_graph.refresh()
+        elif refresh or self._job_graph_stale:
+            self._job_graph.refresh()
+        self._job_graph_stale = False
+        return self._job_graph
+
+    def get_build_graph(self, build, upstream_depth=config.BUILD_GRAPH_DEPTH,
+                        downstream_depth=config.BUILD_GRAPH_DEPTH, parallel=config.FETCH_PARALLEL):
+        """
+        Trace the upstream and downstream builds of a build, see jenkinsapi.build_graph
+        :param build: Build obj
+        :param upstream_depth: number of upstream hops, int
+        :param downstream_depth: number of downstream hops, int
+        :param parallel: number of builds fetched at once, int
+        :return: BuildGraph obj, its start is BuildRef(build.job.name, build.buildno)
+        """
+        graph = BuildGraph(self, parallel)
+        graph.resolve(build, upstream_depth, downstream_depth)
+        return graph
+
+    def get_builds_between(self, jobnames, start, end, parallel=config.FETCH_PARALLEL):
+        """
+        Fetch the builds of many jobs which started in a time range, see Job.get_builds_between
+        :param jobnames: names of the jobs, [str]
+        :param start: datetime or seconds since the epoch, included
+        :param end: datetime or seconds since the epoch, excluded
+        :param parallel: number of jobs searched at once, int
+        :return: dict of job name to list of BuildRecord, newest first
+        """
+        urls = self.get_job_urls(jobnames)
+        missing = [jobname for jobname in jobnames if jobname not in urls]
+        if missing:
+            raise UnknownJob(", ".join(missing))
+        searches = [functools.partial(self._get_builds_between, jobname, urls[jobname], start, end)
+                    for jobname in jobnames]
+        return dict(self.fetch_many(searches, parallel, ordered=False))
+
+    def _get_builds_between(self, jobname, url, start, end):
+        # Only the history of the job is read, so it is not polled
+        job = Job(url, jobname, jenkins_obj=self, data={"name": jobname, "url": url})
+        return jobname, job.get_builds_between(start, end)
+
     def get_jobs(self):
         """
         Fetch all the build-names on this Jenkins server.
         """
         for info in self._data["jobs"]:
-            yield info["name"], Job(info["url"], info["name"], jenkins_obj=self)
+            yield info["name"], self._make_job(info)
+
+    def walk_jobs(self, depth=config.WALK_DEPTH, parallel=config.FETCH_PARALLEL, fields=()):
+        """
+        Find every job, including those inside folders, see jenkinsapi.job_walker
+        :param depth: number of folder levels listed per request, int
+        :param parallel: number of folders fetched at once, int
+        :param fields: other fields of each job to fetch, [str]
+        :return: generator of (full name, Job obj)
+        """
+        return walk_jobs(self, depth, parallel, fields)
 
     def get_jobs_info(self):
         """
@@ -142,13 +312,87 @@ class Jenkins(JenkinsBase):
         """
         return self[jobname]
 
+    def get(self, jobname, default=None):
+        """
+        Get a job by name, like dict.get
+        :param jobname: name of the job, str
+        :return: Job obj, or default if there is no such job
+        """
+        info = self._get_job_index()[0].get(jobname)
+        if info is None:
+            return default
+        return self._make_job(info)
+
+    def get_jobs_by_name(self, jobnames):
+        """
+        Get many jobs by name at once
+        :param jobnames: names of the jobs, [str]
+        :return: list of Job obj, in the order of jobnames
+        """
+        by_name = self._get_job_index()[0]
+        missing = [jobname for jobname in jobnames if jobname not in by_name]
+        if missing:
+            raise UnknownJob(", ".join(missing))
+        return [self._make_job(by_name[jobname]) for jobname in jobnames]
+
+    def get_job_url(self, jobname):
+        """
+        :param jobname: name of the job, str
+        :return: url of the job, str
+        """
+        try:
+            return self._get_job_index()[0][jobname]["url"]
+        except KeyError:
+            raise UnknownJob(jobname)
+
+    def get_job_urls(self, jobnames):
+        """
+        :param jobnames: names of the jobs, [str]
+        :return: dict of name to url of the jobs which exist
+        """
+        by_name = self._get_job_index()[0]
+        return dict((jobname, by_name[jobname]["url"]) for jobname in jobnames if jobname in by_name)
+
+    def get_job_name(self, url):
+        """
+        :param url: url of a job, with or without the trailing slash, str
+        :return: name of the job, str
+        """
+        try:
+            return self._get_job_index()[1][self._normalize_job_url(url)]
+        except KeyError:
+            raise UnknownJob(url)
+
+    def get_job_names(self, urls):
+        """
+        :param urls: urls of jobs, [str]
+        :return: dict of url to name of the jobs which exist
+        """
+        by_url = self._get_job_index()[1]
+        names = {}
+        for url in urls:
+            name = by_url.get(self._normalize_job_url(url))
+            if name is not None:
+                names[url] = name
+        return names
+
+    def get_job_by_url(self, url):
+        """
+        :param url: url of a job, str
+        :return: Job obj
+        """
+        return self[self.get_job_name(url)]
+
     def has_job(self, jobname):
         """
         Does a job by the name specified exist
         :param jobname: string
         :return: boolean
         """
-        return jobname in self.get_jobs_list()
+        return jobname in self._get_job_index()[0]
+
+    def __contains__(self, jobname):
+        return self.has_job(jobname)
 
     def copy_job(self, jobname, newjobname):
         """
@@ -162,10 +406,8 @@ class Jenkins(JenkinsBase):
                                'from': jobname})
         copy_job_url = urlparse.urljoin(self.baseurl, "createItem?%s" % qs)
         self.post_data(copy_job_url, '')
-        newjk = Jenkins(self.baseurl, username=self.username,
-                        password=self.password, proxyhost=self.proxyhost,
-                        proxyport=self.proxyport, proxyuser=self.proxyuser,
-                        proxypass=self.proxypass, formauth=self.formauth)
+        newjk = self._clone()
+        self._update_jobs(newjk)
         return newjk.get_job(newjobname)
 
     def delete_job(self, jobname):
@@ -174,14 +416,20 @@ class Jenkins(JenkinsBase):
         :param jobname: name of a exist job, str
         :return: new jenkins_obj
         """
-        delete_job_url = urlparse.urljoin(Jenkins(self.baseurl).get_job(jobname).baseurl, "doDelete" )
+        delete_job_url = urlparse.urljoin(self.get_job_url(jobname), "doDelete" )
         self.post_data(delete_job_url, '')
-        newjk = Jenkins(self.baseurl, username=self.username,
-                        password=self.password, proxyhost=self.proxyhost,
-                        proxyport=self.proxyport, proxyuser=self.proxyuser,
-                        proxypass=self.proxypass, formauth=self.formauth)
+        newjk = self._clone()
+        self._update_jobs(newjk)
         return newjk
 
+    def _update_jobs(self, newjk):
+        """
+        Take the job list of a freshly polled Jenkins obj after adding or removing a job
+        """
+        self._data["jobs"] = newjk._data["jobs"]
+        self._job_index = None
+        self._job_graph_stale = True
+
     def iteritems(self):
         return self.get_jobs()
 
@@ -217,7 +465,8 @@ class Jenkins(JenkinsBase):
     def get_view(self, str_view_name):
         view_url = self.get_view_url(str_view_name)
         view_api_url = self.python_api_url(view_url)
-        return View(view_url , str_view_name, jenkins_obj=self)
+        return View(view_url , str_view_name, jenkins_obj=self,
+                    data=self.get_summary({"name": str_view_name, "url": view_url}))
 
     def get_view_by_url(self, str_view_url):
         #for nested view
@@ -227,10 +476,7 @@ class Jenkins(JenkinsBase):
     def delete_view_by_url(self, str_url):
         url = "%s/doDelete" %str_url
         self.post_data(url, '')
-        newjk = Jenkins(self.baseurl, username=self.username,
-                        password=self.password, proxyhost=self.proxyhost,
-                        proxyport=self.proxyport, proxyuser=self.proxyuser,
-                        proxypass=self.proxypass, formauth=self.formauth)
+        newjk = self._clone()
         return newjk
 
     def create_view(self, str_view_name, people=None):
@@ -271,10 +517,10 @@ class Jenkins(JenkinsBase):
         :param jobname: name of job, str
         :return: Job obj
         """
-        for url, name in self.get_jobs_info():
-            if name == jobname:
-                return Job(url, name, jenkins_obj=self)
-        raise UnknownJob(jobname)
+        info = self._get_job_index()[0].get(jobname)
+        if info is None:
+            raise UnknownJob(jobname)
+        return self._make_job(info)
 
     def get_node_dict(self):
         """Get registered slave nodes on this instance"""
@@ -1,16 +1,102 @@
 import urllib2
 import logging
 import pprint
+import threading
 from jenkinsapi import config
 from jenkinsapi.utils.retry import retry_function
+from jenkinsapi.utils.cache import CountingStream, FOREVER
 
 log = logging.getLogger(__name__)
 
+def _loading_all(method):
+    """
+    Wrap a dict method of JenkinsData so that it runs on the full data
+    """
+    def load_all(self, *args):
+        self._load_all()
+        return method(self, *args)
+    load_all.__name__ = method.__name__
+    return load_all
+
+class JenkinsData(dict):
+    """
+    The data of a jenkins object. When only part of it has been fetched,
+    reading a missing field calls the loaders in turn, each of which returns
+    more of the representation, until the field is found or none are left.
+    Listing the fields, iterating or taking the length calls all the loaders
+    first, so they never see part of the data only.
+    """
+    def __init__(self, data, loaders=()):
+        dict.__init__(self, data)
+        self._loaders = list(loaders)
+        # Threads reading missing fields at once must not run the same loader twice
+        self._lock = threading.RLock()
+
+    @property
+    def complete(self):
+        return not self._loaders
+
+    def _load_until(self, key):
+        if dict.__contains__(self, key) or not self._loaders:
+            return dict.__contains__(self, key)
+        self._lock.acquire()
+        try:
+            while not dict.__contains__(self, key) and self._loaders:
+                self.update(self._loaders[0]())
+                self._loaders.pop(0)
+        finally:
+            self._lock.release()
+        return dict.__contains__(self, key)
+
+    def _load_all(self):
+        if not self._loaders:
+            return
+        self._lock.acquire()
+        try:
+            while self._loaders:
+                self.update(self._loaders[0]())
+                self._loaders.pop(0)
+        finally:
+            self._lock.release()
+
+    def __missing__(self, key):
+        if not self._load_until(key):
+            raise KeyError(key)
+        return dict.__getitem__(self, key)
+
+    def __contains__(self, key):
+        return self._load_until(key)
+
+    has_key = __contains__
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    keys = _loading_all(dict.keys)
+    values = _loading_all(dict.values)
+    items = _loading_all(dict.items)
+    iterkeys = _loading_all(dict.iterkeys)
+    itervalues = _loading_all(dict.itervalues)
+    iteritems = _loading_all(dict.iteritems)
+    copy = _loading_all(dict.copy)
+    __iter__ = _loading_all(dict.__iter__)
+    __len__ = _loading_all(dict.__len__)
+    __eq__ = _loading_all(dict.__eq__)
+    __ne__ = _loading_all(dict.__ne__)
+
 class JenkinsBase(object):
     """
     This appears to be the base object that all other jenkins objects are inherited from
     """
     RETRY_ATTEMPTS = 5
+    # Fields fetched by a default poll, in Jenkins tree= syntax. None fetches everything.
+    TREE = None
+    # Seconds a response stays fresh in the Jenkins response cache, 0 revalidates every time.
+    CACHE_TTL = 0
+    # DiskCache obj for immutable responses, inherited from the parent object when None.
+    disk_cache = None
 
     def __repr__(self):
         return """<%s.%s %s>""" % (self.__class__.__module__,
@@ -23,13 +109,19 @@ class JenkinsBase(object):
     def __str__(self):
         raise NotImplemented
 
-    def __init__(self, baseurl, poll=True, formauth=False):
+    def __init__(self, baseurl, poll=True, formauth=False, data=None):
         """
         Initialize a jenkins connection
+        :param data: summary data held by the parent object, dict. When given the
+                     object is built lazily and only polled once a field outside
+                     the summary is read.
         """
         self.baseurl = baseurl
         self.formauth = formauth
-        if poll and not self.formauth:
+        self._polled = False
+        if data is not None:
+            self._data = JenkinsData(data, self._lazy_loaders())
+        elif poll and not self.formauth:
             try:
                 self.poll()
             except urllib2.HTTPError, hte:
@@ -37,41 +129,139 @@ class JenkinsBase(object):
                 log.warn( "Failed to connect to %s" % baseurl )
                 raise
 
-    def poll(self):
-        self._data = self._poll()
+    def poll(self, tree=None):
+        """
+        Refresh the data of this object.
+        Without a tree the fields named by the class TREE are fetched, and the
+        rest is fetched lazily when first read. With a tree only those fields
+        are fetched and merged into the data that is already held.
+        :param tree: fields to refresh in Jenkins tree= syntax, str
+        """
+        if tree is not None:
+            data = self._poll(tree=tree)
+            if getattr(self, '_data', None) is None:
+                self._data = JenkinsData(data, self._lazy_loaders())
+            else:
+                self._data.update(data)
+            return
+        self._data = JenkinsData(self._poll(tree=self.TREE), self._full_loaders())
+        self._polled = True
+
+    def prefetch(self):
+        """
+        Poll a lazily built object now rather than when its data is first read.
+        :return: self
+        """
+        if not self._polled:
+            self.poll()
+        return self
 
-    def _poll(self):
-        url = self.python_api_url(self.baseurl)
+    def _full_loaders(self):
+        if self.TREE is None:
+            return []
+        return [self._poll]
+
+    def _lazy_loaders(self):
+        def load_default():
+            self._polled = True
+            return self._poll(tree=self.TREE)
+        return [load_default] + self._full_loaders()
+
+    def _poll(self, tree=None):
+        url = self.python_api_url(self.baseurl, tree=tree)
         return retry_function(self.RETRY_ATTEMPTS , self.get_data, url)
 
+    def get_summary(self, data):
+        """
+        Summary data to build a child object from, or None unless the Jenkins obj is lazy.
+        """
+        if self.get_jenkins_obj().lazy:
+            return data
+        return None
+
     def get_jenkins_obj(self):
         """Not implemented, abstract method implemented by child classes"""
         raise NotImplemented("Abstract method, implemented by child classes")
 
     @classmethod
-    def python_api_url(cls, url):
-        if url.endswith(config.JENKINS_API):
-            return url
-        else:
+    def python_api_url(cls, url, tree=None, depth=None):
+        """
+        Get the remote API url for an object url
+        :param url: url of a jenkins object, str
+        :param tree: fields to fetch in Jenkins tree= syntax, str
+        :param depth: depth of the representation, int
+        :return: str
+        """
+        if not url.endswith(config.JENKINS_API):
             if url.endswith(r"/"):
                 fmt="%s%s"
             else:
                 fmt = "%s/%s"
-            return fmt % (url, config.JENKINS_API)
+            url = fmt % (url, config.JENKINS_API)
+        query = []
+        if depth is not None:
+            query.append("depth=%i" % depth)
+        if tree is not None:
+            query.append("tree=%s" % tree)
+        if query:
+            url = "%s?%s" % (url, "&".join(query))
+        return url
 
     def get_data(self, url):
         """
         Find out how to connect, and then grab the data.
+        Goes through the disk cache and the Jenkins response cache when there are any.
         """
-        fn_urlopen = self.get_jenkins_obj().get_opener()
+        jenkins = self.get_jenkins_obj()
+        disk_cache = self.get_disk_cache()
+        if disk_cache is not None:
+            user = (jenkins.username, jenkins.baseurl)
+            data = disk_cache.get(url, user)
+            if data is not None:
+                return data
+        cache = jenkins.response_cache
+        if cache is not None:
+            data = cache.get(self, url)
+        else:
+            data = self.read_data(url)[0]
+        if disk_cache is not None and self.get_cache_ttl(data) == FOREVER:
+            disk_cache.put(url, data, user)
+        return data
+
+    def get_disk_cache(self):
+        """
+        The DiskCache obj for this object, or None
+        """
+        if self.disk_cache is not None:
+            return self.disk_cache
+        return self.get_jenkins_obj().disk_cache
+
+    def read_data(self, url, headers={}):
+        """
+        Fetch and decode the data at url
+        :param headers: extra request headers, dict
+        :return: data, response headers, size of the response body in bytes
+        """
+        jenkins = self.get_jenkins_obj()
+        fn_urlopen = jenkins.get_opener()
+        jenkins.request_slots.acquire()
         try:
-            stream = fn_urlopen(url)
-            result = eval(stream.read())
+            stream = CountingStream(fn_urlopen(urllib2.Request(url, headers=headers)))
+            result = jenkins.get_decoder().decode(stream)
         except urllib2.HTTPError, e:
-            log.warn("Error reading %s" % url)
-            log.exception(e)
+            if e.code != 304:
+                log.warn("Error reading %s" % url)
+                log.exception(e)
             raise
-        return result
+        finally:
+            jenkins.request_slots.release()
+        return result, stream.info(), stream.count
+
+    def get_cache_ttl(self, data):
+        """
+        Seconds the data just fetched for this object stays fresh in the response cache
+        """
+        return self.CACHE_TTL
 
     def post_data(self, url, content):
         try:
@@ -5,8 +5,15 @@ import urllib
 from bs4 import BeautifulSoup
 from collections import defaultdict
 from time import sleep
-from jenkinsapi.build import Build
+import calendar
+import datetime
+import time
+from jenkinsapi.build import Build, BuildRecord
+from jenkinsapi.queue import QueueItem
+from jenkinsapi.revision_index import RevisionIndex
+from jenkinsapi.utils.retry import retry_function
 from jenkinsapi.jenkinsbase import JenkinsBase
+from jenkinsapi import config
 
 from exceptions import NoBuildData, NotFound
 
@@ -17,12 +24,22 @@ class Job(JenkinsBase):
     Represents a jenkins job
     A job can hold N builds which are the actual execution environments
     """
-    def __init__( self, url, name, jenkins_obj ):
+    BUILD_REF = "[number,url]"
+    TREE = ",".join(["name", "url", "description", "displayName", "buildable", "color", "inQueue",
+                     "nextBuildNumber", "builds%s" % BUILD_REF, "firstBuild%s" % BUILD_REF,
+                     "lastBuild%s" % BUILD_REF, "lastCompletedBuild%s" % BUILD_REF,
+                     "lastSuccessfulBuild%s" % BUILD_REF, "lastFailedBuild%s" % BUILD_REF,
+                     "upstreamProjects[name,url]", "downstreamProjects[name,url]"])
+    RUNNING_TREE = "builds%s,lastBuild%s" % (BUILD_REF, BUILD_REF)
+    INVOKE_TREE = "name,inQueue,builds%s,lastBuild[number,url,building]" % BUILD_REF
+
+    def __init__( self, url, name, jenkins_obj, data=None, disk_cache=None ):
         self.name = name
         self.jenkins = jenkins_obj
-        self._revmap = None
+        self.disk_cache = disk_cache
+        self._revision_index = None
         self._config = None
-        JenkinsBase.__init__( self, url )
+        JenkinsBase.__init__( self, url, data=data )
 
     def id( self ):
         return self._data["name"]
@@ -48,14 +65,21 @@ class Job(JenkinsBase):
         return buildurl
 
     def invoke(self, securitytoken=None, block=False, skip_if_running=False, invoke_pre_check_delay=3, invoke_block_delay=15, params={}):
+        """
+        Trigger a build of this job
+        :param block: wait for the build to complete, bool
+        :return: QueueItem obj tracking the requested build, or None if Jenkins is too old to name it
+        """
         assert isinstance( invoke_pre_check_delay, (int, float) )
         assert isinstance( invoke_block_delay, (int, float) )
         assert isinstance( block, bool )
         assert isinstance( skip_if_running, bool )
-        if self.is_queued():
+        self.poll(tree=self.INVOKE_TREE)
+        last_build = self._data["lastBuild"]
+        if self._data["inQueue"]:
             log.warn( "Will not request new build because %s is already queued" % self.id() )
             pass
-        elif self.is_running():
+        elif last_build is not None and last_build.get("building"):
             if skip_if_running:
                 log.warn( "Will not request new build because %s is already running" % self.id() )
                 pass
@@ -64,8 +88,15 @@ class Job(JenkinsBase):
         original_build_no = self.get_last_buildnumber()
         log.info( "Attempting to start %s on %s" % ( self.id(), repr(self.get_jenkins_obj()) ) )
         url = self.get_build_triggerurl( securitytoken, params)
-        html_result = self.hit_url(url)
-        assert len( html_result ) > 0
+        queue_item = self._trigger(url)
+        if queue_item is not None:
+            if block:
+                queue_item.block_until_complete(delay=invoke_block_delay)
+                # Callers read the finished build from the job, as they did when invoke polled it
+                self.poll(tree=self.RUNNING_TREE)
+            else:
+                log.info( "%s has been queued as %s." % ( self.id(), queue_item.baseurl ) )
+            return queue_item
         if invoke_pre_check_delay > 0:
             log.info("Waiting for %is to allow Jenkins to catch up" % invoke_pre_check_delay )
             sleep( invoke_pre_check_delay )
@@ -77,7 +108,7 @@ class Job(JenkinsBase):
                 total_wait += invoke_block_delay
             if self.is_running():
                 running_build = self.get_last_build()
-                running_build.block_until_complete( delay=invoke_pre_check_delay )
+                running_build.block_until_complete( delay=int(invoke_block_delay) )
             assert self.get_last_buildnumber() > original_build_no, "Job does not appear to have run."
         else:
             if self.is_queued():
@@ -89,6 +120,25 @@ class Job(JenkinsBase):
             else:
                 raise AssertionError("The job did not schedule.")
 
+    def _trigger(self, url):
+        """
+        Hit the build trigger url
+        :return: QueueItem obj from the Location header of the response, or None if there is none
+        """
+        fn_urlopen = self.get_jenkins_obj().get_opener()
+        try:
+            stream = fn_urlopen( url )
+            html_result = stream.read()
+        except urllib2.HTTPError, e:
+            log.debug( "Error reading %s" % url )
+            log.exception(e)
+            raise
+        location = stream.info().getheader("Location")
+        if location is None or "/queue/item/" not in location:
+            assert len( html_result ) > 0
+            return None
+        return QueueItem(urlparse.urljoin(self.baseurl, location), self)
+
     def _buildid_for_type(self, buildtype):
         """Gets a buildid for a given type of build"""
         KNOWNBUILDTYPES=["lastSuccessfulBuild", "lastBuild", "lastCompletedBuild"]
@@ -129,10 +179,93 @@ class Job(JenkinsBase):
         revs = defaultdict(list)
         if 'builds' not in self._data:
             raise NoBuildData( repr(self))
-        for buildnumber in self.get_build_ids():
-            revs[self.get_build(buildnumber).get_revision()].append(buildnumber)
+        for record in self.get_build_history():
+            revs[record.revision].append(record.number)
         return revs
 
+    def get_build_history(self, limit=None, page_size=config.HISTORY_PAGE_SIZE):
+        """
+        Fetch a summary of the builds of this job, newest first, a page of builds per request.
+        :param limit: max number of builds, int, all of them if None
+        :param page_size: number of builds fetched per request, int
+        :return: generator of BuildRecord
+        """
+        for data in self._iter_build_data(BuildRecord.TREE, limit=limit, page_size=page_size):
+            yield BuildRecord.from_data(data)
+
+    def get_builds_between(self, start, end, page_size=config.HISTORY_PAGE_SIZE):
+        """
+        Fetch a summary of the builds which started in a time range, newest first.
+        As builds start in the order of the job history, the range is found by a
+        binary search over it, reading a single timestamp per request, and only
+        the builds in the range are fetched in full.
+        :param start: datetime (naive ones are local time) or seconds since the epoch, included
+        :param end: datetime or seconds since the epoch, excluded, ValueError if before start
+        :param page_size: number of builds fetched per request, int
+        :return: list of BuildRecord
+        """
+        start, end = _to_millis(start), _to_millis(end)
+        if start > end:
+            raise ValueError("The time range should not end before it starts: %s > %s" % (start, end))
+        timestamps = {}
+        def get_timestamp(position):
+            if position not in timestamps:
+                url = self.python_api_url(self.baseurl, tree="allBuilds[timestamp]{%i,%i}" % (position, position + 1))
+                page = retry_function(self.RETRY_ATTEMPTS, self.get_data, url).get("allBuilds", [])
+                # Past the oldest build
+                timestamps[position] = page[0]["timestamp"] if page else None
+            return timestamps[position]
+        first = self._find_started_before(end, get_timestamp)
+        last = self._find_started_before(start, get_timestamp, first)
+        log.info("Found %i builds of %s between %s and %s with %i requests"
+                 % (last - first, self.name, start, end, len(timestamps)))
+        if last == first:
+            return []
+        return [BuildRecord.from_data(data) for data in
+                self._iter_build_data(BuildRecord.TREE, start=first, limit=last - first, page_size=page_size)]
+
+    def _find_started_before(self, millis, get_timestamp, low=0):
+        """
+        Position in the history, newest first, of the newest build started before millis
+        :param get_timestamp: function of a position to the start of that build, or None past the oldest one
+        :param low: a position known to be no further than the one looked for, int
+        """
+        def before(position):
+            timestamp = get_timestamp(position)
+            return timestamp is None or timestamp < millis
+        # Double the distance from low until a build started before millis, then bisect
+        step = 1
+        high = low
+        while not before(high):
+            low = high + 1
+            high += step
+            step *= 2
+        while low < high:
+            middle = (low + high) // 2
+            if before(middle):
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def _iter_build_data(self, fields, start=0, limit=None, page_size=config.HISTORY_PAGE_SIZE):
+        """
+        Page through the allBuilds of this job, newest first, yielding the given fields of each build.
+        """
+        assert page_size > 0
+        stop = None if limit is None else start + limit
+        while stop is None or start < stop:
+            end = start + page_size
+            if stop is not None:
+                end = min(end, stop)
+            url = self.python_api_url(self.baseurl, tree="allBuilds[%s]{%i,%i}" % (fields, start, end))
+            page = retry_function(self.RETRY_ATTEMPTS, self.get_data, url).get("allBuilds", [])
+            for data in page:
+                yield data
+            if len(page) < end - start:
+                return
+            start = end
+
     def get_build_ids(self):
         """
         Return a sorted list of all good builds as ints.
@@ -168,26 +301,56 @@ class Job(JenkinsBase):
         bn = self.get_last_completed_buildnumber()
         return self.get_build( bn )
 
+    def get_revision_index(self, path=None):
+        """
+        Get the index of the revisions of the builds of this job, see RevisionIndex.
+        It is kept, and used by get_buildnumber_for_revision.
+        :param path: file the index is loaded from and saved to, str, or None to keep it in memory
+        :return: RevisionIndex obj, not refreshed
+        """
+        if self._revision_index is None or self._revision_index.path != path:
+            self._revision_index = RevisionIndex(self, path)
+        return self._revision_index
+
     def get_buildnumber_for_revision(self, revision, refresh=False):
         """
 
         :param revision: subversion revision to look for, int
-        :param refresh: boolean, whether or not to refresh the revision -> buildnumber map
+        :param refresh: boolean, whether or not to index the builds made since the last refresh
         :return: list of buildnumbers, [int]
         """
-        if self.get_vcs() == 'svn' and not isinstance(revision, int):
-            revision = int(revision)
-        if self._revmap is None or refresh:
-            self._revmap = self.get_revision_dict()
-        try:
-            return self._revmap[revision]
-        except KeyError:
+        index = self._revision_index
+        if index is None:
+            index = self.get_revision_index()
+            index.refresh()
+        elif refresh:
+            index.refresh()
+        numbers = index.find(revision)
+        if not numbers:
             raise NotFound("Couldn't find a build with that revision")
+        return numbers
 
     def get_build( self, buildnumber ):
         assert type(buildnumber) == int
         url = self.get_build_dict()[ buildnumber ]
-        return Build( url, buildnumber, job=self )
+        return Build( url, buildnumber, job=self, data=self.get_summary({"number": buildnumber, "url": url}) )
+
+    def get_builds( self, buildnumbers=None, parallel=config.FETCH_PARALLEL, ordered=True, tree=None ):
+        """
+        Fetch a batch of builds concurrently
+        :param buildnumbers: build numbers to fetch, [int], defaults to get_build_ids()
+        :param parallel: number of builds fetched at once, int
+        :param ordered: yield in the order of buildnumbers rather than of completion, bool
+        :param tree: fields to fetch for each build in Jenkins tree= syntax, str
+        :return: generator of Build obj
+        """
+        if buildnumbers is None:
+            buildnumbers = self.get_build_ids()
+        build_dict = self.get_build_dict()
+        builds = [ Build( build_dict[ buildnumber ], buildnumber, job=self,
+                          data={"number": buildnumber, "url": build_dict[ buildnumber ]} )
+                   for buildnumber in buildnumbers ]
+        return self.get_jenkins_obj().fetch_many( builds, parallel=parallel, ordered=ordered, tree=tree )
 
     def __getitem__( self, buildnumber ):
         return self.get_build(buildnumber)
@@ -196,11 +359,11 @@ class Job(JenkinsBase):
         return self.is_queued() or self.is_running()
 
     def is_queued(self):
-        self.poll()
+        self.poll(tree="inQueue")
         return self._data["inQueue"]
 
     def is_running(self):
-        self.poll()
+        self.poll(tree=self.RUNNING_TREE)
         try:
             build = self.get_last_build_or_none()
             if build is not None:
@@ -283,3 +446,16 @@ class Job(JenkinsBase):
         except KeyError:
             return []
         return upstream_jobs
+
+def _to_millis(when):
+    """
+    :param when: datetime, naive ones in local time, or seconds since the epoch
+    :return: milliseconds since the epoch, as in Jenkins timestamps, int
+    """
+    if isinstance(when, datetime.datetime):
+        if when.tzinfo is None:
+            seconds = time.mktime(when.timetuple())
+        else:
+            seconds = calendar.timegm(when.utctimetuple())
+        return int(seconds * 1000) + when.microsecond // 1000
+    return int(when * 1000)
@@ -0,0 +1,159 @@
+"""
+The upstream and downstream links between all the jobs of a Jenkins instance.
+
+Job.get_upstream_jobs and Job.get_downstream_jobs poll every neighbour of a
+job, so mapping a pipeline means polling every job in it. A JobGraph gets the
+links of all the jobs with one tree-filtered request, and answers ordering,
+closure and impact queries from memory. A refresh fetches the links again
+and only forgets the closures which involve the jobs whose links changed.
+"""
+import heapq
+import logging
+
+from jenkinsapi.exceptions import UnknownJob, DependencyCycle
+from jenkinsapi.utils.retry import retry_function
+
+log = logging.getLogger(__name__)
+
+class JobGraph(object):
+    """
+    Jobs linked to the jobs they trigger
+    """
+    TREE = "jobs[name,upstreamProjects[name],downstreamProjects[name]]"
+
+    def __init__(self, jenkins):
+        """
+        :param jenkins: Jenkins obj
+        """
+        self.jenkins = jenkins
+        # job name -> frozenset of job names
+        self.upstream = {}
+        self.downstream = {}
+        # (job name, upstream) -> frozenset of job names
+        self._closures = {}
+        self._order = None
+
+    def refresh(self):
+        """
+        Fetch the links of all the jobs again
+        :return: names of the jobs whose links changed, or which were added or removed, set
+        """
+        url = self.jenkins.python_api_url(self.jenkins.baseurl, tree=self.TREE)
+        data = retry_function(self.jenkins.RETRY_ATTEMPTS, self.jenkins.get_data, url)
+        upstream, downstream = {}, {}
+        for job in data.get("jobs", []):
+            upstream.setdefault(job["name"], set())
+            downstream.setdefault(job["name"], set())
+            # Jenkins reports each link on both of its ends, a job of a folder only on one
+            for project in job.get("upstreamProjects") or []:
+                upstream[job["name"]].add(project["name"])
+                downstream.setdefault(project["name"], set()).add(job["name"])
+                upstream.setdefault(project["name"], set())
+            for project in job.get("downstreamProjects") or []:
+                downstream[job["name"]].add(project["name"])
+                upstream.setdefault(project["name"], set()).add(job["name"])
+                downstream.setdefault(project["name"], set())
+        upstream = dict((name, frozenset(names)) for name, names in upstream.items())
+        downstream = dict((name, frozenset(names)) for name, names in downstream.items())
+        changed = set(name for name in set(upstream) | set(self.upstream)
+                      if upstream.get(name) != self.upstream.get(name)
+                      or downstream.get(name) != self.downstream.get(name))
+        if changed:
+            self.upstream, self.downstream = upstream, downstream
+            self._forget(changed)
+        log.info("Links of %i jobs changed on %s" % (len(changed), self.jenkins.baseurl))
+        return changed
+
+    def _forget(self, changed):
+        for key, closure in self._closures.items():
+            if key[0] in changed or closure & changed:
+                del self._closures[key]
+        self._order = None
+
+    def __contains__(self, jobname):
+        return jobname in self.upstream
+
+    def __len__(self):
+        return len(self.upstream)
+
+    def get_jobs(self):
+        return sorted(self.upstream)
+
+    def _get_links(self, links, jobname):
+        try:
+            return links[jobname]
+        except KeyError:
+            raise UnknownJob(jobname)
+
+    def get_upstream(self, jobname):
+        """
+        :return: names of the jobs which trigger a job, [str]
+        """
+        return sorted(self._get_links(self.upstream, jobname))
+
+    def get_downstream(self, jobname):
+        """
+        :return: names of the jobs which a job triggers, [str]
+        """
+        return sorted(self._get_links(self.downstream, jobname))
+
+    def get_closure(self, jobname, upstream=False):
+        """
+        :param jobname: str
+        :param upstream: follow the links to upstream jobs rather than downstream ones, bool
+        :return: names of all the jobs reached from a job, itself aside unless in a cycle, frozenset
+        """
+        key = (jobname, upstream)
+        closure = self._closures.get(key)
+        if closure is None:
+            links = self.upstream if upstream else self.downstream
+            reached = set()
+            todo = list(self._get_links(links, jobname))
+            while todo:
+                name = todo.pop()
+                if name not in reached:
+                    reached.add(name)
+                    todo.extend(links.get(name, ()))
+            closure = self._closures[key] = frozenset(reached)
+        return closure
+
+    def get_impact(self, jobnames):
+        """
+        What runs if those jobs change
+        :param jobnames: [str]
+        :return: names of the jobs downstream of any of them, in the order they run, [str]
+        """
+        impacted = set()
+        for jobname in jobnames:
+            impacted |= self.get_closure(jobname)
+        return self.topological_order(impacted)
+
+    def topological_order(self, jobnames=None):
+        """
+        :param jobnames: the jobs to order, [str], all of them by default
+        :return: names of the jobs, each after all of its upstream jobs, [str]
+        """
+        if self._order is None:
+            self._order = self._sort()
+        if jobnames is None:
+            return list(self._order)
+        jobnames = set(jobnames)
+        return [name for name in self._order if name in jobnames]
+
+    def _sort(self):
+        # Kahn's algorithm, taking ready jobs by name so the order is stable
+        waiting = dict((name, len(names)) for name, names in self.upstream.items())
+        ready = [name for name, count in waiting.items() if not count]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            name = heapq.heappop(ready)
+            order.append(name)
+            for downstream in self.downstream[name]:
+                waiting[downstream] -= 1
+                if not waiting[downstream]:
+                    heapq.heappush(ready, downstream)
+        if len(order) < len(waiting):
+            cycle = sorted(name for name, count in waiting.items() if count)
+            raise DependencyCycle("Jobs trigger each other in a cycle: %s" % ", ".join(cycle))
+        return order
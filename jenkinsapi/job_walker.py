@@ -0,0 +1,82 @@
+"""
+Walking every job of a Jenkins instance, including those inside folders.
+
+Jenkins.get_jobs only sees the top-level items. A walk fetches the nested
+items of the root several folder levels at a time with one request, using a
+tree= query of nested jobs[name,url,jobs[...]]. The folders found at the
+deepest level of that request are then walked the same way, several at once.
+Jobs are yielded as soon as the response listing them arrives, so the caller
+can start on them before the walk is over.
+"""
+import logging
+
+from jenkinsapi import config
+from jenkinsapi.job import Job
+from jenkinsapi.utils.retry import retry_function
+
+log = logging.getLogger(__name__)
+
+ITEM_FIELDS = "name,url"
+# Only folders have jobs: the first of them is enough to tell a folder, and whether it is empty
+FOLDER_MARK = "jobs[url]{0,1}"
+
+def get_tree(depth, fields=()):
+    """
+    :param depth: number of folder levels to list, int
+    :param fields: other fields of each item to fetch, [str]
+    :return: tree= query listing the items of a folder, str
+    """
+    assert depth > 0, "Depth should be a non-zero positive integer"
+    item = ",".join([ITEM_FIELDS] + list(fields))
+    level = "%s,%s" % (item, FOLDER_MARK)
+    for _ in range(depth - 1):
+        level = "%s,jobs[%s]" % (item, level)
+    return "jobs[%s]" % level
+
+def walk_jobs(jenkins, depth=config.WALK_DEPTH, parallel=config.FETCH_PARALLEL, fields=()):
+    """
+    Find every job of a Jenkins instance, whatever folder it is in
+    :param jenkins: Jenkins obj
+    :param depth: number of folder levels listed per request, int
+    :param parallel: number of folders fetched at once, int
+    :param fields: other fields of each job to fetch, [str]
+    :return: generator of (full name, Job obj), the full name being the path of
+             folder names, as in Jenkins' fullName, e.g. "folder/job". Each Job obj
+             holds the fields fetched, and polls its job when another one is read.
+    """
+    tree = get_tree(depth, fields)
+    root = retry_function(jenkins.RETRY_ATTEMPTS, jenkins.get_data, jenkins.python_api_url(jenkins.baseurl, tree=tree))
+    folders = []
+    for job in _walk_items(jenkins, root.get("jobs", []), "", 1, depth, folders):
+        yield job
+    requests = 1
+    while folders:
+        fetches = [_get_fetch(jenkins, prefix, url, tree) for prefix, url in folders]
+        folders = []
+        for prefix, data in jenkins.fetch_many(fetches, parallel, ordered=False):
+            for job in _walk_items(jenkins, data.get("jobs", []), prefix, 1, depth, folders):
+                yield job
+        requests += len(fetches)
+    log.info("Walked the jobs of %s with %i requests" % (jenkins.baseurl, requests))
+
+def _get_fetch(jenkins, prefix, url, tree):
+    # fetch_many retries it
+    def fetch():
+        return prefix, jenkins.get_data(jenkins.python_api_url(url, tree=tree))
+    return fetch
+
+def _walk_items(jenkins, items, prefix, level, depth, folders):
+    for info in items:
+        fullname = prefix + info["name"]
+        jobs = info.get("jobs")
+        if jobs is None:
+            # Built lazily whatever Jenkins(lazy=...) says, polling each job would undo the walk
+            yield fullname, Job(info["url"], fullname, jenkins_obj=jenkins, data=info)
+        elif not jobs:
+            continue
+        elif level < depth:
+            for job in _walk_items(jenkins, jobs, fullname + "/", level + 1, depth, folders):
+                yield job
+        else:
+            # Its content was not listed, it is walked with the next requests
+            folders.append((fullname + "/", info["url"]))
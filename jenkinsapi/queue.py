@@ -0,0 +1,97 @@
+from jenkinsapi import config
+from jenkinsapi.jenkinsbase import JenkinsBase
+from jenkinsapi.build import Build
+from jenkinsapi.exceptions import WillNotBuild, TimeOut
+from jenkinsapi.waiter import get_check_interval
+
+import time
+import logging
+
+log = logging.getLogger(__name__)
+
+class QueueItem(JenkinsBase):
+    """
+    A build request waiting in the Jenkins queue, as returned by Job.invoke.
+    Polling it is much cheaper than polling the job, and once the build
+    has started it names that exact build, however many others were
+    triggered meanwhile.
+    """
+    TREE = "id,why,blocked,buildable,stuck,cancelled,inQueueSince,executable[number,url]"
+
+    def __init__(self, url, job):
+        """
+        :param url: url of the queue item, from the Location header of the build trigger, str
+        :param job: Job obj the build was requested for
+        """
+        self.job = job
+        JenkinsBase.__init__(self, url, poll=False)
+
+    def id(self):
+        return self.baseurl.rstrip("/").rsplit("/", 1)[-1]
+
+    def __str__(self):
+        return "%s queue item %s" % (self.job.name, self.id())
+
+    def get_jenkins_obj(self):
+        return self.job.get_jenkins_obj()
+
+    def is_cancelled(self):
+        self.poll(tree=self.TREE)
+        return bool(self._data.get("cancelled"))
+
+    def is_queued(self):
+        """
+        :return: True while the build has not started nor been cancelled
+        """
+        self.poll(tree=self.TREE)
+        return not self._data.get("cancelled") and not self._data.get("executable")
+
+    def get_why(self):
+        """
+        :return: why the build is still waiting, str
+        """
+        return self._data.get("why")
+
+    def get_build(self):
+        """
+        :return: Build obj, or None if the build has not started yet
+        """
+        if self.is_queued():
+            return None
+        if self._data.get("cancelled"):
+            raise WillNotBuild("%s was cancelled" % self)
+        executable = self._data["executable"]
+        return Build(executable["url"], executable["number"], job=self.job,
+                     data=self.get_summary({"number": executable["number"], "url": executable["url"]}))
+
+    def block_until_building(self, delay=15, timeout=None):
+        """
+        Wait for the build to leave the queue, checking ever less often up to every delay seconds.
+        :param delay: longest time between two checks, seconds
+        :param timeout: seconds, raises TimeOut when exceeded
+        :return: Build obj
+        """
+        started = time.time()
+        checks = 0
+        while True:
+            build = self.get_build()
+            if build is not None:
+                return build
+            waited = time.time() - started
+            if timeout is not None and waited > timeout:
+                raise TimeOut("Waited too long for %s to begin" % self)
+            log.info("Waited %is for %s to begin... %s" % (waited, self.job.name, self.get_why() or ""))
+            time.sleep(get_check_interval(None, checks, config.WAIT_MIN_INTERVAL, delay))
+            checks += 1
+
+    def block_until_complete(self, delay=15, timeout=None):
+        """
+        Wait for the build to start and then to finish.
+        :return: Build obj
+        """
+        started = time.time()
+        build = self.block_until_building(delay, timeout)
+        if timeout is not None:
+            timeout = max(timeout - (time.time() - started), 0.001)
+        build.block_until_complete(delay=int(delay), timeout=timeout)
+        return build
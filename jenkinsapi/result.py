@@ -1,9 +1,52 @@
 class Result(object):
+    """
+    A test case from a test report. Holds the known Jenkins fields in slots,
+    so a report with many cases does not carry a dict per case; fields which
+    are not known, and other attributes set on it, are kept aside.
+    """
+    FIELDS = ( "className", "name", "status", "duration", "age", "failedSince", "skipped",
+               "skippedMessage", "errorDetails", "errorStackTrace", "stdout", "stderr" )
+    __slots__ = FIELDS + ( "_extra", )
+
     def __init__(self, **kwargs ):
         """
+        :param kwargs: the fields of the case as Jenkins reports them
+        """
+        set_slot = object.__setattr__
+        for field in self.FIELDS:
+            set_slot( self, field, kwargs.pop( field, None ) )
+        set_slot( self, "_extra", kwargs or None )
+
+    def __getattr__(self, name):
+        # Only called for fields which are not slots
+        extra = object.__getattribute__( self, "_extra" )
+        if extra is not None and name in extra:
+            return extra[ name ]
+        raise AttributeError( name )
+
+    def __setattr__(self, name, value):
+        if name in self.__slots__:
+            object.__setattr__( self, name, value )
+            return
+        # Any other attribute can be set, as on a plain object, and is kept aside
+        if self._extra is None:
+            object.__setattr__( self, "_extra", {} )
+        self._extra[ name ] = value
 
+    def __getstate__(self):
+        return self.as_dict()
+
+    def __setstate__(self, state):
+        self.__init__( **state )
+
+    def as_dict(self):
+        """
+        :return: all the fields of the case which are set, dict
         """
-        self.__dict__.update( kwargs )
+        data = dict( ( field, getattr( self, field ) ) for field in self.FIELDS if getattr( self, field ) is not None )
+        if self._extra:
+            data.update( self._extra )
+        return data
 
     def __str__(self):
         return "%s %s %s" % ( self.className, self.name, self.status )
@@ -0,0 +1,271 @@
+"""
+The history of every test case of a job over many builds.
+
+Test results are collected into a sqlite database, build by build: each
+update only fetches the reports of the finished builds which are not in the
+database yet, streaming the light fields of their cases (see ResultQuery)
+straight into it, a few builds at a time. Kept in a file, the database is
+reused by later runs. Queries run against the database, one test case at a
+time where they need the ordered runs of a case, so memory use does not grow
+with the number of cases or builds. The connection is shared by the threads
+of an update and by the readers, each use of it holds a lock.
+"""
+from __future__ import with_statement
+import sqlite3
+import threading
+import logging
+
+from jenkinsapi import config, constants
+from jenkinsapi.build import Build
+from jenkinsapi.result_set import ResultSet, ResultQuery
+
+log = logging.getLogger(__name__)
+
+FAILED = ResultSet.FAILED_STATUSES
+PASSED = (constants.STATUS_PASSED, constants.STATUS_FIXED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS builds (number INTEGER PRIMARY KEY, timestamp INTEGER, result TEXT, cases INTEGER);
+CREATE TABLE IF NOT EXISTS tests (id INTEGER PRIMARY KEY, name TEXT UNIQUE);
+CREATE TABLE IF NOT EXISTS runs (test INTEGER, build INTEGER, status TEXT, duration REAL,
+                                 PRIMARY KEY (test, build));
+CREATE INDEX IF NOT EXISTS runs_build ON runs (build);
+"""
+
+class ResultHistory(object):
+    """
+    Status and duration of the test cases of a job, per build
+    """
+    BUILD_TREE = "number,url,building,timestamp,result,actions[totalCount]"
+
+    def __init__(self, job, path=":memory:", parallel=config.FETCH_PARALLEL):
+        """
+        :param job: Job obj
+        :param path: sqlite database file, str, in memory by default
+        :param parallel: number of test reports fetched at once, int
+        """
+        self.job = job
+        self.parallel = parallel
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        # Test ids by name, filled as the cases are stored
+        self._test_ids = {}
+        self.db.executescript(SCHEMA)
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'url'").fetchone()
+        if row is None:
+            self.db.execute("INSERT INTO meta VALUES ('url', ?)", (job.baseurl,))
+            self.db.commit()
+        elif row[0] != job.baseurl:
+            raise ValueError("%s holds the history of %s, not %s" % (path, row[0], job.baseurl))
+
+    def close(self):
+        self.db.close()
+
+    def update(self, builds=config.RESULT_HISTORY_BUILDS):
+        """
+        Collect the test results of the most recent finished builds which are not stored yet
+        :param builds: number of most recent builds to look at, int
+        :return: number of builds added, int
+        """
+        known = set(row[0] for row in self._fetchall("SELECT number FROM builds"))
+        new = [data for data in self.job._iter_build_data(self.BUILD_TREE, limit=builds)
+               if not data["building"] and data["number"] not in known]
+        jenkins = self.job.get_jenkins_obj()
+        # Each fetch streams its report into the database, so at most parallel
+        # reports are being read at any time, and a slow one holds up no others
+        for _ in jenkins.fetch_many([self._get_collector(data) for data in new], self.parallel, ordered=False):
+            pass
+        log.info("Added the test results of %i builds of %s" % (len(new), self.job.name))
+        return len(new)
+
+    def _get_collector(self, data):
+        def collect():
+            count = 0
+            if self._has_report(data):
+                build = Build(data["url"], data["number"], job=self.job, data={"number": data["number"], "url": data["url"]})
+                results = ResultSet(build.get_result_url(), build, stream=True,
+                                    query=ResultQuery(fields=["duration"]))
+                rows = []
+                for case in results.iter_cases():
+                    rows.append((self._get_test_id(case), data["number"], case["status"], case.get("duration")))
+                    if len(rows) >= 1000:
+                        count += self._insert_runs(rows)
+                        rows = []
+                count += self._insert_runs(rows)
+            self._lock.acquire()
+            try:
+                self.db.execute("INSERT OR REPLACE INTO builds VALUES (?, ?, ?, ?)",
+                                (data["number"], data["timestamp"], data["result"], count))
+                self.db.commit()
+            finally:
+                self._lock.release()
+        return collect
+
+    def _has_report(self, data):
+        for action in data.get("actions") or []:
+            if action and action.get(Build.STR_TOTALCOUNT):
+                return True
+        return False
+
+    def _get_test_id(self, case):
+        name = "%s.%s" % (case["className"], case["name"])
+        self._lock.acquire()
+        try:
+            # Looked up and filled under the lock, as prune empties the tests table and the ids with it
+            test_id = self._test_ids.get(name)
+            if test_id is None:
+                self.db.execute("INSERT OR IGNORE INTO tests (name) VALUES (?)", (name,))
+                test_id = self.db.execute("SELECT id FROM tests WHERE name = ?", (name,)).fetchone()[0]
+                self._test_ids[name] = test_id
+            return test_id
+        finally:
+            self._lock.release()
+
+    def _insert_runs(self, rows):
+        self._lock.acquire()
+        try:
+            self.db.executemany("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?)", rows)
+        finally:
+            self._lock.release()
+        return len(rows)
+
+    def prune(self, keep_builds):
+        """
+        Forget all but the most recent builds
+        :param keep_builds: number of builds to keep, int
+        """
+        self._lock.acquire()
+        try:
+            self.db.execute("DELETE FROM builds WHERE number NOT IN "
+                            "(SELECT number FROM builds ORDER BY number DESC LIMIT ?)", (keep_builds,))
+            self.db.execute("DELETE FROM runs WHERE build NOT IN (SELECT number FROM builds)")
+            self.db.execute("DELETE FROM tests WHERE id NOT IN (SELECT DISTINCT test FROM runs)")
+            self.db.commit()
+            self._test_ids = {}
+        finally:
+            self._lock.release()
+
+    def _fetchall(self, sql, params=()):
+        """
+        Run a query under the lock, as the connection is shared with the threads of update
+        :return: the rows, [tuple]
+        """
+        self._lock.acquire()
+        try:
+            return self.db.execute(sql, params).fetchall()
+        finally:
+            self._lock.release()
+
+    def get_build_numbers(self):
+        """
+        :return: the numbers of the builds collected, oldest first, [int]
+        """
+        return [row[0] for row in self._fetchall("SELECT number FROM builds ORDER BY number")]
+
+    def get_test_names(self):
+        return [row[0] for row in self._fetchall("SELECT name FROM tests ORDER BY name")]
+
+    def get_runs(self, test):
+        """
+        :param test: className.name of a test case, str
+        :return: (build number, status, duration) of each run of the test, oldest first
+        """
+        return self._fetchall("SELECT runs.build, runs.status, runs.duration FROM runs JOIN tests ON tests.id = runs.test "
+                              "WHERE tests.name = ? ORDER BY runs.build", (test,))
+
+    def _placeholders(self, values):
+        return ",".join("?" * len(values))
+
+    def failure_rates(self, min_runs=1):
+        """
+        :param min_runs: leave out the tests which ran fewer times, int
+        :return: (test, runs, failures, failure rate) for each test which failed, highest rate first
+        """
+        return self._fetchall(
+            "SELECT tests.name, COUNT(*) AS total, SUM(runs.status IN (%s)) AS failures, "
+            "1.0 * SUM(runs.status IN (%s)) / COUNT(*) AS rate FROM runs JOIN tests ON tests.id = runs.test "
+            "GROUP BY runs.test HAVING total >= ? AND failures > 0 ORDER BY rate DESC, tests.name"
+            % (self._placeholders(FAILED), self._placeholders(FAILED)),
+            FAILED + FAILED + (min_runs,))
+
+    def failure_rate(self, test):
+        """
+        :return: the fraction of the runs of the test which failed, float, or None if it never ran
+        """
+        total, failures = self._fetchall(
+            "SELECT COUNT(*), SUM(runs.status IN (%s)) FROM runs JOIN tests ON tests.id = runs.test WHERE tests.name = ?"
+            % self._placeholders(FAILED), FAILED + (test,))[0]
+        if not total:
+            return None
+        return float(failures) / total
+
+    def first_failing_build(self, test):
+        """
+        :return: the build from which the test has been failing ever since, int, or None if its last run did not fail
+        """
+        first = None
+        for number, status, _ in self.get_runs(test):
+            if status in FAILED:
+                if first is None:
+                    first = number
+            elif status in PASSED:
+                first = None
+        return first
+
+    def flip_count(self, test):
+        """
+        :return: how many times the test went from passing to failing or back, skipped runs aside, int
+        """
+        return self._count_flips(status for _, status, _ in self.get_runs(test))
+
+    def _count_flips(self, statuses):
+        flips = 0
+        last = None
+        for status in statuses:
+            failed = status in FAILED
+            if not failed and status not in PASSED:
+                continue
+            if last is not None and failed != last:
+                flips += 1
+            last = failed
+        return flips
+
+    def flaky_tests(self, min_flips=2):
+        """
+        :param min_flips: int
+        :return: (test, flips) of the tests which flipped at least min_flips times, most flips first
+        """
+        flaky = []
+        name, statuses = None, []
+        # Held while the rows are read one at a time
+        self._lock.acquire()
+        try:
+            cursor = self.db.execute("SELECT tests.name, runs.status FROM runs JOIN tests ON tests.id = runs.test "
+                                     "ORDER BY runs.test, runs.build")
+            for row_name, status in cursor:
+                if row_name != name:
+                    if name is not None and self._count_flips(statuses) >= min_flips:
+                        flaky.append((name, self._count_flips(statuses)))
+                    name, statuses = row_name, []
+                statuses.append(status)
+        finally:
+            self._lock.release()
+        if name is not None and self._count_flips(statuses) >= min_flips:
+            flaky.append((name, self._count_flips(statuses)))
+        return sorted(flaky, key=lambda item: (-item[1], item[0]))
+
+    def duration_trend(self, test):
+        """
+        :return: least squares slope of the duration of the test, seconds per build, float, or None with fewer than 2 runs
+        """
+        points = [(number, duration) for number, _, duration in self.get_runs(test) if duration is not None]
+        if len(points) < 2:
+            return None
+        n = float(len(points))
+        mean_x = sum(x for x, _ in points) / n
+        mean_y = sum(y for _, y in points) / n
+        var_x = sum((x - mean_x) ** 2 for x, _ in points)
+        if not var_x:
+            return None
+        return sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
@@ -1,22 +1,236 @@
 from jenkinsapi.jenkinsbase import JenkinsBase
+from jenkinsapi.exceptions import ResultsChanged
 from jenkinsapi.result import Result
+from jenkinsapi.utils.cache import FOREVER
+from jenkinsapi.utils.decoders import iter_items
+from jenkinsapi import constants
+from jenkinsapi import config
+
+from array import array
+import functools
+import logging
+
+log = logging.getLogger(__name__)
+
+class SlotStream(object):
+    """
+    Takes a request slot for each read of a response stream, rather than for
+    as long as it is open, so a caller who stops between two cases, or makes
+    other requests while iterating, does not hold a slot meanwhile
+    """
+    def __init__(self, stream, slots):
+        """
+        :param stream: file-like obj
+        :param slots: semaphore, see Jenkins.request_slots
+        """
+        self._stream = stream
+        self._slots = slots
+
+    def read(self, *args):
+        self._slots.acquire()
+        try:
+            return self._stream.read(*args)
+        finally:
+            self._slots.release()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+class ResultQuery(object):
+    """
+    Selects test cases from a test report. Only the requested fields are
+    fetched, and the heavy ones (stack traces and output) only for the
+    matching cases, also when the report is streamed. Cases are matched on
+    the client.
+    """
+    LIGHT_FIELDS = ("className", "name", "status", "duration", "age", "failedSince", "skipped", "errorDetails")
+    HEAVY_FIELDS = ("errorStackTrace", "stdout", "stderr")
+
+    def __init__(self, statuses=None, class_prefix=None, fields=LIGHT_FIELDS + HEAVY_FIELDS):
+        """
+        :param statuses: only the cases with one of these statuses, e.g. ResultSet.FAILED_STATUSES, [str]
+        :param class_prefix: only the cases whose className starts with this, str
+        :param fields: the fields of the cases to fetch, [str]
+        """
+        self.statuses = statuses
+        self.class_prefix = class_prefix
+        fields = list(fields)
+        # Needed to match and identify the cases
+        for field in ("className", "name", "status"):
+            if field not in fields:
+                fields.insert(0, field)
+        self.fields = fields
+        self.heavy_fields = [f for f in fields if f in self.HEAVY_FIELDS]
+        self.light_fields = [f for f in fields if f not in self.HEAVY_FIELDS]
+
+    @classmethod
+    def failures(cls, **kwargs):
+        return cls(statuses=ResultSet.FAILED_STATUSES, **kwargs)
+
+    def matches(self, case):
+        if self.statuses is not None and case["status"] not in self.statuses:
+            return False
+        if self.class_prefix is not None and not (case.get("className") or "").startswith(self.class_prefix):
+            return False
+        return True
+
+    def is_selective(self):
+        return self.statuses is not None or self.class_prefix is not None
+
+    @staticmethod
+    def get_tree(fields):
+        """
+        :return: a tree= expression for these fields of every case, str
+        """
+        cases = "suites[cases[%s]]" % ",".join(fields)
+        return "%s,childReports[result[%s]]" % (cases, cases)
 
 class ResultSet(JenkinsBase):
     """
     Represents a result from a completed Jenkins run.
     """
-    def __init__(self, url, build ):
+    # Where the test cases are in a test report, ijson style
+    CASE_PREFIXES = ("suites.item.cases.item", "childReports.item.result.suites.item.cases.item")
+    FAILED_STATUSES = (constants.RESULTSTATUS_FAILED, constants.STATUS_REGRESSION)
+
+    def __init__(self, url, build, stream=False, query=None ):
         """
         Init a resultset
         :param url: url for a build, str
         :param build: build obj
+        :param stream: parse the test cases as they are read from the response each
+                       time they are iterated over, instead of holding the whole report, bool
+        :param query: ResultQuery obj, only the cases it selects are reported
         """
         self.build = build
-        JenkinsBase.__init__(self, url)
+        self.stream = stream
+        self.query = query
+        if query is not None:
+            fields = query.light_fields
+            if not query.is_selective():
+                fields = query.fields
+            self.TREE = query.get_tree(fields)
+        JenkinsBase.__init__(self, url, poll=not stream)
+
+    def _full_loaders(self):
+        if self.query is not None:
+            # The query says which fields are wanted
+            return []
+        return JenkinsBase._full_loaders(self)
+
+    def _needs_heavy_fields(self):
+        return self.query is not None and bool(self.query.heavy_fields) and self.query.is_selective()
+
+    def _poll(self, tree=None):
+        data = JenkinsBase._poll(self, tree)
+        if tree == self.TREE and self._needs_heavy_fields():
+            data = self._add_heavy_fields(data)
+        return data
+
+    def _get_run_tree(self, at, start, end):
+        """
+        :param at: index of the suite, or of the child report and of its suite, (int,) or (int, int)
+        :param start: index of the first case of the run, int
+        :param end: index after the last case of the run, int
+        :return: a tree= expression for the heavy fields of a run of cases of a suite, and a
+                 function giving that suite from the data fetched with it, (str, function)
+        """
+        fields = ",".join( ["className", "name"] + self.query.heavy_fields )
+        if len( at ) == 1:
+            return ( "suites[cases[%s]{%i,%i}]{%i,%i}" % ( fields, start, end, at[0], at[0] + 1 ),
+                     lambda d: d["suites"][0] )
+        tree = "childReports[result[suites[cases[%s]{%i,%i}]{%i,%i}]]{%i,%i}" % ( fields, start, end,
+                                                                                 at[1], at[1] + 1, at[0], at[0] + 1 )
+        return tree, lambda d: d["childReports"][0]["result"]["suites"][0]
+
+    def _add_heavy_fields(self, data):
+        """
+        Fetch the heavy fields of the matching cases only, a request per run of
+        consecutive matching cases, in parallel
+        :return: a copy of data with the heavy fields in the matching cases, dict
+        """
+        suites = []
+        for i, suite in enumerate( data.get( "suites" ) or [] ):
+            suites.append( ( ( i, ), suite ) )
+        for i, report_set in enumerate( data.get( "childReports" ) or [] ):
+            for j, suite in enumerate( report_set["result"]["suites"] ):
+                suites.append( ( ( i, j ), suite ) )
+        runs = []
+        for at, suite in suites:
+            start = None
+            for k, case in enumerate( suite["cases"] + [None] ):
+                matching = case is not None and self.query.matches( case )
+                if matching and start is None:
+                    start = k
+                elif not matching and start is not None:
+                    runs.append( ( at, start, suite["cases"][start:k] ) )
+                    start = None
+        # id of a matching case -> a copy of it with the heavy fields
+        merged = {}
+        for ( _, _, cases ), heavy_cases in zip( runs, self._fetch_heavy_fields( runs ) ):
+            for case, heavy_case in zip( cases, heavy_cases ):
+                merged[ id( case ) ] = heavy_case
+        return self._replace_cases( data, merged )
+
+    def _fetch_heavy_fields(self, runs):
+        """
+        Fetch the heavy fields of runs of consecutive matching cases, in parallel
+        :param runs: index of the suite as for _get_run_tree, index of the first case, and the cases, [tuple]
+        :return: generator of the cases of each run, copied with their heavy fields, in the order of runs
+        """
+        fetches = []
+        for at, start, cases in runs:
+            tree, get_suite = self._get_run_tree( at, start, start + len( cases ) )
+            fetches.append( ( cases, self.python_api_url( self.baseurl, tree=tree ), get_suite ) )
+        jenkins = self.get_jenkins_obj()
+        heavy_data = jenkins.fetch_many( [ functools.partial( self.get_data, url ) for _, url, _ in fetches ] )
+        for ( cases, url, get_suite ), heavy in zip( fetches, heavy_data ):
+            # Match the cases by name rather than by position, in case the report changed in between
+            heavy_cases = {}
+            for heavy_case in get_suite( heavy )["cases"]:
+                heavy_cases.setdefault( ( heavy_case["className"], heavy_case["name"] ), [] ).append( heavy_case )
+            merged = []
+            for case in cases:
+                found = heavy_cases.get( ( case["className"], case["name"] ) )
+                if not found:
+                    raise ResultsChanged( "%s.%s is missing from %s" % ( case["className"], case["name"], url ) )
+                heavy_case = found.pop( 0 )
+                merged.append( dict( case, **dict( ( field, heavy_case.get( field ) )
+                                                   for field in self.query.heavy_fields ) ) )
+            yield merged
+
+    @staticmethod
+    def _replace_cases(data, cases):
+        """
+        :param cases: dict of id of a case of data to the case replacing it
+        :return: a copy of data with those cases replaced, which shares the other cases
+        """
+        def replace(suites):
+            return [ dict( suite, cases=[ cases.get( id( case ), case ) for case in suite["cases"] ] )
+                     for suite in suites ]
+        data = dict( data )
+        if data.get( "suites" ):
+            data["suites"] = replace( data["suites"] )
+        if data.get( "childReports" ):
+            data["childReports"] = [ dict( report_set, result=dict( report_set["result"],
+                                                                    suites=replace( report_set["result"]["suites"] ) ) )
+                                     for report_set in data["childReports"] ]
+        return data
 
     def get_jenkins_obj(self):
         return self.build.job.get_jenkins_obj()
 
+    def get_disk_cache(self):
+        return self.build.get_disk_cache()
+
+    def get_cache_ttl(self, data):
+        """
+        The results of a finished build never change, so they are cached forever
+        """
+        if self.build._data.get("building") is False:
+            return FOREVER
+        return self.CACHE_TTL
+
     def __str__(self):
         return "Test Result for %s" % str( self.build )
 
@@ -27,16 +241,122 @@ class ResultSet(JenkinsBase):
         return [a for a in self.iteritems()]
 
     def iteritems(self):
-        for suite in self._data.get("suites", [] ):
-            for case in suite["cases"]:
-                R = Result( **case )
-                yield R.id(), R
+        for R in self.iter_results():
+            yield R.id(), R
 
-        for report_set in self._data.get( "childReports", [] ):
-            for suite in report_set["result"]["suites"]:
+    def iter_cases(self):
+        """
+        :return: generator of the raw test case dicts, from the suites and the child reports,
+                 only those selected by the query if there is one
+        """
+        for case in self._iter_all_cases():
+            if self.query is None or self.query.matches( case ):
+                yield case
+
+    def _iter_all_cases(self):
+        """
+        :return: generator of every case of the report, or when streaming with a query which
+                 needs heavy fields, only of the matching ones
+        """
+        if not self.stream:
+            for suite in self._data.get("suites") or []:
                 for case in suite["cases"]:
-                    R = Result( **case )
-                    yield R.id(), R
+                    yield case
+            for report_set in self._data.get( "childReports" ) or []:
+                for suite in report_set["result"]["suites"]:
+                    for case in suite["cases"]:
+                        yield case
+            return
+        jenkins = self.get_jenkins_obj()
+        url = self.python_api_url(self.baseurl, tree=self.TREE)
+        jenkins.request_slots.acquire()
+        try:
+            stream = jenkins.get_opener()(url)
+        finally:
+            jenkins.request_slots.release()
+        try:
+            cases = iter_items(SlotStream(stream, jenkins.request_slots), self.CASE_PREFIXES,
+                               positions=self._needs_heavy_fields())
+            if not self._needs_heavy_fields():
+                for case in cases:
+                    yield case
+                return
+            for case in self._iter_with_heavy_fields(cases):
+                yield case
+        finally:
+            stream.close()
+
+    def _iter_with_heavy_fields(self, cases):
+        """
+        The matching cases of a stream of light ones, with their heavy fields. The runs
+        of consecutive matching cases are held until a batch of them is fetched in parallel.
+        :param cases: (index of the suite and of the case, case) tuples, see iter_items
+        :return: generator of the matching cases, in the order of the report
+        """
+        runs = []
+        run = None
+        for at, case in cases:
+            if not self.query.matches( case ):
+                run = None
+                continue
+            if run is None or at[:-1] != run[0] or at[-1] != run[1] + len( run[2] ):
+                if len( runs ) == config.FETCH_PARALLEL:
+                    for merged in self._fetch_heavy_fields( runs ):
+                        for heavy_case in merged:
+                            yield heavy_case
+                    del runs[:]
+                run = ( at[:-1], at[-1], [] )
+                runs.append( run )
+            run[2].append( case )
+        for merged in self._fetch_heavy_fields( runs ):
+            for heavy_case in merged:
+                yield heavy_case
+
+    def iter_results(self, statuses=None, fields=None):
+        """
+        :param statuses: only the cases with one of these statuses, e.g. FAILED_STATUSES, [str]
+        :param fields: only keep these fields of each case, e.g. ["className", "name", "status"], [str]
+        :return: generator of Result obj
+        """
+        for case in self.iter_cases():
+            if statuses is not None and case["status"] not in statuses:
+                continue
+            if fields is not None:
+                case = dict( ( k, case.get(k) ) for k in fields )
+            yield Result( **case )
+
+    def iter_failures(self, fields=None):
+        return self.iter_results(self.FAILED_STATUSES, fields)
+
+    def get_columns(self, fields=("className", "name", "status", "duration"), statuses=None):
+        """
+        Export the test cases column by column, for aggregation. Numeric columns
+        are arrays of doubles, others are lists in which equal strings are shared.
+        :param fields: the columns, [str]
+        :param statuses: only the cases with one of these statuses, [str]
+        :return: dict of field to column, all in the same case order
+        """
+        numeric = set( ["duration", "age", "failedSince"] )
+        columns = dict( ( field, array( "d" ) if field in numeric else [] ) for field in fields )
+        shared = {}
+        for case in self.iter_cases():
+            if statuses is not None and case["status"] not in statuses:
+                continue
+            for field in fields:
+                value = case.get( field )
+                if field in numeric:
+                    value = value or 0
+                elif isinstance( value, basestring ):
+                    value = shared.setdefault( value, value )
+                columns[ field ].append( value )
+        return columns
+
+    def count(self, statuses=None):
+        """
+        Count the test cases, without building a Result for each
+        :param statuses: only count the cases with one of these statuses, [str]
+        """
+        return sum( 1 for case in self.iter_cases() if statuses is None or case["status"] in statuses )
 
     def __len__(self):
-        return len(self.items())
+        return self.count()
@@ -0,0 +1,82 @@
+"""
+A local index of the revision every build of a job was made from.
+
+The revisions are read from the svn, git or hg data of the builds in their
+job's history (see Build.revision_from_data), so neither the builds nor the
+job configuration are fetched one by one. It is refreshed incrementally and
+can be saved to a file, see BuildIndex.
+"""
+from jenkinsapi import config
+from jenkinsapi.build import Build
+from jenkinsapi.build_index import BuildIndex
+
+class RevisionIndex(BuildIndex):
+    """
+    Build numbers by revision, newest builds first
+    """
+    TREE = "number,building,%s" % Build.REVISION_TREE
+
+    def __init__(self, job, path=None, page_size=config.HISTORY_PAGE_SIZE):
+        """
+        :param job: Job obj
+        :param path: file the index is loaded from and saved to, str, or None to keep it in memory
+        :param page_size: number of builds fetched per request, int
+        """
+        # builds holds buildnumber -> (vcs kind or None, revision), and this revision -> set of buildnumbers
+        self._by_revision = {}
+        # The newest build with a vcs kind, builds without changes have none
+        self._vcs_build = None
+        self._config_vcs = None
+        BuildIndex.__init__(self, job, path, page_size)
+
+    def _reindex(self):
+        self._by_revision = {}
+        self._vcs_build = None
+        BuildIndex._reindex(self)
+
+    def _get_entry(self, data):
+        return (Build.vcs_from_data(data), Build.revision_from_data(data))
+
+    def _add(self, number):
+        kind, revision = self.builds[number]
+        self._by_revision.setdefault(revision, set()).add(number)
+        if kind and (self._vcs_build is None or number > self._vcs_build):
+            self._vcs_build = number
+
+    def get_vcs(self):
+        """
+        :return: the kind of vcs of the newest build indexed which has one, else of the
+                 job configuration, "svn", "git", "hg", or None if unknown
+        """
+        if self._vcs_build is not None:
+            return self.builds[self._vcs_build][0]
+        if self._config_vcs is None:
+            try:
+                self._config_vcs = self.job.get_vcs() or ""
+            except AttributeError:
+                # Not a freestyle job, e.g. a pipeline, its config has no scm
+                self._config_vcs = ""
+        return self._config_vcs or None
+
+    def find(self, revision):
+        """
+        :param revision: revision, svn revisions may be given as str
+        :return: numbers of the builds made from that revision, newest first, [int]
+        """
+        if self.get_vcs() == "svn" and not isinstance(revision, int):
+            revision = int(revision)
+        return sorted(self._by_revision.get(revision, ()), reverse=True)
+
+    def get_revision(self, number):
+        """
+        :param number: build number, int
+        :return: the revision of the build, or None if it is not indexed
+        """
+        entry = self.builds.get(number)
+        return entry and entry[1]
+
+    def get_revision_dict(self):
+        """
+        :return: dict of revision to the numbers of the builds made from it, newest first
+        """
+        return dict((revision, sorted(numbers, reverse=True)) for revision, numbers in self._by_revision.items())
@@ -0,0 +1,200 @@
+"""
+An in-memory cache of decoded remote API responses.
+
+Entries are keyed by url and the Jenkins user they were fetched as. Each
+JenkinsBase class says how long its responses stay fresh (CACHE_TTL, or
+get_cache_ttl for data dependent lifetimes such as finished builds). A stale
+entry which came with an ETag or Last-Modified header is revalidated with a
+conditional request, so an unchanged object costs a 304 instead of a download.
+Entries hold the marshalled data, and each hit decodes a new copy of it, so
+callers may change the data they get without corrupting the cache.
+The least recently used entries are evicted to keep within the entry and
+byte limits.
+"""
+import time
+import marshal
+import threading
+import urllib2
+import logging
+from collections import OrderedDict
+
+from jenkinsapi import config
+
+log = logging.getLogger( __name__ )
+
+FOREVER = float("inf")
+
+class CacheEntry(object):
+    __slots__ = ( "body", "size", "expires", "etag", "last_modified" )
+
+    def __init__(self, body, size, expires, etag=None, last_modified=None):
+        """
+        :param body: the marshalled data, str
+        :param size: size of the response body in bytes, int
+        """
+        self.body = body
+        self.size = size
+        self.expires = expires
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def is_fresh(self, now):
+        return now < self.expires
+
+    def get_data(self):
+        return marshal.loads(self.body)
+
+    def get_validators(self):
+        """
+        Headers which turn a request for this entry into a conditional one
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+class ResponseCache(object):
+    """
+    LRU cache of API responses, pass one to Jenkins(response_cache=...)
+    """
+    def __init__(self, max_entries=config.CACHE_MAX_ENTRIES, max_bytes=config.CACHE_MAX_BYTES, ttls=None):
+        """
+        :param max_entries: max number of cached responses, int
+        :param max_bytes: max total size of the cached response bodies, int
+        :param ttls: seconds a response stays fresh per class name, overriding
+                     the class CACHE_TTL, e.g. {"Job": 5}, dict
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttls = ttls or {}
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+
+    def get_ttl(self, obj, data):
+        """
+        Seconds the response data for obj stays fresh
+        """
+        ttl = self.ttls.get(obj.__class__.__name__)
+        if ttl is None:
+            ttl = obj.get_cache_ttl(data)
+        return ttl
+
+    def get(self, obj, url):
+        """
+        Get the data at url for obj, from the cache when it is fresh
+        """
+        key = ( obj.get_jenkins_obj().username, url )
+        entry = self._lookup(key)
+        if entry is not None and entry.is_fresh(time.time()):
+            self._count("hits")
+            return entry.get_data()
+        headers = {}
+        if entry is not None:
+            headers = entry.get_validators()
+        try:
+            data, info, size = obj.read_data(url, headers)
+        except urllib2.HTTPError, e:
+            if e.code != 304 or entry is None:
+                raise
+            self._count("revalidations")
+            data = entry.get_data()
+            entry.expires = time.time() + self.get_ttl(obj, data)
+            return data
+        self._count("misses")
+        ttl = self.get_ttl(obj, data)
+        if ttl > 0 or info.getheader("ETag") or info.getheader("Last-Modified"):
+            try:
+                body = marshal.dumps(data, 2)
+            except ValueError, e:
+                log.warn("Cannot cache %s: %s" % (url, e))
+                return data
+            self._store(key, CacheEntry(body, size, time.time() + ttl,
+                                        info.getheader("ETag"), info.getheader("Last-Modified")))
+        return data
+
+    def _count(self, counter):
+        self._lock.acquire()
+        try:
+            setattr(self, counter, getattr(self, counter) + 1)
+        finally:
+            self._lock.release()
+
+    def _lookup(self, key):
+        self._lock.acquire()
+        try:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                # Re-insert to mark it as the most recently used
+                self._entries[key] = entry
+            return entry
+        finally:
+            self._lock.release()
+
+    def _store(self, key, entry):
+        self._lock.acquire()
+        try:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            if entry.size > self.max_bytes:
+                return
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evictions += 1
+        finally:
+            self._lock.release()
+
+    def invalidate(self, url=None):
+        """
+        Drop the entries for url, for any user, or every entry if url is None
+        """
+        self._lock.acquire()
+        try:
+            for key in self._entries.keys():
+                if url is None or key[1] == url:
+                    self._bytes -= self._entries.pop(key).size
+        finally:
+            self._lock.release()
+
+    def clear(self):
+        self.invalidate()
+
+    def stats(self):
+        """
+        :return: dict of hits, misses, revalidations, evictions, entries and bytes
+        """
+        self._lock.acquire()
+        try:
+            return dict(hits=self.hits, misses=self.misses, revalidations=self.revalidations,
+                        evictions=self.evictions, entries=len(self._entries), bytes=self._bytes)
+        finally:
+            self._lock.release()
+
+    def __len__(self):
+        return len(self._entries)
+
+class CountingStream(object):
+    """
+    Counts the bytes read through a response stream
+    """
+    def __init__(self, stream):
+        self._stream = stream
+        self.count = 0
+
+    def read(self, *args):
+        data = self._stream.read(*args)
+        self.count += len(data)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
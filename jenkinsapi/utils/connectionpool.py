@@ -0,0 +1,212 @@
+"""
+A persistent HTTP/1.1 connection pool for urllib2 openers.
+
+urllib2 sends "Connection: close" on every request, so each poll of a Jenkins
+object pays for a fresh TCP (and possibly TLS) handshake. The handlers in this
+module keep idle connections around per host and hand them back out for the
+next request, while still running through the normal urllib2 handler chain so
+that auth, proxy and cookie handlers keep working.
+"""
+import httplib
+import socket
+import threading
+import time
+import urllib2
+import logging
+
+from jenkinsapi import config
+
+log = logging.getLogger( __name__ )
+
+# Requests which may be sent twice, see KeepAliveHandlerMixin._keepalive_open
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE")
+
+class ConnectionPool(object):
+    """
+    Keeps idle keep-alive connections, keyed by connection class and host.
+    """
+    def __init__(self, maxsize=config.CONNECTION_POOL_SIZE, idle_timeout=config.CONNECTION_IDLE_TIMEOUT):
+        """
+        :param maxsize: max number of idle connections kept per host, int
+        :param idle_timeout: seconds an idle connection may be reused for, int or float
+        """
+        assert maxsize > 0, "Pool size should be a non-zero positive integer"
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return an idle connection for key, or None if there isn't a fresh one.
+        """
+        now = time.time()
+        stale = []
+        conn = None
+        self._lock.acquire()
+        try:
+            idle = self._idle.get(key, [])
+            while idle:
+                candidate, last_used = idle.pop()
+                if now - last_used > self.idle_timeout:
+                    stale.append(candidate)
+                else:
+                    conn = candidate
+                    break
+        finally:
+            self._lock.release()
+        for candidate in stale:
+            candidate.close()
+        return conn
+
+    def put(self, key, conn):
+        """
+        Return a connection to the pool, closing it if the pool is full.
+        """
+        self._lock.acquire()
+        try:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.maxsize:
+                idle.append((conn, time.time()))
+                return
+        finally:
+            self._lock.release()
+        conn.close()
+
+    def close(self):
+        """
+        Close every idle connection held by the pool.
+        """
+        self._lock.acquire()
+        try:
+            idle, self._idle = self._idle, {}
+        finally:
+            self._lock.release()
+        for conns in idle.values():
+            for conn, _ in conns:
+                conn.close()
+
+    def __len__(self):
+        self._lock.acquire()
+        try:
+            return sum(len(conns) for conns in self._idle.values())
+        finally:
+            self._lock.release()
+
+class _PooledResponse(object):
+    """
+    Wraps a httplib.HTTPResponse and gives its connection back to the pool
+    once the body has been completely read.
+    """
+    def __init__(self, response, release, discard):
+        self._response = response
+        self._release = release
+        self._discard = discard
+        self._done = False
+
+    def read(self, amt=None):
+        data = self._response.read(amt)
+        if not self._done and self._response.isclosed():
+            self._done = True
+            self._release()
+        return data
+
+    recv = read
+
+    def close(self):
+        if not self._done:
+            # The body was not consumed, the connection can't be reused.
+            self._done = True
+            self._response.close()
+            self._discard()
+
+class KeepAliveHandlerMixin(object):
+    """
+    Shared implementation of the keep-alive http_open / https_open.
+    """
+    def __init__(self, pool):
+        self.pool = pool
+
+    def _keepalive_open(self, http_class, req, **http_conn_args):
+        host = req.get_host()
+        if not host:
+            raise urllib2.URLError('no host given')
+
+        headers = dict(req.unredirected_hdrs)
+        headers.update(dict((k, v) for k, v in req.headers.items()
+                            if k not in headers))
+        headers["Connection"] = "keep-alive"
+        headers = dict((name.title(), val) for name, val in headers.items())
+
+        tunnel_headers = {}
+        if req._tunnel_host:
+            proxy_auth_hdr = "Proxy-Authorization"
+            if proxy_auth_hdr in headers:
+                tunnel_headers[proxy_auth_hdr] = headers.pop(proxy_auth_hdr)
+
+        key = (http_class.__name__, host, req._tunnel_host)
+        # The server may have dropped an idle connection, which only shows once the
+        # request was sent, and it is sent again on a new one. A POST, such as a build
+        # trigger, could then be done twice, so it always goes over a new connection.
+        conn = None
+        if req.get_method() in IDEMPOTENT_METHODS:
+            conn = self.pool.get(key)
+        response = None
+        if conn is not None:
+            try:
+                response = self._send(conn, req, headers)
+            except (socket.error, httplib.HTTPException):
+                # The server dropped the idle connection, try a new one.
+                log.debug("Stale connection to %s, reconnecting" % host)
+                conn.close()
+        if response is None:
+            conn = http_class(host, timeout=req.timeout, **http_conn_args)
+            conn.set_debuglevel(self._debuglevel)
+            if req._tunnel_host:
+                conn.set_tunnel(req._tunnel_host, headers=tunnel_headers)
+            try:
+                response = self._send(conn, req, headers)
+            except socket.error, err:
+                conn.close()
+                raise urllib2.URLError(err)
+
+        if response.will_close:
+            release = conn.close
+        else:
+            release = lambda: self.pool.put(key, conn)
+
+        fp = socket._fileobject(_PooledResponse(response, release, conn.close), close=True)
+        resp = urllib2.addinfourl(fp, response.msg, req.get_full_url())
+        resp.code = response.status
+        resp.msg = response.reason
+        return resp
+
+    def _send(self, conn, req, headers):
+        conn.request(req.get_method(), req.get_selector(), req.data, headers)
+        return conn.getresponse(buffering=True)
+
+class KeepAliveHTTPHandler(KeepAliveHandlerMixin, urllib2.HTTPHandler):
+    def __init__(self, pool, debuglevel=0):
+        urllib2.HTTPHandler.__init__(self, debuglevel)
+        KeepAliveHandlerMixin.__init__(self, pool)
+
+    def http_open(self, req):
+        return self._keepalive_open(httplib.HTTPConnection, req)
+
+class KeepAliveHTTPSHandler(KeepAliveHandlerMixin, urllib2.HTTPSHandler):
+    def __init__(self, pool, debuglevel=0, context=None):
+        urllib2.HTTPSHandler.__init__(self, debuglevel, context=context)
+        KeepAliveHandlerMixin.__init__(self, pool)
+
+    def https_open(self, req):
+        return self._keepalive_open(httplib.HTTPSConnection, req, context=self._context)
+
+def get_keepalive_handlers(pool):
+    """
+    Get the http and https handlers which route requests through a pool
+    :param pool: ConnectionPool obj, or None
+    :return: a list of handlers
+    """
+    if pool is None:
+        return []
+    return [ KeepAliveHTTPHandler(pool), KeepAliveHTTPSHandler(pool) ]
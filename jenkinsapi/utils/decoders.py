@@ -0,0 +1,138 @@
+"""
+Decoders turn the body of a Jenkins remote API response into python objects.
+
+Every decoder reads the JSON flavour of the API (config.JENKINS_API). The
+buffered decoder reads the whole body and parses it with the fastest JSON
+library available. The streaming decoder parses straight from the response
+stream with ijson, so the raw text of a large payload is never held in memory
+alongside the parsed result; it falls back to the standard library when
+ijson is not installed.
+"""
+import logging
+from decimal import Decimal
+
+log = logging.getLogger( __name__ )
+
+def _import_first(names):
+    for name in names:
+        try:
+            return __import__(name, fromlist=["__name__"])
+        except ImportError:
+            pass
+    return None
+
+# Fastest first: ujson and simplejson ship C speedups that beat the stdlib.
+json = _import_first(["ujson", "simplejson", "json"])
+ijson = _import_first(["ijson.backends.yajl2_c", "ijson.backends.yajl2_cffi",
+                       "ijson.backends.yajl2", "ijson"])
+if ijson is not None:
+    from ijson.common import ObjectBuilder
+
+class JsonDecoder(object):
+    """
+    Reads the full response body, then parses it in one go.
+    """
+    name = "json"
+
+    def decode(self, stream):
+        return json.loads(stream.read())
+
+class StreamingJsonDecoder(object):
+    """
+    Parses the response incrementally as it is read from the socket.
+    """
+    name = "stream"
+
+    def __init__(self):
+        if ijson is None:
+            log.info("ijson is not installed, falling back to the buffered json decoder")
+
+    def decode(self, stream):
+        if ijson is None:
+            return JsonDecoder().decode(stream)
+        builder = ObjectBuilder()
+        for event, value in ijson.basic_parse(stream):
+            if event == "number" and isinstance(value, Decimal):
+                # ijson yields Decimals for non-integers, json gives floats.
+                value = float(value)
+            builder.event(event, value)
+        return builder.value
+
+def iter_items(stream, prefixes, positions=False):
+    """
+    Parse the objects found under any of the prefixes from a JSON stream, one at
+    a time, without building the rest of the document. Prefixes use the ijson
+    notation, e.g. "suites.item.cases.item" for every case of every suite.
+    Without ijson the whole document is parsed first.
+    :param stream: file-like obj
+    :param prefixes: [str]
+    :param positions: yield the index of the object in each array of its prefix along with it,
+                      e.g. (suite, case) for "suites.item.cases.item", bool
+    :return: generator of the objects, or of (indexes, object) tuples
+    """
+    if ijson is None:
+        document = JsonDecoder().decode(stream)
+        for item in _walk(document, prefixes, positions):
+            yield item
+        return
+    builder = None
+    depth = 0
+    # prefix of an array -> index of its current item
+    indexes = {}
+    for prefix, event, value in ijson.parse(stream):
+        if builder is None:
+            if positions:
+                if event == "start_array":
+                    indexes[prefix] = -1
+                if (prefix == "item" or prefix.endswith(".item")) and event not in ("map_key", "end_map", "end_array"):
+                    indexes[prefix[:-5]] += 1
+            if prefix not in prefixes or event not in ("start_map", "start_array"):
+                continue
+            builder = ObjectBuilder()
+            path = prefix
+        if event == "number" and isinstance(value, Decimal):
+            value = float(value)
+        builder.event(event, value)
+        if event in ("start_map", "start_array"):
+            depth += 1
+        elif event in ("end_map", "end_array"):
+            depth -= 1
+            if depth == 0:
+                if positions:
+                    yield _get_indexes(path, indexes), builder.value
+                else:
+                    yield builder.value
+                builder = None
+
+def _get_indexes(prefix, indexes):
+    keys = prefix.split(".")
+    return tuple(indexes[".".join(keys[:i])] for i, key in enumerate(keys) if key == "item")
+
+def _walk(document, prefixes, positions=False):
+    for prefix in prefixes:
+        items = [((), document)]
+        for key in prefix.split("."):
+            if key == "item":
+                items = [(at + (i,), value) for at, item in items for i, value in enumerate(item or [])]
+            else:
+                items = [(at, item.get(key)) for at, item in items if isinstance(item, dict)]
+        for at, item in items:
+            if positions:
+                yield at, item
+            else:
+                yield item
+
+DECODERS = dict((cls.name, cls) for cls in [JsonDecoder, StreamingJsonDecoder])
+
+def get_decoder(decoder):
+    """
+    Get a decoder obj
+    :param decoder: name of a registered decoder, str, or a decoder obj
+    :return: obj with a decode(stream) method
+    """
+    if isinstance(decoder, basestring):
+        try:
+            return DECODERS[decoder]()
+        except KeyError:
+            raise ValueError("Unknown decoder %s - available: %s" % (decoder, ", ".join(DECODERS.keys())))
+    return decoder
@@ -0,0 +1,147 @@
+"""
+An on-disk cache of immutable remote API responses, shared between processes.
+
+Only data which can never change is stored: finished builds, their test
+results and the origin of fingerprints (see JenkinsBase.get_cache_ttl). Each
+response is marshalled into its own file, named after a hash of its url (which
+holds the server, job, build number and query) and of the user it was fetched
+as, since what a user may read depends on their permissions. Files are written
+to a temporary name and renamed into place, so concurrent readers only ever see
+complete entries, and concurrent writers of the same entry simply race to
+write identical data. Reads touch the file, and the least recently used files
+are deleted once the cache grows beyond its size limit.
+"""
+from __future__ import with_statement
+import os
+import errno
+import hashlib
+import marshal
+import tempfile
+import threading
+import logging
+
+from jenkinsapi import config
+
+log = logging.getLogger( __name__ )
+
+class DiskCache(object):
+    """
+    Pass one to Jenkins, Job or Build as disk_cache=DiskCache(path)
+    """
+    SUFFIX = ".marshal"
+    # Check the total size of the cache after this many writes
+    EVICT_EVERY = 100
+
+    def __init__(self, path, max_bytes=config.DISK_CACHE_MAX_BYTES):
+        """
+        :param path: directory holding the cache, created if needed, str
+        :param max_bytes: the cache is trimmed back under this size, int
+        """
+        # marshal is only compatible between the same marshal versions
+        self.path = os.path.join(os.path.abspath(path), "v%i" % marshal.version)
+        self.max_bytes = max_bytes
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _get_filepath(self, url, user):
+        key = "\n".join(part or "" for part in (user or ()) + (url,))
+        if isinstance(key, unicode):
+            key = key.encode("utf-8")
+        digest = hashlib.sha1(key).hexdigest()
+        return os.path.join(self.path, digest[:2], digest + self.SUFFIX)
+
+    def get(self, url, user=None):
+        """
+        :param user: who the data is read as, (username, baseurl) of the Jenkins obj, tuple
+        :return: the cached data for url, or None
+        """
+        filepath = self._get_filepath(url, user)
+        try:
+            with open(filepath, "rb") as f:
+                data = marshal.loads(f.read())
+        except IOError, e:
+            if e.errno != errno.ENOENT:
+                log.warn("Cannot read %s from the disk cache: %s" % (url, e))
+            return None
+        except (EOFError, ValueError, TypeError), e:
+            log.warn("Dropping corrupt disk cache entry %s: %s" % (filepath, e))
+            self._remove(filepath)
+            return None
+        try:
+            os.utime(filepath, None)
+        except OSError:
+            pass
+        return data
+
+    def put(self, url, data, user=None):
+        """
+        Store the data for url
+        :param user: who the data was fetched as, (username, baseurl) of the Jenkins obj, tuple
+        """
+        filepath = self._get_filepath(url, user)
+        dirpath = os.path.dirname(filepath)
+        try:
+            if not os.path.isdir(dirpath):
+                os.makedirs(dirpath)
+        except OSError, e:
+            if e.errno != errno.EEXIST:
+                raise
+        fd, tmppath = tempfile.mkstemp(dir=dirpath, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(marshal.dumps(data, 2))
+            os.rename(tmppath, filepath)
+        except (OSError, ValueError), e:
+            # Unmarshallable data, or a reader holds the file open on Windows
+            log.warn("Cannot write %s to the disk cache: %s" % (url, e))
+            self._remove(tmppath)
+            return
+        self._lock.acquire()
+        try:
+            self._writes += 1
+            due = self._writes % self.EVICT_EVERY == 1
+        finally:
+            self._lock.release()
+        if due:
+            self.evict()
+
+    def _remove(self, filepath):
+        try:
+            os.remove(filepath)
+        except OSError:
+            # Another process got there first
+            pass
+
+    def _iter_files(self):
+        for dirpath, _, filenames in os.walk(self.path):
+            for filename in filenames:
+                if not filename.endswith(self.SUFFIX):
+                    continue
+                filepath = os.path.join(dirpath, filename)
+                try:
+                    st = os.stat(filepath)
+                except OSError:
+                    continue
+                yield st.st_mtime, st.st_size, filepath
+
+    def size(self):
+        """
+        :return: total size of the cached entries in bytes
+        """
+        return sum(size for _, size, _ in self._iter_files())
+
+    def evict(self):
+        """
+        Delete the least recently used entries until the cache is within max_bytes
+        """
+        files = sorted(self._iter_files())
+        total = sum(size for _, size, _ in files)
+        for _, size, filepath in files:
+            if total <= self.max_bytes:
+                break
+            self._remove(filepath)
+            total -= size
+
+    def clear(self):
+        for _, _, filepath in list(self._iter_files()):
+            self._remove(filepath)
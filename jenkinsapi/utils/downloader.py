@@ -0,0 +1,179 @@
+"""
+Streaming file downloads with resume and progress reporting.
+
+Each file is written in chunks to a ".part" file next to its destination and
+renamed into place once complete, so the destination never holds a partial
+file. When a ".part" file is left over from an interrupted download, only the
+missing bytes are requested with an HTTP Range header. Any number of files can
+be downloaded over a bounded pool of worker threads. The MD5 of each file
+is computed as it streams in, so it does not have to be read back to be
+checked against its Jenkins fingerprint.
+"""
+from __future__ import with_statement
+import os
+import urllib2
+import hashlib
+import threading
+import logging
+
+from jenkinsapi import config
+from jenkinsapi.utils.threadpool import bounded_imap
+
+log = logging.getLogger( __name__ )
+
+PART_SUFFIX = ".part"
+
+class Download(object):
+    """
+    The progress of the download of one file
+    """
+    def __init__(self, url, fspath):
+        self.url = url
+        self.fspath = fspath
+        # bytes_total is None until the server has told the size of the file
+        self.bytes_total = None
+        self.bytes_done = 0
+        self.resumed_from = 0
+        self.finished = False
+        # Hex MD5 of the file once finished
+        self.md5 = None
+        # Whether the file was checked with the verify function of Downloader.download
+        self.verified = False
+
+    def __repr__(self):
+        return "<%s.%s %s>" % (self.__class__.__module__, self.__class__.__name__, self.url)
+
+class Downloader(object):
+    """
+    Downloads files through a urllib2 opener, such as Jenkins.get_opener()
+    """
+    def __init__(self, parallel=config.DOWNLOAD_PARALLEL, chunk_size=config.DOWNLOAD_CHUNK_SIZE, resume=True,
+                 progress=None, total_progress=None):
+        """
+        :param parallel: max number of files downloaded at once, int
+        :param chunk_size: bytes read and written at a time, int
+        :param resume: continue from a leftover .part file, bool
+        :param progress: called with a Download obj after each chunk of that file
+        :param total_progress: called with the bytes done and the bytes known to be
+                               due over all the files of this downloader after each chunk
+        """
+        assert parallel > 0, "Parallel should be a non-zero positive integer"
+        self.parallel = parallel
+        self.chunk_size = chunk_size
+        self.resume = resume
+        self.progress = progress
+        self.total_progress = total_progress
+        self.bytes_done = 0
+        self.bytes_total = 0
+        self._lock = threading.Lock()
+
+    def fetch(self, url, fspath, opener=urllib2.urlopen, verify=None):
+        """
+        Download one file
+        :param url: str
+        :param fspath: destination path, its directory must exist, str
+        :param opener: function opening a urllib2.Request
+        :param verify: see download
+        :return: fspath
+        """
+        return self.download(url, fspath, opener, verify).fspath
+
+    def download(self, url, fspath, opener=urllib2.urlopen, verify=None):
+        """
+        Download one file, see fetch. When the server tells neither the size of the
+        file nor sends it in chunks, a download cut short cannot be told from a
+        complete one: the file is then only put in place if verify says it is right,
+        and is otherwise left in its .part file.
+        :param verify: called with the md5 of such a file, returns whether it is the right file, bool
+        :return: the finished Download obj
+        """
+        download = Download(url, fspath)
+        partpath = fspath + PART_SUFFIX
+        request = urllib2.Request(url)
+        if self.resume and os.path.exists(partpath):
+            download.resumed_from = os.path.getsize(partpath)
+            if download.resumed_from:
+                request.add_header("Range", "bytes=%i-" % download.resumed_from)
+        try:
+            stream = opener(request)
+        except urllib2.HTTPError, e:
+            if e.code != 416:
+                raise
+            # The part file is not a prefix of the remote file, start again
+            log.info("Cannot resume %s, downloading it again" % url)
+            os.remove(partpath)
+            return self.download(url, fspath, opener, verify)
+        try:
+            self._write(download, stream, partpath)
+            # httplib raises on a chunked body cut short
+            delimited = (download.bytes_total is not None or
+                         stream.info().getheader("Transfer-Encoding", "").lower() == "chunked")
+        finally:
+            stream.close()
+        if not delimited:
+            download.verified = verify is not None and verify(download.md5)
+            if not download.verified:
+                raise IOError("The size of %s is unknown and it could not be verified, it was left in %s"
+                              % (url, partpath))
+        self._replace(partpath, fspath)
+        download.finished = True
+        return download
+
+    def _write(self, download, stream, partpath):
+        if download.resumed_from and stream.code != 206:
+            # The server ignored the Range header and sends the whole file
+            log.info("Server does not support resuming %s" % download.url)
+            download.resumed_from = 0
+        length = stream.info().getheader("Content-Length")
+        if length is not None:
+            download.bytes_total = download.resumed_from + int(length)
+            self._count(0, download.bytes_total)
+        download.bytes_done = download.resumed_from
+        self._count(download.resumed_from, 0)
+        md5 = hashlib.md5()
+        if download.resumed_from:
+            with open(partpath, "rb") as f:
+                for chunk in iter(lambda: f.read(self.chunk_size), ""):
+                    md5.update(chunk)
+        mode = "ab" if download.resumed_from else "wb"
+        with open(partpath, mode) as f:
+            for chunk in iter(lambda: stream.read(self.chunk_size), ""):
+                f.write(chunk)
+                md5.update(chunk)
+                download.bytes_done += len(chunk)
+                self._count(len(chunk), 0)
+                self._report(download)
+        if download.bytes_total is not None and download.bytes_done < download.bytes_total:
+            raise IOError("Download of %s stopped after %i of %i bytes, it can be resumed"
+                          % (download.url, download.bytes_done, download.bytes_total))
+        download.md5 = md5.hexdigest()
+
+    def _replace(self, partpath, fspath):
+        try:
+            os.rename(partpath, fspath)
+        except OSError:
+            # Windows does not rename over an existing file
+            os.remove(fspath)
+            os.rename(partpath, fspath)
+
+    def _count(self, done, total):
+        self._lock.acquire()
+        try:
+            self.bytes_done += done
+            self.bytes_total += total
+        finally:
+            self._lock.release()
+
+    def _report(self, download):
+        if self.progress is not None:
+            self.progress(download)
+        if self.total_progress is not None:
+            self.total_progress(self.bytes_done, self.bytes_total)
+
+    def fetch_all(self, items):
+        """
+        Download many files at once
+        :param items: (url, fspath, opener) or (url, fspath, opener, verify) tuples
+        :return: list of fspath, in the order of items
+        """
+        return list(bounded_imap(lambda item: self.fetch(*item), items, self.parallel))
@@ -0,0 +1,320 @@
+"""
+A small event loop with futures and generator based coroutines.
+
+Blocking calls (HTTP requests through the Jenkins opener) run on a bounded
+pool of worker threads, while waiting and sleeping happen on the loop. A
+coroutine is a generator which yields futures (or lists of futures) and is
+resumed with their results; it hands back its own result by raising Return.
+
+    @coroutine
+    def wait_for(build):
+        while (yield run_in_executor(build.is_running)):
+            yield sleep(5)
+        raise Return(build.get_status())
+
+    get_event_loop().run_until_complete(wait_for(build))
+"""
+import sys
+import heapq
+import time
+import Queue
+import functools
+import threading
+import logging
+
+log = logging.getLogger( __name__ )
+
+DEFAULT_WORKERS = 8
+
+class Return(Exception):
+    """
+    Raised by a coroutine to return a value.
+    """
+    def __init__(self, value=None):
+        Exception.__init__(self, value)
+        self.value = value
+
+class Future(object):
+    """
+    The result of an operation which may not have completed yet.
+    """
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._result = None
+        self._exc_info = None
+        self._callbacks = []
+
+    def done(self):
+        return self._event.is_set()
+
+    def result(self, timeout=None):
+        """
+        Block until the future is done, then return its result or raise its exception.
+        """
+        if not self._event.wait(timeout):
+            raise RuntimeError("Future not done after %ss" % timeout)
+        if self._exc_info is not None:
+            raise self._exc_info[0], self._exc_info[1], self._exc_info[2]
+        return self._result
+
+    def exception(self):
+        if self._exc_info is not None:
+            return self._exc_info[1]
+        return None
+
+    def add_done_callback(self, fn):
+        """
+        Call fn(future) once the future is done, straight away if it already is.
+        """
+        self._lock.acquire()
+        try:
+            if not self.done():
+                self._callbacks.append(fn)
+                return
+        finally:
+            self._lock.release()
+        fn(self)
+
+    def set_result(self, result):
+        self._result = result
+        self._finish()
+
+    def set_exc_info(self, exc_info):
+        self._exc_info = exc_info
+        self._finish()
+
+    def _finish(self):
+        self._lock.acquire()
+        try:
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        finally:
+            self._lock.release()
+        for fn in callbacks:
+            try:
+                fn(self)
+            except Exception, e:
+                log.exception(e)
+
+class EventLoop(object):
+    """
+    Runs callbacks and timers on the thread which calls run_until_complete,
+    and blocking functions on a bounded pool of worker threads.
+    """
+    def __init__(self, workers=DEFAULT_WORKERS):
+        assert workers > 0, "Workers should be a non-zero positive integer"
+        self.workers = workers
+        self._ready = Queue.Queue()
+        self._timers = []
+        self._jobs = Queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._counter = 0
+
+    def call_soon(self, fn, *args):
+        """
+        Schedule fn(*args) on the loop. Safe to call from any thread.
+        """
+        self._ready.put((fn, args))
+
+    call_soon_threadsafe = call_soon
+
+    def call_later(self, delay, fn, *args):
+        """
+        Schedule fn(*args) on the loop after delay seconds.
+        """
+        self._lock.acquire()
+        try:
+            self._counter += 1
+            heapq.heappush(self._timers, (time.time() + delay, self._counter, fn, args))
+        finally:
+            self._lock.release()
+        # Wake the loop up so it notices the new timer.
+        self.call_soon(lambda: None)
+
+    def run_in_executor(self, fn, *args, **kwargs):
+        """
+        Run a blocking function on a worker thread.
+        :return: Future of its result
+        """
+        future = Future()
+        self._jobs.put((future, fn, args, kwargs))
+        self._start_worker()
+        return future
+
+    def _start_worker(self):
+        self._lock.acquire()
+        try:
+            if len(self._threads) >= self.workers:
+                return
+            thread = threading.Thread(target=self._work)
+            thread.daemon = True
+            self._threads.append(thread)
+        finally:
+            self._lock.release()
+        thread.start()
+
+    def _work(self):
+        while True:
+            future, fn, args, kwargs = self._jobs.get()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception:
+                self.call_soon(future.set_exc_info, sys.exc_info())
+            else:
+                self.call_soon(future.set_result, result)
+
+    def _run_once(self, timeout):
+        now = time.time()
+        self._lock.acquire()
+        try:
+            due = []
+            while self._timers and self._timers[0][0] <= now:
+                due.append(heapq.heappop(self._timers))
+            if self._timers:
+                timeout = min(timeout, self._timers[0][0] - now)
+        finally:
+            self._lock.release()
+        for _, _, fn, args in due:
+            self._ready.put((fn, args))
+        try:
+            fn, args = self._ready.get(True, max(timeout, 0))
+        except Queue.Empty:
+            return
+        while True:
+            try:
+                fn(*args)
+            except Exception, e:
+                log.exception(e)
+            try:
+                fn, args = self._ready.get_nowait()
+            except Queue.Empty:
+                return
+
+    def run_until_complete(self, future, timeout=None):
+        """
+        Run the loop until future is done.
+        :return: the result of the future
+        """
+        deadline = timeout and time.time() + timeout
+        while not future.done():
+            if deadline and time.time() > deadline:
+                raise RuntimeError("Future not done after %ss" % timeout)
+            # A timeout keeps the wait interruptible by KeyboardInterrupt
+            self._run_once(0.5)
+        return future.result()
+
+class Task(Future):
+    """
+    Drives a generator based coroutine on the loop.
+    """
+    def __init__(self, gen, loop):
+        Future.__init__(self)
+        self._gen = gen
+        self._loop = loop
+        loop.call_soon(self._step, None, None)
+
+    def _step(self, value, exc_info):
+        try:
+            if exc_info is not None:
+                yielded = self._gen.throw(*exc_info)
+            else:
+                yielded = self._gen.send(value)
+        except StopIteration:
+            self.set_result(None)
+            return
+        except Return, r:
+            self.set_result(r.value)
+            return
+        except Exception:
+            self.set_exc_info(sys.exc_info())
+            return
+        if isinstance(yielded, (list, tuple)):
+            yielded = gather(*yielded)
+        if not isinstance(yielded, Future):
+            self._loop.call_soon(self._step, None,
+                (TypeError, TypeError("Coroutines should yield futures, got %s" % repr(yielded)), None))
+            return
+        yielded.add_done_callback(self._wakeup)
+
+    def _wakeup(self, future):
+        if future._exc_info is not None:
+            self._loop.call_soon(self._step, None, future._exc_info)
+        else:
+            self._loop.call_soon(self._step, future._result, None)
+
+_loop = None
+_loop_lock = threading.Lock()
+
+def get_event_loop():
+    """
+    Get the default event loop, creating it if needed.
+    """
+    global _loop
+    _loop_lock.acquire()
+    try:
+        if _loop is None:
+            _loop = EventLoop()
+        return _loop
+    finally:
+        _loop_lock.release()
+
+def set_event_loop(loop):
+    global _loop
+    _loop = loop
+
+def coroutine(fn):
+    """
+    Decorator turning a generator function into one which returns a Future.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        result = fn(*args, **kwargs)
+        if hasattr(result, "send"):
+            return Task(result, get_event_loop())
+        future = Future()
+        future.set_result(result)
+        return future
+    return wrapper
+
+def run_in_executor(fn, *args, **kwargs):
+    return get_event_loop().run_in_executor(fn, *args, **kwargs)
+
+def sleep(delay, result=None):
+    """
+    :return: Future which is done after delay seconds
+    """
+    future = Future()
+    get_event_loop().call_later(delay, future.set_result, result)
+    return future
+
+def gather(*futures):
+    """
+    :return: Future of the list of results of futures, or of the first exception
+    """
+    combined = Future()
+    if not futures:
+        combined.set_result([])
+        return combined
+    pending = [len(futures)]
+    lock = threading.Lock()
+
+    def on_done(future):
+        lock.acquire()
+        try:
+            if combined.done():
+                return
+            if future._exc_info is not None:
+                combined.set_exc_info(future._exc_info)
+                return
+            pending[0] -= 1
+            finished = pending[0] == 0
+        finally:
+            lock.release()
+        if finished:
+            combined.set_result([f._result for f in futures])
+
+    for future in futures:
+        future.add_done_callback(on_done)
+    return combined
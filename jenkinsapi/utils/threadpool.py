@@ -0,0 +1,66 @@
+import sys
+import Queue
+import threading
+import logging
+
+log = logging.getLogger( __name__ )
+
+POLL_INTERVAL = 0.5
+
+def bounded_imap( fn, items, workers, ordered=True ):
+    """
+    Call fn on every item using at most workers threads, yielding the results.
+    In ordered mode results come back in the order of items, otherwise as soon
+    as each call completes. An exception raised by fn is re-raised here when its
+    result is due; closing the generator early stops the remaining work.
+    """
+    assert isinstance( workers, int ), "Workers should be a non-zero positive integer"
+    assert workers > 0, "Workers should be a non-zero positive integer"
+    items = list( items )
+    tasks = Queue.Queue()
+    for task in enumerate( items ):
+        tasks.put( task )
+    results = Queue.Queue()
+    stop = threading.Event()
+
+    def work():
+        while not stop.is_set():
+            try:
+                index, item = tasks.get_nowait()
+            except Queue.Empty:
+                return
+            try:
+                results.put( ( index, True, fn( item ) ) )
+            except Exception:
+                results.put( ( index, False, sys.exc_info() ) )
+
+    for _ in range( min( workers, len( items ) ) ):
+        thread = threading.Thread( target=work )
+        thread.daemon = True
+        thread.start()
+
+    def outcome( ok, value ):
+        if not ok:
+            raise value[0], value[1], value[2]
+        return value
+
+    try:
+        done = {}
+        next_index = 0
+        for _ in range( len( items ) ):
+            while True:
+                try:
+                    # A timeout keeps the wait interruptible by KeyboardInterrupt
+                    index, ok, value = results.get( True, POLL_INTERVAL )
+                    break
+                except Queue.Empty:
+                    pass
+            if not ordered:
+                yield outcome( ok, value )
+                continue
+            done[ index ] = ( ok, value )
+            while next_index in done:
+                yield outcome( *done.pop( next_index ) )
+                next_index += 1
+    finally:
+        stop.set()
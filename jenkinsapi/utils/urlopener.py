@@ -3,6 +3,8 @@ import base64
 
 import logging
 
+from jenkinsapi.utils.connectionpool import get_keepalive_handlers
+
 log = logging.getLogger( __name__ )
 
 class PreemptiveBasicAuthHandler(urllib2.BaseHandler):
@@ -27,10 +29,11 @@ class PreemptiveBasicAuthHandler(urllib2.BaseHandler):
         req.add_unredirected_header('Authorization', auth)
         return req
 
-def mkurlopener( jenkinsuser, jenkinspass, jenkinsurl, proxyhost, proxyport, proxyuser, proxypass ):
+def mkurlopener( jenkinsuser, jenkinspass, jenkinsurl, proxyhost, proxyport, proxyuser, proxypass, connection_pool=None ):
     """
      Creates an url opener that works with both jenkins auth and proxy auth
      If no values are provided for the jenkins or proxy vars, a regular opener is returned
+     If a connection pool is provided, connections are kept alive and reused through it
     :param jenkinsuser: username for jenkins, str
     :param jenkinspass: password for jenkins, str
     :param jenkinsurl: jenkins url, str
@@ -38,9 +41,10 @@ def mkurlopener( jenkinsuser, jenkinspass, jenkinsurl, proxyhost, proxyport, pro
     :param proxyport: proxy port, int
     :param proxyuser: proxy username, str
     :param proxypass: proxy password, str
+    :param connection_pool: ConnectionPool obj or None
     :return: urllib2.opener configured for auth
     """
-    handlers = []
+    handlers = get_keepalive_handlers(connection_pool)
     for handler in get_jenkins_auth_handler(jenkinsuser=jenkinsuser, jenkinspass=jenkinspass, jenkinsurl=jenkinsurl):
         handlers.append(handler)
     for handler in get_proxy_handler(proxyhost, proxyport, proxyuser, proxypass):
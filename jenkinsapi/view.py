@@ -4,18 +4,19 @@ import urllib
 
 class View(JenkinsBase):
 
-    def __init__(self, url, name, jenkins_obj):
+    def __init__(self, url, name, jenkins_obj, data=None):
         self.name = name
         self.jenkins_obj = jenkins_obj
-        JenkinsBase.__init__(self, url)
+        JenkinsBase.__init__(self, url, data=data)
 
     def __str__(self):
         return self.name
 
     def __getitem__(self, str_job_id ):
         assert isinstance( str_job_id, str )
-        api_url = self.python_api_url( self.get_job_url( str_job_id ) )
-        return Job( api_url, str_job_id, self.jenkins_obj )
+        url = self.get_job_url( str_job_id )
+        api_url = self.python_api_url( url )
+        return Job( api_url, str_job_id, self.jenkins_obj, data=self.get_summary({"name": str_job_id, "url": url}) )
 
     def keys(self):
         return self.get_job_dict().keys()
@@ -23,7 +24,7 @@ class View(JenkinsBase):
     def iteritems(self):
         for name, url in self.get_job_dict().iteritems():
             api_url = self.python_api_url( url )
-            yield name, Job( api_url, name, self.jenkins_obj )
+            yield name, Job( api_url, name, self.jenkins_obj, data=self.get_summary({"name": name, "url": url}) )
 
     def values(self):
         return [ a[1] for a in self.iteritems() ]
@@ -57,7 +58,8 @@ class View(JenkinsBase):
         return self.jenkins_obj
 
     def add_job(self, str_job_name):
-        if str_job_name in self.get_job_dict():
+        job_dict = self.get_job_dict()
+        if str_job_name in job_dict:
             return "Job %s has in View %s" %(str_job_name, self.name)
         elif not self.get_jenkins_obj().has_job(str_job_name):
             return "Job %s is not known - available: %s" % ( str_job_name, ", ".join(self.get_jenkins_obj().get_jobs_list()))
@@ -77,7 +79,7 @@ class View(JenkinsBase):
                 "Submit":"OK",
                 }
             data["name"] = self.name
-            for job in self.get_job_dict().keys():
+            for job in job_dict:
                 data[job]='on'
             data[str_job_name] = "on"
             data['json'] = data.copy()
@@ -0,0 +1,291 @@
+"""
+Waiting for builds and jobs to finish.
+
+Instead of polling every build in full at a fixed interval, a BuildWaiter
+checks the status of all the builds it watches with one tree-filtered request
+per folder of the watched jobs at each check, and schedules the next check of
+each build from how long Jenkins expects it to take (its timestamp and
+estimatedDuration): rarely while a build is far from done, often when it is
+about to finish, and backing off again once it overruns its estimate, or from
+the start if it has none.
+"""
+import time
+import threading
+import logging
+import urllib
+
+from jenkinsapi import config
+from jenkinsapi.exceptions import TimeOut, UnknownJob
+from jenkinsapi.utils.retry import retry_function
+from jenkinsapi.utils.eventloop import Future
+
+log = logging.getLogger(__name__)
+
+STATUS_FIELDS = "number,building,result,duration,timestamp,estimatedDuration"
+
+def get_check_interval(data, overdue_checks, min_interval, max_interval):
+    """
+    Seconds to wait before checking a build or job again
+    :param data: build data with timestamp and estimatedDuration, dict, or None if not started
+    :param overdue_checks: number of checks since the build overran its estimate, or since it
+                           started if it has none, see needs_backoff, int
+    :return: float
+    """
+    interval = None
+    if data is not None and data.get("estimatedDuration", -1) > 0:
+        remaining = (data["timestamp"] + data["estimatedDuration"]) / 1000.0 - time.time()
+        if remaining > 0:
+            # Halve the distance, so we check more often as the end approaches
+            interval = remaining / 2
+    if interval is None:
+        interval = min_interval * 2 ** min(overdue_checks, 10)
+    return max(min_interval, min(max_interval, interval))
+
+def needs_backoff(data):
+    """
+    Whether the estimate of a running build no longer tells when to check it,
+    as it overran it or has none. Checks should then back off.
+    :param data: build data with timestamp and estimatedDuration, dict
+    :return: bool
+    """
+    estimate = data.get("estimatedDuration")
+    if estimate is None or estimate <= 0 or data.get("timestamp") is None:
+        return True
+    return time.time() * 1000 > data["timestamp"] + estimate
+
+class Watch(object):
+    def __init__(self, build, future):
+        self.build = build
+        self.future = future
+        self.due = 0
+        self.overdue_checks = 0
+        self.started = time.time()
+
+class BuildWaiter(object):
+    """
+    Waits for any number of builds to finish, firing a Future for each.
+    Use wait() to block the calling thread until they are done, or start()
+    to wait in a background thread.
+    """
+    def __init__(self, jenkins, min_interval=config.WAIT_MIN_INTERVAL, max_interval=config.WAIT_MAX_INTERVAL,
+                 batch_builds=config.WAIT_BATCH_BUILDS):
+        """
+        :param jenkins: Jenkins obj
+        :param min_interval: shortest time between two checks of a build, seconds
+        :param max_interval: longest time between two checks of a build, seconds
+        :param batch_builds: number of most recent builds of each job fetched per check, int
+        """
+        self.jenkins = jenkins
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.batch_builds = batch_builds
+        self._watches = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._stopped = False
+
+    def watch(self, build, callback=None):
+        """
+        Start watching a build
+        :param build: Build obj
+        :param callback: called with the Build obj once it has finished
+        :return: Future of the finished Build obj
+        """
+        future = Future()
+        if callback is not None:
+            future.add_done_callback(lambda f: f.exception() is None and callback(f.result()))
+        self._lock.acquire()
+        try:
+            self._watches.append(Watch(build, future))
+        finally:
+            self._lock.release()
+        self._wakeup.set()
+        return future
+
+    def pending(self):
+        """
+        :return: the Build objs which have not finished yet
+        """
+        self._lock.acquire()
+        try:
+            return [w.build for w in self._watches]
+        finally:
+            self._lock.release()
+
+    def wait(self, timeout=None):
+        """
+        Block until every watched build has finished
+        :param timeout: seconds, raises TimeOut when exceeded
+        """
+        deadline = timeout and time.time() + timeout
+        while True:
+            self._lock.acquire()
+            try:
+                if not self._watches:
+                    return
+                next_due = min(w.due for w in self._watches)
+            finally:
+                self._lock.release()
+            now = time.time()
+            if deadline and now >= deadline:
+                raise TimeOut("Waited too long for these builds to complete: %s" %
+                              ", ".join(str(b) for b in self.pending()))
+            delay = next_due - now
+            if deadline:
+                delay = min(delay, deadline - now)
+            if delay > 0:
+                self._wakeup.clear()
+                self._wakeup.wait(delay)
+                continue
+            self.check()
+
+    def start(self):
+        """
+        Wait in a daemon thread, until stop() is called
+        """
+        def run():
+            while not self._stopped:
+                try:
+                    self.wait(timeout=self.max_interval)
+                except TimeOut:
+                    pass
+                except Exception, e:
+                    log.exception(e)
+                    time.sleep(self.min_interval)
+                self._wakeup.clear()
+                if not self._watches:
+                    self._wakeup.wait(self.max_interval)
+        self._stopped = False
+        self._thread = threading.Thread(target=run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+
+    def check(self):
+        """
+        Check every watched build that is due, with one request per folder where possible.
+        The request returns the status of the builds which are not due yet as
+        well, so those are finished early if they are done.
+        """
+        now = time.time()
+        self._lock.acquire()
+        try:
+            watches = list(self._watches)
+        finally:
+            self._lock.release()
+        if not [w for w in watches if w.due <= now]:
+            return
+        statuses = self._fetch_statuses(watches)
+        for w in watches:
+            build = w.build
+            data = statuses.get((build.job.baseurl, build.buildno))
+            if w.due > now:
+                if data is not None and not data["building"]:
+                    build._data.update(data)
+                    self._finish(w)
+                continue
+            if data is None:
+                # Not among the recent builds fetched in bulk, poll it alone
+                build.poll(tree=STATUS_FIELDS)
+                data = dict((k, build._data.get(k)) for k in STATUS_FIELDS.split(","))
+            else:
+                build._data.update(data)
+            if not data["building"]:
+                self._finish(w)
+                continue
+            if needs_backoff(data):
+                w.overdue_checks += 1
+            w.due = time.time() + get_check_interval(data, w.overdue_checks, self.min_interval, self.max_interval)
+            log.info("Waited %is for %s #%s to complete" % (time.time() - w.started, build.job.name, build.buildno))
+
+    def _finish(self, watch):
+        self._lock.acquire()
+        try:
+            self._watches.remove(watch)
+        finally:
+            self._lock.release()
+        watch.future.set_result(watch.build)
+
+    def _fetch_statuses(self, watches):
+        """
+        The builds of the watched jobs of a folder, or of the root, are fetched together
+        with one request on that folder, and those of a job alone in its folder with one
+        request on the job. Jobs are matched by their name in their folder.
+        :return: dict of (job url, buildnumber) to status data, for the recent builds of the watched jobs
+        """
+        folders = {}
+        for w in watches:
+            job = w.build.job
+            folder, name = split_job_url(job.baseurl)
+            folders.setdefault(folder, {})[name] = job
+        builds_tree = "builds[%s]{0,%i}" % (STATUS_FIELDS, self.batch_builds)
+        statuses = {}
+        for folder, jobs in folders.items():
+            if folder is None or len(jobs) == 1:
+                job_datas = []
+                for name, job in jobs.items():
+                    url = job.python_api_url(job.baseurl, tree=builds_tree)
+                    job_datas.append(dict(retry_function(job.RETRY_ATTEMPTS, job.get_data, url), name=name))
+            else:
+                url = self.jenkins.python_api_url(folder, tree="jobs[name,%s]" % builds_tree)
+                job_datas = retry_function(self.jenkins.RETRY_ATTEMPTS, self.jenkins.get_data, url).get("jobs", [])
+            for job_data in job_datas:
+                job = jobs.get(job_data.get("name"))
+                if job is None:
+                    continue
+                for build_data in job_data.get("builds") or []:
+                    statuses[(job.baseurl, build_data["number"])] = build_data
+        return statuses
+
+def split_job_url(url):
+    """
+    :param url: url of a job, str
+    :return: url of the folder holding the job, or of Jenkins for a top level job, and
+             the name of the job in it, (str, str), or (None, url) for an url of another shape
+    """
+    folder, sep, name = url.rstrip("/").rpartition("/job/")
+    if not sep:
+        return None, url
+    return folder + "/", urllib.unquote(name)
+
+def wait_for_jobs(jenkins, jobnames, maxwait, min_interval=config.WAIT_MIN_INTERVAL, max_interval=config.WAIT_MAX_INTERVAL):
+    """
+    Wait until none of the jobs is queued or running, checking all of them with one request each time.
+    :param jenkins: Jenkins obj
+    :param jobnames: names of top level jobs, [str]
+    :param maxwait: seconds to wait at most
+    :return: names of the jobs still queued or running when maxwait ran out, [str]
+    """
+    tree = "jobs[name,inQueue,lastBuild[%s]]" % STATUS_FIELDS
+    url = jenkins.python_api_url(jenkins.baseurl, tree=tree)
+    deadline = time.time() + maxwait
+    checks = 0
+    while True:
+        data = retry_function(jenkins.RETRY_ATTEMPTS, jenkins.get_data, url)
+        job_datas = dict((job["name"], job) for job in data.get("jobs", []))
+        still_running = []
+        interval = max_interval
+        for name in jobnames:
+            if name not in job_datas:
+                raise UnknownJob(name)
+            job = job_datas[name]
+            last_build = job.get("lastBuild")
+            if job.get("inQueue"):
+                still_running.append(name)
+                interval = min(interval, get_check_interval(None, checks, min_interval, max_interval))
+            elif last_build and last_build.get("building"):
+                still_running.append(name)
+                interval = min(interval, get_check_interval(last_build, checks, min_interval, max_interval))
+        if not still_running:
+            return []
+        time_left = deadline - time.time()
+        if time_left <= 0:
+            return still_running
+        log.warn("Waiting for jobs %s to complete. Will wait another %is" %
+                 (", ".join('"%s"' % a for a in still_running), time_left))
+        time.sleep(min(interval, time_left))
+        checks += 1
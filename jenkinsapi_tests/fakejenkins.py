@@ -0,0 +1,236 @@
+"""
+A stand-in Jenkins server for the tests.
+
+It serves JSON objects at <path>api/json/, applying tree= queries (nested
+fields and {M,N} ranges) the way Jenkins does, and any other path through
+a handler. Every request is recorded, so tests can count what a call costs.
+"BASE" in the served data is replaced by the url of the server.
+"""
+import BaseHTTPServer
+import SocketServer
+import hashlib
+import json
+import re
+import threading
+import unittest
+import urlparse
+
+from jenkinsapi.jenkins import Jenkins
+
+class Request(object):
+    def __init__(self, method, path, query, headers, body):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+        self.params = urlparse.parse_qs(query)
+
+    def __repr__(self):
+        return "<Request %s %s?%s>" % (self.method, self.path, self.query)
+
+def parse_tree(tree):
+    """
+    :return: list of (field, subtree or None, (start, end) or None)
+    """
+    fields = []
+    i = 0
+    while i < len(tree):
+        name = re.match(r"[\w*]+", tree[i:]).group(0)
+        i += len(name)
+        subtree = span = None
+        if i < len(tree) and tree[i] == "[":
+            depth, j = 0, i
+            while True:
+                depth += {"[": 1, "]": -1}.get(tree[j], 0)
+                if not depth:
+                    break
+                j += 1
+            subtree, i = tree[i + 1:j], j + 1
+        if i < len(tree) and tree[i] == "{":
+            j = tree.index("}", i)
+            span = tuple(int(n) for n in tree[i + 1:j].split(","))
+            i = j + 1
+        fields.append((name, subtree, span))
+        if i < len(tree) and tree[i] == ",":
+            i += 1
+    return fields
+
+def apply_tree(data, tree):
+    if isinstance(data, list):
+        return [apply_tree(item, tree) for item in data]
+    if not isinstance(data, dict):
+        return data
+    found = {}
+    for name, subtree, span in parse_tree(tree):
+        names = data.keys() if name == "*" else [name]
+        for key in names:
+            if key not in data:
+                continue
+            value = data[key]
+            if span is not None and isinstance(value, list):
+                value = value[span[0]:span[1]]
+            if subtree is not None:
+                value = apply_tree(value, subtree)
+            found[key] = value
+    return found
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Send the headers and body together, an unbuffered write of each stalls keep-alive requests on delayed ACKs
+    wbufsize = -1
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+        self.server.jenkins.connections += 1
+
+    def _handle(self):
+        path, _, query = self.path.partition("?")
+        length = int(self.headers.getheader("Content-Length") or 0)
+        request = Request(self.command, path, query, self.headers, self.rfile.read(length) if length else "")
+        body, status, headers = self.server.jenkins.respond(request)
+        if status == "drop":
+            # Close the connection without a response
+            self.close_connection = 1
+            return
+        self.send_response(status)
+        for name, value in headers.items():
+            if value is not None:
+                self.send_header(name, value)
+        if headers.get("Content-Length", "") is None:
+            # No length, the end of the body is the end of the connection
+            self.close_connection = 1
+        elif "Content-Length" in headers:
+            # A body shorter than its length is cut short: the connection is closed after it
+            self.close_connection = int(headers["Content-Length"]) > len(body)
+        else:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _handle
+
+class Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+class FakeJenkins(object):
+    """
+    Objects are set by path, e.g. objects["/job/foo/"] = {...}, or as a function
+    returning the data. Handlers are set by path too and get a Request, returning
+    a body, or (body, status, headers). A Content-Length header larger than the
+    body cuts the response short, and a None one sends the body without a length.
+    """
+    def __init__(self, etags=False):
+        """
+        :param etags: send ETags and answer matching conditional requests with 304, bool
+        """
+        self.objects = {"/": {"jobs": [], "views": []}}
+        self.handlers = {}
+        self.requests = []
+        self.connections = 0
+        self.etags = etags
+        self._lock = threading.Lock()
+        self.server = Server(("127.0.0.1", 0), Handler)
+        self.server.jenkins = self
+        self.url = "http://127.0.0.1:%i" % self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, args=(0.01,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def respond(self, request):
+        self._lock.acquire()
+        try:
+            self.requests.append(request)
+        finally:
+            self._lock.release()
+        if request.path in self.handlers:
+            result = self.handlers[request.path](request)
+            if isinstance(result, basestring):
+                return result, 200, {}
+            return result
+        key = request.path.split("api/json")[0]
+        if request.path.endswith(("api/json", "api/json/")) and key in self.objects:
+            data = self.objects[key]
+            if callable(data):
+                data = data()
+            body = json.dumps(data).replace("BASE", self.url)
+            if "tree" in request.params:
+                body = json.dumps(apply_tree(json.loads(body), request.params["tree"][0]))
+            headers = {"Content-Type": "application/json"}
+            if self.etags:
+                etag = '"%s"' % hashlib.md5(body).hexdigest()
+                headers["ETag"] = etag
+                if request.headers.getheader("If-None-Match") == etag:
+                    return "", 304, headers
+            return body, 200, headers
+        return "Not found", 404, {}
+
+    def get_paths(self, method=None):
+        return [r.path + ("?" + r.query if r.query else "") for r in self.requests
+                if method is None or r.method == method]
+
+    def reset(self):
+        del self.requests[:]
+
+    def add_job(self, name, builds=(), **fields):
+        """
+        Serve a job and its builds, builds being data from build_data
+        :return: the job data, dict
+        """
+        builds = sorted(builds, key=lambda b: b["number"], reverse=True)
+        ref = lambda b: b and {"number": b["number"], "url": b["url"]}
+        last = builds[0] if builds else None
+        finished = [b for b in builds if not b["building"]]
+        job = {"name": name, "url": "BASE/job/%s/" % name, "color": "blue", "description": "",
+               "displayName": name, "buildable": True, "inQueue": False,
+               "nextBuildNumber": last["number"] + 1 if last else 1,
+               "builds": builds[:100], "allBuilds": builds,
+               "firstBuild": ref(builds[-1] if builds else None), "lastBuild": ref(last),
+               "lastCompletedBuild": ref(finished[0] if finished else None),
+               "lastSuccessfulBuild": ref(finished[0] if finished else None), "lastFailedBuild": None,
+               "upstreamProjects": [], "downstreamProjects": [], "actions": [], "healthReport": []}
+        job.update(fields)
+        self.objects["/job/%s/" % name] = job
+        for build in builds:
+            self.objects["/job/%s/%i/" % (name, build["number"])] = build
+        self.objects["/"]["jobs"].append(dict((key, job[key]) for key in
+                                              ("name", "url", "color", "upstreamProjects", "downstreamProjects")))
+        return job
+
+def build_data(job, number, building=False, result="SUCCESS", timestamp=None, revision=None, artifacts=(),
+               **fields):
+    """
+    :return: the data of a build of an svn job, dict
+    """
+    data = {"number": number, "url": "BASE/job/%s/%i/" % (job, number),
+            "fullDisplayName": "%s #%i" % (job, number), "building": building,
+            "result": None if building else result, "duration": 10, "estimatedDuration": 100,
+            "timestamp": timestamp if timestamp is not None else 1000 * number,
+            "artifacts": [{"fileName": name, "relativePath": "out/" + name} for name in artifacts],
+            "actions": [{"causes": [{"shortDescription": "Started by user"}]}],
+            "changeSet": {"kind": "svn", "items": [],
+                          "revisions": [{"module": "trunk", "revision": revision or number * 10}]}}
+    data.update(fields)
+    return data
+
+class JenkinsTestCase(unittest.TestCase):
+    """
+    Runs each test against a new FakeJenkins
+    """
+    ETAGS = False
+
+    def setUp(self):
+        self.server = FakeJenkins(etags=self.ETAGS)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def get_jenkins(self, **kwargs):
+        return Jenkins(self.server.url, **kwargs)
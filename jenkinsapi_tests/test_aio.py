@@ -0,0 +1,69 @@
+import time
+
+from jenkinsapi import aio, config
+from jenkinsapi.aio import AsyncJenkins
+from jenkinsapi.utils.eventloop import Future, get_event_loop, gather
+from jenkinsapi_tests.fakejenkins import JenkinsTestCase, build_data
+
+class TestAsync(JenkinsTestCase):
+    def setUp(self):
+        JenkinsTestCase.setUp(self)
+        self.min_interval = config.WAIT_MIN_INTERVAL
+        config.WAIT_MIN_INTERVAL = 0.01
+        self.loop = get_event_loop()
+
+    def tearDown(self):
+        config.WAIT_MIN_INTERVAL = self.min_interval
+        JenkinsTestCase.tearDown(self)
+
+    def run_async(self, future):
+        return self.loop.run_until_complete(future, timeout=10)
+
+    def get_job(self, name):
+        ajenkins = self.run_async(AsyncJenkins.create(self.server.url))
+        return self.run_async(ajenkins.get_job(name))
+
+    def test_iter_builds_of_lazy_job(self):
+        self.server.add_job("foo", [build_data("foo", n) for n in range(1, 21)])
+        ajob = self.get_job("foo")
+        builds = self.run_async(gather(*ajob.iter_builds()))
+        self.assertEqual([b.obj.buildno for b in builds], range(20, 0, -1))
+        self.assertEqual([b.get_revision() for b in builds], [n * 10 for n in range(20, 0, -1)])
+
+    def test_block_until_complete(self):
+        self.server.add_job("foo", [build_data("foo", 1, building=True, timestamp=0)])
+        polls = []
+        def build():
+            polls.append(1)
+            return build_data("foo", 1, building=len(polls) < 4, timestamp=0)
+        self.server.objects["/job/foo/1/"] = build
+        ajob = self.get_job("foo")
+        abuild = self.run_async(ajob.get_build(1))
+        started = time.time()
+        self.run_async(abuild.block_until_complete(delay=0.05))
+        self.assertFalse(abuild.obj._data["building"])
+        self.assertEqual(abuild.obj._data["result"], "SUCCESS")
+        self.assertTrue(time.time() - started < 5)
+
+    def test_block_until_complete_backs_off_without_estimate(self):
+        polls = []
+        def build():
+            polls.append(1)
+            return build_data("foo", 1, building=len(polls) < 6, estimatedDuration=-1)
+        self.server.add_job("foo", [build_data("foo", 1, building=True)])
+        self.server.objects["/job/foo/1/"] = build
+        abuild = self.run_async(self.get_job("foo").get_build(1))
+        config.WAIT_MIN_INTERVAL = 1
+        del polls[:]
+        delays = []
+        def sleep(delay):
+            delays.append(delay)
+            future = Future()
+            future.set_result(None)
+            return future
+        aio.sleep, original_sleep = sleep, aio.sleep
+        try:
+            self.run_async(abuild.block_until_complete(delay=10))
+        finally:
+            aio.sleep = original_sleep
+        self.assertEqual(delays, [2, 4, 8, 10, 10])
@@ -0,0 +1,127 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from jenkinsapi.artifact import save_artifacts
+from jenkinsapi.utils import retry
+from jenkinsapi.utils.downloader import PART_SUFFIX
+from jenkinsapi_tests.fakejenkins import JenkinsTestCase, build_data
+
+def fingerprint_data(filename, content, job, number):
+    return {"fileName": filename, "hash": hashlib.md5(content).hexdigest(), "original": {"name": job, "number": number},
+            "usage": [{"name": job, "ranges": {"ranges": [{"start": number, "end": number + 1}]}}]}
+
+class TestArtifact(JenkinsTestCase):
+    def setUp(self):
+        JenkinsTestCase.setUp(self)
+        self.path = tempfile.mkdtemp()
+        self.contents = {"a.zip": "a" * 5000, "b.txt": "b" * 300}
+        fingerprints = [fingerprint_data(name, content, "foo", 1) for name, content in self.contents.items()]
+        self.server.add_job("foo", [build_data("foo", 1, artifacts=sorted(self.contents), fingerprint=fingerprints)])
+        # Served without a length, e.g. through a proxy
+        self.no_length = False
+        for name in self.contents:
+            self.server.handlers["/job/foo/1/artifact/out/%s" % name] = self.get_handler(name)
+        self.build = self.get_jenkins().get_job("foo").get_build(1)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+        JenkinsTestCase.tearDown(self)
+
+    def get_handler(self, name):
+        def serve(request):
+            content = self.contents[name]
+            return content, 200, {"Content-Length": None if self.no_length else str(len(content))}
+        return serve
+
+    def read(self, path):
+        f = open(path, "rb")
+        try:
+            return f.read()
+        finally:
+            f.close()
+
+    def test_unknown_length_checked_against_the_fingerprints(self):
+        self.no_length = True
+        artifact = self.build.get_artifact_dict()["a.zip"]
+        fspath = os.path.join(self.path, "a.zip")
+        fingerprints = self.build.get_fingerprints()
+        self.server.reset()
+        self.assertEqual(artifact.save(fspath, fingerprints=fingerprints), fspath)
+        self.assertEqual(self.read(fspath), self.contents["a.zip"])
+        # The download alone, checked once
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_unknown_length_and_wrong_content(self):
+        self.no_length = True
+        artifact = self.build.get_artifact_dict()["a.zip"]
+        fingerprints = self.build.get_fingerprints()
+        self.contents["a.zip"] = "a" * 3000
+        fspath = os.path.join(self.path, "a.zip")
+        self.assertRaises(IOError, artifact.save, fspath, fingerprints=fingerprints)
+        self.assertFalse(os.path.exists(fspath))
+        self.assertTrue(os.path.exists(fspath + PART_SUFFIX))
+
+    def get_targets(self):
+        return [(artifact, os.path.join(self.path, name)) for name, artifact in sorted(self.build.get_artifact_dict().items())]
+
+    def get_fingerprint_requests(self):
+        return [r for r in self.server.requests if "fingerprint" in r.query or r.path.startswith("/fingerprint/")]
+
+    def test_save_artifacts(self):
+        totals = []
+        self.server.reset()
+        paths = save_artifacts(self.get_targets(), parallel=2, total_progress=lambda done, total: totals.append(done))
+        self.assertEqual([self.read(path) for path in paths], [self.contents["a.zip"], self.contents["b.txt"]])
+        self.assertEqual(len(self.get_fingerprint_requests()), 1)
+        self.assertEqual(totals[-1], 5300)
+
+    def test_md5_computed_while_downloading(self):
+        def md5sum(*args):
+            raise AssertionError("The download was read back")
+        targets = self.get_targets()
+        for artifact, _ in targets:
+            artifact._md5sum = md5sum
+        save_artifacts(targets)
+        self.assertFalse([name for name in os.listdir(self.path) if name.endswith(PART_SUFFIX)])
+
+    def test_save_artifacts_without_fingerprints(self):
+        targets = self.get_targets()
+        sleep_time = retry.DEFAULT_SLEEP_TIME
+        retry.DEFAULT_SLEEP_TIME = 0
+        self.server.handlers["/job/foo/1/api/json/"] = lambda request: ("Server error", 500, {})
+        # Each file is then checked against its own fingerprint
+        for name, content in self.contents.items():
+            data = fingerprint_data(name, content, "foo", 1)
+            self.server.objects["/fingerprint/%s/" % data["hash"]] = data
+        self.server.reset()
+        try:
+            paths = save_artifacts(targets)
+        finally:
+            retry.DEFAULT_SLEEP_TIME = sleep_time
+        self.assertEqual([self.read(path) for path in paths], [self.contents["a.zip"], self.contents["b.txt"]])
+        self.assertEqual(sorted(r.path.split("/")[1] for r in self.get_fingerprint_requests()),
+                         ["fingerprint", "fingerprint", "job"])
+
+    def test_verify_artifacts(self):
+        self.server.reset()
+        md5s = {"a.zip": hashlib.md5(self.contents["a.zip"]).hexdigest(), "b.txt": hashlib.md5("changed").hexdigest()}
+        self.assertEqual(self.build.verify_artifacts(md5s), {"a.zip": True, "b.txt": False})
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_get_fingerprints(self):
+        fingerprints = self.build.get_fingerprints()
+        self.assertEqual(sorted(fp["fileName"] for fp in fingerprints.values()), ["a.zip", "b.txt"])
+        self.assertEqual(fingerprints[hashlib.md5(self.contents["b.txt"]).hexdigest()]["original"],
+                         {"name": "foo", "number": 1})
+
+    def test_up_to_date_copy_is_not_downloaded(self):
+        fspath = os.path.join(self.path, "b.txt")
+        f = open(fspath, "wb")
+        f.write(self.contents["b.txt"])
+        f.close()
+        self.server.reset()
+        artifact = self.build.get_artifact_dict()["b.txt"]
+        artifact.save(fspath, fingerprints=self.build.get_fingerprints())
+        self.assertFalse([r for r in self.server.requests if "/artifact/" in r.path])
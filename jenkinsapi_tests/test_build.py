@@ -0,0 +1,110 @@
+from jenkinsapi.build import Build
+from jenkinsapi_tests.fakejenkins import JenkinsTestCase, build_data
+
+def pipeline_build_data(job, number, sha, change_sets=None):
+    """
+    :return: the data of a build of a pipeline job, which has changeSets instead of a changeSet, dict
+    """
+    data = build_data(job, number, actions=[{}, {"buildsByBranchName": {"origin/HEAD": {"revision": {"SHA1": sha}}}}],
+                      changeSets=change_sets if change_sets is not None else [{"kind": "git", "items": []}])
+    del data["changeSet"]
+    return data
+
+class TestRevisionFromData(JenkinsTestCase):
+    def test_svn(self):
+        data = build_data("foo", 1)
+        data["changeSet"]["revisions"].append({"module": "branch", "revision": 42})
+        self.assertEqual(Build.vcs_from_data(data), "svn")
+        self.assertEqual(Build.revision_from_data(data), 42)
+
+    def test_pipeline(self):
+        data = pipeline_build_data("foo", 1, "abc")
+        self.assertEqual(Build.vcs_from_data(data), "git")
+        self.assertEqual(Build.revision_from_data(data), "abc")
+
+    def test_pipeline_without_changes(self):
+        data = pipeline_build_data("foo", 1, "abc", change_sets=[])
+        self.assertEqual(Build.vcs_from_data(data), None)
+        self.assertEqual(Build.revision_from_data(data), "abc")
+
+    def test_multiple_scm(self):
+        data = pipeline_build_data("foo", 1, "abc", change_sets=[
+            {"kind": None, "items": []},
+            {"kind": "hg", "items": [{"date": "10.0-7200", "node": "old"}]},
+            {"kind": "hg", "items": [{"date": "20.0-7200", "node": "new"}]}])
+        self.assertEqual(Build.vcs_from_data(data), "hg")
+        self.assertEqual(Build.revision_from_data(data), "new")
+
+    def test_no_change_set(self):
+        data = build_data("foo", 1, actions=[])
+        del data["changeSet"]
+        self.assertEqual(Build.revision_from_data(data), None)
+
+    def test_build_history_of_pipeline(self):
+        self.server.add_job("foo", [pipeline_build_data("foo", n, "sha%i" % n) for n in range(1, 4)])
+        job = self.get_jenkins().get_job("foo")
+        history = list(job.get_build_history())
+        self.assertEqual([record.number for record in history], [3, 2, 1])
+        self.assertEqual([record.revision for record in history], ["sha3", "sha2", "sha1"])
+        self.assertEqual(job.get_build(2).get_revision(), "sha2")
+
+class TestConsole(JenkinsTestCase):
+    def setUp(self):
+        JenkinsTestCase.setUp(self)
+        self.server.add_job("foo", [build_data("foo", 1, building=True)])
+        self.build = self.get_jenkins().get_job("foo").get_build(1)
+        self.log = ""
+        self.complete = False
+        # Sizes the next responses are cut to
+        self.cuts = []
+        self.server.handlers["/job/foo/1/logText/progressiveText"] = self.serve_log
+
+    def serve_log(self, request):
+        start = int(request.params["start"][0])
+        body = self.log[start:]
+        headers = {"X-Text-Size": str(len(self.log)), "Content-Length": str(len(body))}
+        if not self.complete:
+            headers["X-More-Data"] = "true"
+        if self.cuts:
+            body = body[:self.cuts.pop(0)]
+        return body, 200, headers
+
+    def get_starts(self):
+        return [int(r.params["start"][0]) for r in self.server.requests if r.path.endswith("progressiveText")]
+
+    def test_lines(self):
+        self.log = "one\ntwo\n\nthree"
+        self.complete = True
+        self.assertEqual(list(self.build.stream_console(chunk_size=2)), ["one\n", "two\n", "\n", "three"])
+        self.assertEqual(self.build.get_console(), self.log)
+
+    def test_tail(self):
+        self.log = "one\ntw"
+        def read():
+            for line in self.build.stream_console(tail=True, chunk_size=3, interval=0):
+                yield line
+                if line == "one\n":
+                    self.log += "o\nthree\n"
+                    self.complete = True
+        self.assertEqual(list(read()), ["one\n", "two\n", "three\n"])
+        self.assertEqual(self.get_starts(), [0, 6])
+
+    def test_long_line(self):
+        self.log = "x" * 25 + "\nend\n"
+        self.complete = True
+        lines = list(self.build.stream_console(chunk_size=4, max_line=10))
+        self.assertEqual(lines, ["x" * 12, "x" * 12, "x\n", "end\n"])
+
+    def test_resume_cut_response(self):
+        self.log = "".join("line %i\n" % i for i in range(100))
+        self.complete = True
+        self.cuts = [100, 7]
+        self.assertEqual(self.build.get_console(), self.log)
+        self.assertEqual(self.get_starts(), [0, 100, 107])
+
+    def test_resume_gives_up(self):
+        self.log = "one\ntwo\n"
+        self.complete = True
+        self.cuts = [0] * self.build.RETRY_ATTEMPTS
+        self.assertRaises(IOError, self.build.get_console)
+        self.assertEqual(len(self.get_starts()), self.build.RETRY_ATTEMPTS)
@@ -0,0 +1,71 @@
+from jenkinsapi.build_graph import BuildRef
+from jenkinsapi_tests.fakejenkins import JenkinsTestCase, build_data
+
+def caused_by(job, numbers):
+    return [{"causes": [{"upstreamProject": job, "upstreamBuild": number, "upstreamUrl": "job/%s/" % job}
+                        for number in numbers]}]
+
+def fingerprint(job, number):
+    return [{"usage": [{"name": job, "ranges": {"ranges": [{"start": number, "end": number + 1}]}}]}]
+
+class TestBuildGraph(JenkinsTestCase):
+    def get_graph(self, jobname, number, **kwargs):
+        jenkins = self.get_jenkins()
+        build = jenkins.get_job(jobname).get_build(number)
+        self.server.reset()
+        return jenkins.get_build_graph(build, **kwargs)
+
+    def test_pipeline(self):
+        # a -> b -> c, each build of a job triggering the build of the same number of the next
+        stages = ["a", "b", "c"]
+        for i, job in enumerate(stages):
+            builds = []
+            for number in range(1, 4):
+                fields = {}
+                if i > 0:
+                    fields["actions"] = caused_by(stages[i - 1], [number])
+                if i < len(stages) - 1:
+                    fields["fingerprint"] = fingerprint(stages[i + 1], number)
+                builds.append(build_data(job, number, **fields))
+            links = {"upstreamProjects": [{"name": stages[i - 1]}] if i > 0 else [],
+                     "downstreamProjects": [{"name": stages[i + 1]}] if i < len(stages) - 1 else []}
+            self.server.add_job(job, builds, **links)
+        graph = self.get_graph("b", 2)
+        self.assertEqual(sorted(graph.builds), [BuildRef("a", 2), BuildRef("b", 2), BuildRef("c", 2)])
+        self.assertEqual(graph.get_upstream(BuildRef("b", 2)), [BuildRef("a", 2)])
+        self.assertEqual(graph.get_downstream(BuildRef("b", 2)), [BuildRef("c", 2)])
+        self.assertEqual(graph.get_roots(), [BuildRef("a", 2)])
+        self.assertEqual(graph.get_leaves(), [BuildRef("c", 2)])
+        # b #2, the job graph, then a #2 and c #2
+        self.assertEqual(len(self.server.requests), 4)
+
+    def test_builds_of_a_job_are_fetched_together(self):
+        self.server.add_job("up", [build_data("up", n) for n in range(3, 41)])
+        upstream = range(3, 11) + [35, 2]
+        self.server.add_job("down", [build_data("down", 1, actions=caused_by("up", upstream))])
+        graph = self.get_graph("down", 1)
+        found = [BuildRef("up", n) for n in range(3, 11) + [35]]
+        self.assertEqual(graph.get_upstream(BuildRef("down", 1)), sorted(found + [BuildRef("up", 2)]))
+        self.assertEqual(sorted(graph.builds), sorted(found + [BuildRef("down", 1)]))
+        self.assertEqual(graph.get_data(BuildRef("up", 35))["url"], "%s/job/up/35/" % self.server.url)
+        # down #1, the last build of up, a range for #35 and one for #3 to #10,
+        # and up #2 alone, which is gone
+        paths = self.server.get_paths()
+        self.assertEqual(len(paths), 5)
+        self.assertEqual(len([p for p in paths if "allBuilds" in p]), 2)
+        self.assertEqual([p for p in paths if "allBuilds%5Bnumber%5D" in p or "allBuilds[number]" in p], [])
+
+    def test_builds_behind_deleted_ones(self):
+        self.server.add_job("up", [build_data("up", n) for n in range(1, 41) if n != 30])
+        upstream = [5, 6, 7, 35, 36]
+        self.server.add_job("down", [build_data("down", 1, actions=caused_by("up", upstream))])
+        graph = self.get_graph("down", 1)
+        self.assertEqual(sorted(graph.builds), sorted([BuildRef("up", n) for n in upstream] + [BuildRef("down", 1)]))
+        for number in upstream:
+            self.assertEqual(graph.get_data(BuildRef("up", number))["number"], number)
+        # down #1, the last build of up, a range for #35 and #36 and one which is off by
+        # one build for #5 to #7, then #7 alone, which was not in that range
+        paths = self.server.get_paths()
+        self.assertEqual(len(paths), 5)
+        self.assertTrue(paths[-1].startswith("/job/up/7/"))
+        self.assertEqual(len([p for p in paths if "allBuilds" in p]), 2)
@@ -0,0 +1,171 @@
+import os
+import shutil
+import tempfile
+
+from jenkinsapi.artifact_index import ArtifactIndex
+from jenkinsapi.revision_index import RevisionIndex
+from jenkinsapi_tests.fakejenkins import JenkinsTestCase, build_data
+from jenkinsapi_tests.test_build import pipeline_build_data
+
+def delete_builds(server, jobname, numbers):
+    job = server.objects["/job/%s/" % jobname]
+    for key in ("builds", "allBuilds"):
+        job[key] = [b for b in job[key] if b["number"] not in numbers]
+    job["firstBuild"] = {"number": job["allBuilds"][-1]["number"]}
+    job["lastBuild"] = {"number": job["allBuilds"][0]["number"]}
+
+def add_build(server, jobname, data):
+    job = server.objects["/job/%s/" % jobname]
+    server.objects["/job/%s/%i/" % (jobname, data["number"])] = data
+    for key in ("builds", "allBuilds"):
+        job[key].insert(0, data)
+    job["lastBuild"] = {"number": data["number"]}
+
+class TestArtifactIndex(JenkinsTestCase):
+    def setUp(self):
+        JenkinsTestCase.setUp(self)
+        self.path = tempfile.mkdtemp()
+        builds = [build_data("foo", n, artifacts=["foo-%i.zip" % n, "common.txt"]) for n in range(1, 11)]
+        builds.append(build_data("foo", 11, building=True))
+        self.server.add_job("foo", builds)
+        self.job = self.get_jenkins().get_job("foo")
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+        JenkinsTestCase.tearDown(self)
+
+    def delete_builds(self, numbers):
+        delete_builds(self.server, "foo", numbers)
+
+    def finish_build(self, number):
+        build = self.server.objects["/job/foo/%i/" % number]
+        build.update(building=False, result="SUCCESS",
+                     artifacts=[{"fileName": "foo-%i.zip" % number, "relativePath": "out/foo-%i.zip" % number}])
+
+    def test_refresh(self):
+        index = ArtifactIndex(self.job, page_size=4)
+        self.assertEqual(index.refresh(), 10)
+        self.assertEqual(index.find("common.txt"), range(10, 0, -1))
+        self.assertEqual(index.find("out/foo-3.zip"), [3])
+        self.assertEqual(index.pending, set([11]))
+        self.finish_build(11)
+        self.server.reset()
+        self.assertEqual(index.refresh(), 1)
+        self.assertEqual(index.find("foo-11.zip"), [11])
+        self.assertEqual(index.pending, set())
+        # The state of the history, and a page of new builds
+        self.assertEqual(len(self.server.requests), 2)
+        self.server.reset()
+        self.assertEqual(index.refresh(), 0)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertFalse("allBuilds[number]&" in self.server.get_paths()[0] + "&")
+
+    def test_refresh_cost(self):
+        index = ArtifactIndex(self.job, page_size=4)
+        index.refresh()
+        self.finish_build(11)
+        for number in range(12, 14):
+            add_build(self.server, "foo", build_data("foo", number, artifacts=["foo-%i.zip" % number]))
+        self.server.reset()
+        self.assertEqual(index.refresh(), 3)
+        # The state, then one page, whatever the length of the history
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(index.find("foo-13.zip"), [13])
+
+    def test_discarded_builds_are_dropped(self):
+        index = ArtifactIndex(self.job)
+        index.refresh()
+        self.delete_builds(set([1, 2, 5, 11]))
+        self.server.reset()
+        self.assertEqual(index.refresh(), 0)
+        # The state, the running build which is gone, and the numbers of all the builds
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(sorted(index.builds), [3, 4, 6, 7, 8, 9, 10])
+        self.assertEqual(index.find("common.txt"), [10, 9, 8, 7, 6, 4, 3])
+        self.assertEqual(index.find("foo-5.zip"), [])
+        self.assertEqual(index.find_all(["foo-2.zip", "common.txt"]), [])
+        self.assertEqual(index.pending, set())
+
+    def test_deleted_build_among_new_ones(self):
+        index = ArtifactIndex(self.job, page_size=4)
+        index.refresh()
+        self.finish_build(11)
+        self.delete_builds(set([5]))
+        add_build(self.server, "foo", build_data("foo", 12))
+        self.assertEqual(index.refresh(), 2)
+        self.assertEqual(sorted(index.builds), [1, 2, 3, 4, 6, 7, 8, 9, 10, 11, 12])
+
+    def test_oldest_build_deleted(self):
+        index = ArtifactIndex(self.job)
+        index.refresh()
+        self.finish_build(11)
+        index.refresh()
+        self.delete_builds(set([1]))
+        self.server.reset()
+        index.refresh()
+        self.assertEqual(sorted(index.builds), range(2, 12))
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_saved_index_is_pruned(self):
+        path = os.path.join(self.path, "foo.index")
+        ArtifactIndex(self.job, path).refresh()
+        self.delete_builds(set([3]))
+        index = ArtifactIndex(self.job, path)
+        self.assertEqual(index.find("foo-3.zip"), [3])
+        index.refresh()
+        self.assertEqual(index.find("foo-3.zip"), [])
+        self.assertEqual(ArtifactIndex(self.job, path).find("foo-3.zip"), [])
+
+class TestRevisionIndex(JenkinsTestCase):
+    def get_index(self, builds):
+        self.server.add_job("foo", builds)
+        index = RevisionIndex(self.get_jenkins().get_job("foo"))
+        index.refresh()
+        return index
+
+    def test_refresh_cost(self):
+        index = self.get_index([build_data("foo", n, revision=100 + n) for n in range(1, 301)])
+        self.server.reset()
+        self.assertEqual(index.refresh(), 0)
+        # One small request, not a page of builds nor all their numbers
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertFalse("revision" in self.server.get_paths()[0])
+        add_build(self.server, "foo", build_data("foo", 301, revision=500))
+        self.server.reset()
+        self.assertEqual(index.refresh(), 1)
+        self.assertEqual(index.find(500), [301])
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_svn(self):
+        index = self.get_index([build_data("foo", n, revision=100 + n // 2) for n in range(1, 7)])
+        self.assertEqual(index.get_vcs(), "svn")
+        self.assertEqual(index.find(102), [5, 4])
+        self.assertEqual(index.find("103"), [6])
+        self.assertEqual(index.get_revision(1), 100)
+
+    def test_svn_builds_without_changes(self):
+        builds = [build_data("foo", n, revision=100 + n) for n in range(1, 4)]
+        # Jenkins gives builds without changes an empty change set, with no kind
+        builds.append(build_data("foo", 4, changeSet={"kind": None, "items": []}))
+        index = self.get_index(builds)
+        self.assertEqual(index.get_vcs(), "svn")
+        self.assertEqual(index.find("103"), [3])
+        self.assertFalse([p for p in self.server.get_paths() if p.endswith("config.xml")])
+
+    def test_vcs_from_the_configuration(self):
+        index = self.get_index([build_data("foo", n, changeSet={"kind": None, "items": []}) for n in range(1, 3)])
+        calls = []
+        def get_vcs():
+            # Job.get_vcs parses the configuration, read with lxml
+            calls.append(1)
+            return "svn"
+        index.job.get_vcs = get_vcs
+        self.assertEqual(index.get_vcs(), "svn")
+        self.assertEqual(index.find("1"), [])
+        self.assertEqual(len(calls), 1)
+
+    def test_pipeline(self):
+        index = self.get_index([pipeline_build_data("foo", n, "sha%i" % (n % 3)) for n in range(1, 7)])
+        self.assertEqual(index.get_vcs(), "git")
+        self.assertEqual(index.find("sha1"), [4, 1])
+        self.assertEqual(index.get_revision_dict()["sha0"], [6, 3])
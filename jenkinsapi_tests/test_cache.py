@@ -0,0 +1,44 @@
+from jenkinsapi.utils.cache import ResponseCache
+from jenkinsapi_tests.fakejenkins import JenkinsTestCase, build_data
+
+class TestResponseCache(JenkinsTestCase):
+    ETAGS = True
+
+    def get_job(self, ttl):
+        self.server.add_job("foo", [build_data("foo", 1)])
+        self.cache = ResponseCache(ttls={"Job": ttl})
+        jenkins = self.get_jenkins(response_cache=self.cache)
+        job = jenkins.get_job("foo")
+        url = job.python_api_url(job.baseurl)
+        job.get_data(url)
+        return job, url
+
+    def test_fresh_hit(self):
+        job, url = self.get_job(60)
+        self.server.reset()
+        job.get_data(url)["builds"].append("junk")
+        self.assertEqual(len(job.get_data(url)["builds"]), 1)
+        self.assertEqual(self.server.get_paths(), [])
+        self.assertEqual(self.cache.stats()["hits"], 2)
+
+    def test_revalidation(self):
+        job, url = self.get_job(0)
+        self.server.reset()
+        data = job.get_data(url)
+        self.assertEqual(self.cache.stats()["revalidations"], 1)
+        data["builds"].append("junk")
+        data["name"] = "bar"
+        data = job.get_data(url)
+        self.assertEqual(self.cache.stats()["revalidations"], 2)
+        self.assertEqual(data["name"], "foo")
+        self.assertEqual(len(data["builds"]), 1)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertTrue(all(r.headers.getheader("If-None-Match") for r in self.server.requests))
+
+    def test_changed_object_is_fetched_again(self):
+        job, url = self.get_job(0)
+        misses = self.cache.stats()["misses"]
+        self.server.objects["/job/foo/"]["description"] = "changed"
+        self.assertEqual(job.get_data(url)["description"], "changed")
+        self.assertEqual(self.cache.stats()["revalidations"], 0)
+        self.assertEqual(self.cache.stats()["misses"], misses + 1)
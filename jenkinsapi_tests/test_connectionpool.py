@@ -0,0 +1,48 @@
+import unittest
+import urllib2
+
+from jenkinsapi.utils.connectionpool import ConnectionPool, get_keepalive_handlers
+from jenkinsapi_tests.fakejenkins import FakeJenkins
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeJenkins()
+        self.pool = ConnectionPool()
+        self.opener = urllib2.build_opener(*get_keepalive_handlers(self.pool)).open
+        self.server.handlers["/ok"] = lambda request: "ok"
+        self.drops = []
+        self.server.handlers["/drop"] = self.drop_once
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.stop()
+
+    def drop_once(self, request):
+        self.drops.append(request.method)
+        if len(self.drops) == 1:
+            return "", "drop", {}
+        return "done"
+
+    def test_reuses_connections(self):
+        for _ in range(5):
+            self.assertEqual(self.opener(self.server.url + "/ok").read(), "ok")
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(len(self.pool), 1)
+
+    def test_get_is_sent_again_over_a_new_connection(self):
+        self.opener(self.server.url + "/ok").read()
+        self.assertEqual(self.opener(self.server.url + "/drop").read(), "done")
+        self.assertEqual(self.drops, ["GET", "GET"])
+
+    def test_post_is_never_sent_twice(self):
+        self.opener(self.server.url + "/ok").read()
+        self.assertRaises(Exception, self.opener, self.server.url + "/drop", "data")
+        self.assertEqual(self.drops, ["POST"])
+
+    def test_post_goes_over_a_new_connection(self):
+        self.opener(self.server.url + "/ok").read()
+        self.assertEqual(self.opener(self.server.url + "/ok", "data").read(), "ok")
+        self.assertEqual(self.server.connections, 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import json as stdlib_json
+import unittest
+from StringIO import StringIO
+
+from jenkinsapi.utils import decoders
+from jenkinsapi.utils.decoders import JsonDecoder, StreamingJsonDecoder, get_decoder, iter_items
+from jenkinsapi_tests.fakejenkins import JenkinsTestCase, build_data
+
+# The same build as api/json and as the api/python literal that used to be eval()ed
+BUILD_JSON = ('{"number": 3, "building": false, "result": null, "duration": 12.5, "estimatedDuration": 10,'
+              ' "fullDisplayName": "caf\\u00e9 #3", "artifacts": [], "actions": [{}, {"failCount": 0}],'
+              ' "culprits": [{"fullName": "Jos\\u00e9"}], "keepLog": true}')
+BUILD_PYTHON = ("{'number':3,'building':False,'result':None,'duration':12.5,'estimatedDuration':10,"
+                "'fullDisplayName':u'caf\\xe9 #3','artifacts':[],'actions':[{},{'failCount':0}],"
+                "'culprits':[{'fullName':u'Jos\\xe9'}],'keepLog':True}")
+
+REPORT_JSON = stdlib_json.dumps({"duration": 1.5, "suites": [
+    {"name": "a", "cases": [{"name": "t1", "duration": 0.25}, {"name": "t2", "duration": 3}]},
+    {"name": "b", "cases": [{"name": "t3", "duration": 0.5}]}]})
+
+class TestDecoders(unittest.TestCase):
+    def setUp(self):
+        self.ijson = decoders.ijson
+
+    def tearDown(self):
+        decoders.ijson = self.ijson
+
+    def test_import_first_takes_the_first_installed(self):
+        self.assertEqual(decoders._import_first(["no_such_module", "json", "simplejson"]), stdlib_json)
+        self.assertEqual(decoders._import_first(["no_such_module"]), None)
+
+    def test_same_as_eval(self):
+        for decoder in (JsonDecoder(), StreamingJsonDecoder()):
+            self.assertEqual(decoder.decode(StringIO(BUILD_JSON)), eval(BUILD_PYTHON))
+
+    def test_stream_gives_floats(self):
+        data = StreamingJsonDecoder().decode(StringIO(BUILD_JSON))
+        self.assertEqual(type(data["duration"]), float)
+        self.assertEqual(type(data["estimatedDuration"]), int)
+
+    def test_iter_items(self):
+        cases = list(iter_items(StringIO(REPORT_JSON), ["suites.item.cases.item"]))
+        self.assertEqual([case["name"] for case in cases], ["t1", "t2", "t3"])
+        self.assertEqual([type(case["duration"]) for case in cases], [float, int, float])
+
+    def test_iter_items_positions(self):
+        report = stdlib_json.dumps({"suites": [{"cases": [{"name": "t1"}, {"name": "t2"}]}, {"cases": []},
+                                               {"cases": [{"name": "t3", "tags": [1, 2]}]}],
+                                    "childReports": [{"result": {"suites": [{"cases": []}, {"cases": [{"name": "t4"}]}]}}]})
+        prefixes = ["suites.item.cases.item", "childReports.item.result.suites.item.cases.item"]
+        expected = [((0, 0), "t1"), ((0, 1), "t2"), ((2, 0), "t3"), ((0, 1, 0), "t4")]
+        for ijson in (self.ijson, None):
+            decoders.ijson = ijson
+            cases = iter_items(StringIO(report), prefixes, positions=True)
+            self.assertEqual(sorted((at, case["name"]) for at, case in cases), sorted(expected))
+
+    def test_without_ijson(self):
+        decoders.ijson = None
+        self.assertEqual(StreamingJsonDecoder().decode(StringIO(BUILD_JSON)), eval(BUILD_PYTHON))
+        cases = list(iter_items(StringIO(REPORT_JSON), ["suites.item.cases.item", "duration"]))
+        self.assertEqual([case["name"] for case in cases[:3]], ["t1", "t2", "t3"])
+        self.assertEqual(cases[3], 1.5)
+
+    def test_get_decoder(self):
+        self.assertTrue(isinstance(get_decoder("json"), JsonDecoder))
+        decoder = StreamingJsonDecoder()
+        self.assertTrue(get_decoder(decoder) is decoder)
+        self.assertRaises(ValueError, get_decoder, "python")
+
+class TestJenkinsDecoder(JenkinsTestCase):
+    def test_stream_decoder_reads_the_same_data(self):
+        self.server.add_job("foo", [build_data("foo", 1)])
+        builds = [self.get_jenkins(decoder=name).get_job("foo").get_build(1) for name in ("json", "stream")]
+        self.assertEqual(sorted(builds[0]._data.items()), sorted(builds[1]._data.items()))
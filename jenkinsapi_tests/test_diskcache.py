@@ -0,0 +1,46 @@
+import shutil
+import tempfile
+
+from jenkinsapi.utils.diskcache import DiskCache
+from jenkinsapi_tests.fakejenkins import JenkinsTestCase, build_data
+
+class TestDiskCache(JenkinsTestCase):
+    def setUp(self):
+        JenkinsTestCase.setUp(self)
+        self.path = tempfile.mkdtemp()
+        self.cache = DiskCache(self.path)
+        self.server.add_job("foo", [build_data("foo", 1), build_data("foo", 2, building=True)])
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+        JenkinsTestCase.tearDown(self)
+
+    def get_build(self, buildnumber, username=None):
+        jenkins = self.get_jenkins(username=username, password=username and "secret", disk_cache=self.cache)
+        return jenkins.get_job("foo").get_build(buildnumber)
+
+    def count_build_reads(self, buildnumber):
+        path = "/job/foo/%i/api/json" % buildnumber
+        return len([p for p in self.server.get_paths() if p.startswith(path)])
+
+    def test_finished_build_is_read_once(self):
+        self.assertEqual(self.get_build(1).get_revision(), 10)
+        reads = self.count_build_reads(1)
+        self.assertEqual(self.get_build(1).get_revision(), 10)
+        self.assertEqual(self.count_build_reads(1), reads)
+
+    def test_running_build_is_not_cached(self):
+        self.get_build(2)
+        reads = self.count_build_reads(2)
+        self.get_build(2)
+        self.assertTrue(self.count_build_reads(2) > reads)
+
+    def test_entries_are_kept_per_user(self):
+        reads = []
+        for username in ("alice", "bob", None):
+            self.get_build(1, username)
+            reads.append(self.count_build_reads(1))
+        self.assertTrue(reads[0] < reads[1] < reads[2])
+        for username in ("alice", "bob", None):
+            self.get_build(1, username)
+        self.assertEqual(self.count_build_reads(1), reads[2])
@@ -0,0 +1,123 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from jenkinsapi.utils.downloader import Downloader, PART_SUFFIX
+from jenkinsapi_tests.fakejenkins import JenkinsTestCase
+
+class TestDownloader(JenkinsTestCase):
+    def setUp(self):
+        JenkinsTestCase.setUp(self)
+        self.path = tempfile.mkdtemp()
+        self.fspath = os.path.join(self.path, "foo.zip")
+        self.content = "".join("%05i" % i for i in range(2000))
+        self.md5 = hashlib.md5(self.content).hexdigest()
+        # How the file is served: "range", "ignore" the Range header, "416", "no_length", or "cut"
+        self.mode = "range"
+        self.cut = None
+        self.server.handlers["/foo.zip"] = self.serve_file
+        self.url = "%s/foo.zip" % self.server.url
+        self.opener = self.get_jenkins().get_opener()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+        JenkinsTestCase.tearDown(self)
+
+    def serve_file(self, request):
+        headers = {}
+        start = 0
+        requested = request.headers.getheader("Range")
+        if requested and self.mode == "416":
+            return "", 416, {}
+        if requested and self.mode != "ignore":
+            start = int(requested[len("bytes="):-1])
+            headers["Content-Range"] = "bytes %i-%i/%i" % (start, len(self.content) - 1, len(self.content))
+        body = self.content[start:]
+        headers["Content-Length"] = None if self.mode == "no_length" else str(len(body))
+        if self.cut is not None:
+            body, self.cut = body[:self.cut], None
+        return body, 206 if start else 200, headers
+
+    def write_part(self, content):
+        f = open(self.fspath + PART_SUFFIX, "wb")
+        f.write(content)
+        f.close()
+
+    def read(self, path=None):
+        f = open(path or self.fspath, "rb")
+        try:
+            return f.read()
+        finally:
+            f.close()
+
+    def get_ranges(self):
+        return [r.headers.getheader("Range") for r in self.server.requests if r.path == "/foo.zip"]
+
+    def test_download(self):
+        progress = []
+        totals = []
+        downloader = Downloader(chunk_size=1000, progress=lambda d: progress.append(d.bytes_done),
+                                total_progress=lambda done, total: totals.append((done, total)))
+        download = downloader.download(self.url, self.fspath, self.opener)
+        self.assertEqual(self.read(), self.content)
+        self.assertFalse(os.path.exists(self.fspath + PART_SUFFIX))
+        self.assertEqual((download.md5, download.bytes_total, download.finished), (self.md5, 10000, True))
+        self.assertEqual(progress, range(1000, 10001, 1000))
+        self.assertEqual(totals, [(n, 10000) for n in range(1000, 10001, 1000)])
+
+    def test_resume(self):
+        self.write_part(self.content[:4000])
+        download = Downloader().download(self.url, self.fspath, self.opener)
+        self.assertEqual(self.read(), self.content)
+        self.assertEqual(self.get_ranges(), ["bytes=4000-"])
+        self.assertEqual((download.resumed_from, download.md5), (4000, self.md5))
+
+    def test_resume_ignored(self):
+        self.write_part(self.content[:4000])
+        self.mode = "ignore"
+        download = Downloader().download(self.url, self.fspath, self.opener)
+        self.assertEqual(self.read(), self.content)
+        self.assertEqual((download.resumed_from, download.md5), (0, self.md5))
+
+    def test_resume_not_satisfiable(self):
+        self.write_part(self.content + "more")
+        self.mode = "416"
+        Downloader().download(self.url, self.fspath, self.opener)
+        self.assertEqual(self.read(), self.content)
+        self.assertEqual(self.get_ranges(), ["bytes=10004-", None])
+
+    def test_cut_short_is_kept_and_resumed(self):
+        self.cut = 3000
+        self.assertRaises(IOError, Downloader().download, self.url, self.fspath, self.opener)
+        self.assertFalse(os.path.exists(self.fspath))
+        self.assertEqual(self.read(self.fspath + PART_SUFFIX), self.content[:3000])
+        download = Downloader().download(self.url, self.fspath, self.opener)
+        self.assertEqual(self.read(), self.content)
+        self.assertEqual(download.resumed_from, 3000)
+
+    def test_replaces_the_destination(self):
+        self.write_part("")
+        f = open(self.fspath, "wb")
+        f.write("old")
+        f.close()
+        Downloader().fetch(self.url, self.fspath, self.opener)
+        self.assertEqual(self.read(), self.content)
+
+    def test_unknown_length_is_not_put_in_place(self):
+        self.mode = "no_length"
+        self.cut = 3000
+        self.assertRaises(IOError, Downloader().download, self.url, self.fspath, self.opener)
+        self.assertFalse(os.path.exists(self.fspath))
+        self.assertEqual(self.read(self.fspath + PART_SUFFIX), self.content[:3000])
+        # Cut short again, and checked against the md5 of the file
+        self.cut = 3000
+        checked = []
+        def verify(md5):
+            checked.append(md5)
+            return md5 == self.md5
+        self.assertRaises(IOError, Downloader().download, self.url, self.fspath, self.opener, verify)
+        self.assertEqual(checked, [hashlib.md5(self.content[:6000]).hexdigest()])
+        download = Downloader().download(self.url, self.fspath, self.opener, verify)
+        self.assertTrue(download.verified)
+        self.assertEqual(self.read(), self.content)
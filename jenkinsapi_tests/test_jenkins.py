@@ -0,0 +1,142 @@
+import time
+
+from jenkinsapi.build import Build
+from jenkinsapi.exceptions import UnknownJob
+from jenkinsapi_tests.fakejenkins import JenkinsTestCase, build_data
+from jenkinsapi_tests.test_threadpool import Counter
+
+class TestFetchMany(JenkinsTestCase):
+    def setUp(self):
+        JenkinsTestCase.setUp(self)
+        self.server.add_job("foo", [build_data("foo", n) for n in range(1, 9)])
+        self.counter = Counter()
+        self.delays = dict((number, 0.02) for number in range(1, 9))
+        for number in range(1, 9):
+            self.server.objects["/job/foo/%i/" % number] = self.get_slow_build(number)
+
+    def get_slow_build(self, number):
+        data = self.server.objects["/job/foo/%i/" % number]
+        def build():
+            with self.counter:
+                time.sleep(self.delays[number])
+            return data
+        return build
+
+    def test_mixed_items(self):
+        jenkins = self.get_jenkins()
+        job = jenkins.get_job("foo")
+        url = "%s/job/foo/1/api/json/" % self.server.url
+        build = Build("%s/job/foo/2/" % self.server.url, 2, job=job, data={"number": 2})
+        results = list(jenkins.fetch_many([url, build, lambda: job.get_build(3)]))
+        self.assertEqual(results[0]["number"], 1)
+        self.assertTrue(results[1] is build)
+        self.assertTrue(build._polled)
+        self.assertEqual(results[2].buildno, 3)
+
+    def test_ordered_and_unordered(self):
+        self.delays[1] = 0.2
+        job = self.get_jenkins().get_job("foo")
+        numbers = range(1, 9)
+        self.assertEqual([b.buildno for b in job.get_builds(numbers, parallel=8)], numbers)
+        unordered = [b.buildno for b in job.get_builds(numbers, parallel=8, ordered=False)]
+        self.assertEqual(sorted(unordered), numbers)
+        self.assertEqual(unordered[-1], 1)
+
+    def test_max_concurrency(self):
+        job = self.get_jenkins(max_concurrency=2).get_job("foo")
+        self.assertEqual(len(list(job.get_builds(range(1, 9), parallel=8))), 8)
+        self.assertEqual(self.counter.most, 2)
+
+    def test_parallel(self):
+        job = self.get_jenkins().get_job("foo")
+        list(job.get_builds(range(1, 9), parallel=3))
+        self.assertEqual(self.counter.most, 3)
+
+    def test_tree(self):
+        job = self.get_jenkins().get_job("foo")
+        self.server.reset()
+        builds = list(job.get_builds([1, 2], tree="number,result"))
+        self.assertEqual([b.get_status() for b in builds], ["SUCCESS", "SUCCESS"])
+        self.assertEqual([r.params["tree"] for r in self.server.requests], [["number,result"]] * 2)
+
+class TestJobIndex(JenkinsTestCase):
+    def setUp(self):
+        JenkinsTestCase.setUp(self)
+        for name in ("foo", "bar"):
+            self.server.add_job(name, [build_data(name, 1)])
+        self.server.handlers["/createItem"] = self.create_item
+
+    def create_item(self, request):
+        source = self.server.objects["/job/%s/" % request.params["from"][0]]
+        self.server.add_job(request.params["name"][0], source["allBuilds"])
+        return ""
+
+    def serve_delete(self, name):
+        def delete(request):
+            jobs = self.server.objects["/"]["jobs"]
+            jobs[:] = [job for job in jobs if job["name"] != name]
+            del self.server.objects["/job/%s/" % name]
+            return ""
+        self.server.handlers["/job/%s/doDelete" % name] = delete
+
+    def get_url(self, name):
+        return "%s/job/%s/" % (self.server.url, name)
+
+    def test_lookups(self):
+        jenkins = self.get_jenkins(lazy=True)
+        self.server.reset()
+        self.assertEqual(jenkins.get("foo").name, "foo")
+        self.assertEqual(jenkins.get("missing"), None)
+        self.assertTrue("bar" in jenkins)
+        self.assertFalse("missing" in jenkins)
+        self.assertEqual([job.name for job in jenkins.get_jobs_by_name(["bar", "foo"])], ["bar", "foo"])
+        self.assertRaises(UnknownJob, jenkins.get_jobs_by_name, ["foo", "missing"])
+        self.assertEqual(jenkins.get_job_url("foo"), self.get_url("foo"))
+        self.assertEqual(jenkins.get_job_name(self.get_url("foo").rstrip("/")), "foo")
+        self.assertRaises(UnknownJob, jenkins.get_job_name, self.get_url("missing"))
+        self.assertEqual(jenkins.get_job_names([self.get_url("bar"), self.get_url("missing")]),
+                         {self.get_url("bar"): "bar"})
+        # All from the job list the Jenkins obj was polled with
+        self.assertEqual(self.server.requests, [])
+
+    def test_index_is_built_once_per_poll(self):
+        jenkins = self.get_jenkins(lazy=True)
+        self.assertTrue("foo" in jenkins)
+        index = jenkins._job_index
+        jenkins.get_job_name(self.get_url("bar"))
+        self.assertTrue(jenkins._job_index is index)
+        self.server.add_job("baz")
+        self.assertFalse("baz" in jenkins)
+        jenkins.poll()
+        self.assertTrue(jenkins._job_index is None)
+        self.assertTrue("baz" in jenkins)
+        self.assertEqual(jenkins.get_job_name(self.get_url("baz")), "baz")
+
+    def test_copy_job(self):
+        jenkins = self.get_jenkins(lazy=True)
+        self.assertFalse("foo2" in jenkins)
+        self.server.reset()
+        job = jenkins.copy_job("foo", "foo2")
+        self.assertEqual(job.name, "foo2")
+        # The copy, then the job list
+        self.assertEqual([(r.method, r.path) for r in self.server.requests],
+                         [("POST", "/createItem"), ("GET", "/api/json/")])
+        self.assertTrue("foo2" in jenkins)
+        self.assertEqual(jenkins.get_job_name(self.get_url("foo2")), "foo2")
+        self.assertEqual([j.name for j in jenkins.get_jobs_by_name(["foo", "foo2"])], ["foo", "foo2"])
+        self.assertTrue(jenkins._job_graph_stale)
+
+    def test_delete_job(self):
+        jenkins = self.get_jenkins(lazy=True)
+        self.assertTrue("foo" in jenkins)
+        self.serve_delete("foo")
+        self.server.reset()
+        jenkins.delete_job("foo")
+        self.assertEqual([(r.method, r.path) for r in self.server.requests],
+                         [("POST", "/job/foo/doDelete"), ("GET", "/api/json/")])
+        self.assertFalse("foo" in jenkins)
+        self.assertEqual(jenkins.get("foo"), None)
+        self.assertRaises(UnknownJob, jenkins.get_job_name, self.get_url("foo"))
+        self.assertEqual(jenkins.get_job_names([self.get_url("foo"), self.get_url("bar")]),
+                         {self.get_url("bar"): "bar"})
+        self.assertEqual(jenkins.keys(), ["bar"])
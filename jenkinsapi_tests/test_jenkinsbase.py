@@ -0,0 +1,118 @@
+import threading
+import time
+import unittest
+
+from jenkinsapi.jenkinsbase import JenkinsData
+from jenkinsapi.job import Job
+from jenkinsapi_tests.fakejenkins import JenkinsTestCase, build_data
+
+class TestJenkinsData(unittest.TestCase):
+    def test_loads_until_the_field_is_found(self):
+        calls = []
+        def loader(data):
+            def load():
+                calls.append(data)
+                return data
+            return load
+        data = JenkinsData({"a": 1}, [loader({"b": 2}), loader({"c": 3})])
+        self.assertEqual(data["a"], 1)
+        self.assertEqual(calls, [])
+        self.assertEqual(data["b"], 2)
+        self.assertFalse(data.complete)
+        self.assertEqual(data.get("missing", 4), 4)
+        self.assertTrue(data.complete)
+        self.assertEqual(calls, [{"b": 2}, {"c": 3}])
+        self.assertRaises(KeyError, lambda: data["missing"])
+
+    def test_listing_loads_everything(self):
+        for read in (lambda d: d.keys(), lambda d: list(d), len, lambda d: d.items(), lambda d: d.copy(),
+                     lambda d: d == {"a": 1, "b": 2}):
+            data = JenkinsData({"a": 1}, [lambda: {"b": 2}])
+            read(data)
+            self.assertTrue(data.complete)
+        data = JenkinsData({"a": 1}, [lambda: {"b": 2}])
+        self.assertEqual(sorted(data), ["a", "b"])
+        self.assertEqual(len(data), 2)
+        self.assertEqual(data, {"a": 1, "b": 2})
+
+    def test_concurrent_reads_run_each_loader_once(self):
+        calls = []
+        def load():
+            calls.append(1)
+            time.sleep(0.05)
+            return {"b": 2}
+        data = JenkinsData({}, [load])
+        errors = []
+        def read():
+            try:
+                self.assertEqual(data["b"], 2)
+            except Exception, e:
+                errors.append(e)
+        threads = [threading.Thread(target=read) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(calls), 1)
+
+class TestLazyObjects(JenkinsTestCase):
+    def test_lazy_job_is_polled_once_on_first_read(self):
+        self.server.add_job("foo", [build_data("foo", n) for n in range(1, 4)])
+        jenkins = self.get_jenkins(lazy=True)
+        self.server.reset()
+        job = jenkins["foo"]
+        self.assertEqual(self.server.requests, [])
+        self.assertEqual(str(job), "foo")
+        self.assertEqual(self.server.requests, [])
+        self.assertEqual(sorted(job.get_build_dict()), [1, 2, 3])
+        self.assertEqual(len(self.server.requests), 1)
+
+    def get_trees(self):
+        return [r.params.get("tree", [None])[0] for r in self.server.requests]
+
+    def test_requests_of_each_accessor(self):
+        self.server.add_job("foo", [build_data("foo", n) for n in range(1, 4)], healthReport=[{"score": 100}])
+        job = self.get_jenkins(lazy=True)["foo"]
+        self.server.reset()
+        # The summary from the parent, then the fields of Job.TREE, then everything
+        self.assertEqual(job._data["color"], "blue")
+        self.assertEqual(self.get_trees(), [])
+        self.assertEqual(job.get_last_buildnumber(), 3)
+        self.assertEqual(self.get_trees(), [Job.TREE])
+        self.assertEqual(job._data["healthReport"], [{"score": 100}])
+        self.assertEqual(self.get_trees(), [Job.TREE, None])
+        self.assertTrue(job._data.complete)
+
+    def test_polled_job_keys_are_complete(self):
+        self.server.add_job("foo", [build_data("foo", 1)], healthReport=[])
+        job = self.get_jenkins().get_job("foo")
+        self.server.reset()
+        self.assertTrue("healthReport" in job._data.keys())
+        self.assertEqual(self.get_trees(), [None])
+        self.assertEqual(sorted(job._data), sorted(self.server.objects["/job/foo/"]))
+
+    def test_lazy_job_read_from_many_threads(self):
+        job_data = self.server.add_job("foo", [build_data("foo", n) for n in range(1, 4)])
+        def slow_job():
+            time.sleep(0.05)
+            return job_data
+        self.server.objects["/job/foo/"] = slow_job
+        jenkins = self.get_jenkins(lazy=True)
+        job = jenkins["foo"]
+        errors = []
+        def read():
+            try:
+                job.get_build_dict()
+            except Exception, e:
+                errors.append(e)
+        threads = [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len([r for r in self.server.requests if r.path == "/job/foo/api/json/"]), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+from jenkinsapi_tests.fakejenkins import JenkinsTestCase, build_data
+
+class TestBuildsBetween(JenkinsTestCase):
+    def get_job(self, timestamps):
+        """
+        :param timestamps: start of each build, oldest first, in seconds, [int]
+        """
+        self.server.add_job("foo", [build_data("foo", n + 1, timestamp=1000 * t) for n, t in enumerate(timestamps)])
+        job = self.get_jenkins().get_job("foo")
+        self.server.reset()
+        return job
+
+    def get_numbers(self, job, start, end):
+        return [record.number for record in job.get_builds_between(start, end)]
+
+    def test_range(self):
+        job = self.get_job(range(1, 41))
+        self.assertEqual(self.get_numbers(job, 3, 6), [5, 4, 3])
+        self.assertEqual(self.get_numbers(job, 0, 100), range(40, 0, -1))
+
+    def test_empty_job(self):
+        job = self.get_job([])
+        self.assertEqual(self.get_numbers(job, 0, 100), [])
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_range_outside_the_history(self):
+        job = self.get_job(range(10, 20))
+        self.assertEqual(self.get_numbers(job, 30, 40), [])
+        self.assertEqual(self.get_numbers(job, 0, 10), [])
+        self.assertEqual(self.get_numbers(job, 19, 30), [10])
+        self.assertEqual(self.get_numbers(job, 0, 11), [1])
+        # Only timestamps are read when no build is in the range
+        trees = [r.params["tree"][0] for r in self.server.requests]
+        self.assertEqual(len([tree for tree in trees if not tree.startswith("allBuilds[timestamp]")]), 2)
+
+    def test_single_build(self):
+        job = self.get_job([5])
+        self.assertEqual(self.get_numbers(job, 5, 6), [1])
+        self.assertEqual(self.get_numbers(job, 0, 5), [])
+        self.assertEqual(self.get_numbers(job, 6, 7), [])
+        self.assertEqual(self.get_numbers(job, 5, 5), [])
+
+    def test_equal_timestamps(self):
+        job = self.get_job([1, 2, 3, 3, 3, 4])
+        self.assertEqual(self.get_numbers(job, 3, 4), [5, 4, 3])
+        self.assertEqual(self.get_numbers(job, 3, 3), [])
+        self.assertEqual(self.get_numbers(job, 2, 3), [2])
+        self.assertEqual(self.get_numbers(job, 4, 5), [6])
+
+    def test_end_before_start(self):
+        job = self.get_job([1, 2])
+        self.assertRaises(ValueError, job.get_builds_between, 2, 1)
+        self.assertEqual(self.server.requests, [])
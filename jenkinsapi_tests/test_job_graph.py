@@ -0,0 +1,93 @@
+from jenkinsapi.exceptions import UnknownJob, DependencyCycle
+from jenkinsapi_tests.fakejenkins import JenkinsTestCase
+
+# a triggers b and c, which both trigger d; x is on its own
+LINKS = {"a": ["b", "c"], "b": ["d"], "c": ["d"], "d": [], "x": []}
+
+class TestJobGraph(JenkinsTestCase):
+    def setUp(self):
+        JenkinsTestCase.setUp(self)
+        for name, downstream in sorted(LINKS.items()):
+            upstream = sorted(up for up, names in LINKS.items() if name in names)
+            self.server.add_job(name, upstreamProjects=[{"name": n} for n in upstream],
+                                downstreamProjects=[{"name": n} for n in downstream])
+        self.jenkins = self.get_jenkins()
+        self.server.reset()
+        self.graph = self.jenkins.get_job_graph()
+
+    def link(self, upstream, downstream):
+        """
+        Add a link to the job list served, as Jenkins reports it on both of its ends
+        """
+        jobs = dict((job["name"], job) for job in self.server.objects["/"]["jobs"])
+        for name in (upstream, downstream):
+            if name not in jobs:
+                self.server.add_job(name)
+                jobs[name] = self.server.objects["/"]["jobs"][-1]
+        jobs[upstream]["downstreamProjects"].append({"name": downstream})
+        jobs[downstream]["upstreamProjects"].append({"name": upstream})
+
+    def test_links(self):
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.graph.get_jobs(), ["a", "b", "c", "d", "x"])
+        self.assertEqual(self.graph.get_upstream("d"), ["b", "c"])
+        self.assertEqual(self.graph.get_downstream("a"), ["b", "c"])
+        self.assertTrue("x" in self.graph)
+        self.assertRaises(UnknownJob, self.graph.get_upstream, "missing")
+
+    def test_topological_order(self):
+        self.assertEqual(self.graph.topological_order(), ["a", "b", "c", "d", "x"])
+        self.assertEqual(self.graph.topological_order(["d", "x", "b"]), ["b", "d", "x"])
+
+    def test_closure(self):
+        self.assertEqual(self.graph.get_closure("a"), frozenset(["b", "c", "d"]))
+        self.assertEqual(self.graph.get_closure("d", upstream=True), frozenset(["a", "b", "c"]))
+        self.assertEqual(self.graph.get_closure("x"), frozenset())
+        self.assertTrue(self.graph.get_closure("a") is self.graph.get_closure("a"))
+        self.assertRaises(UnknownJob, self.graph.get_closure, "missing")
+
+    def test_impact(self):
+        self.assertEqual(self.graph.get_impact(["a"]), ["b", "c", "d"])
+        self.assertEqual(self.graph.get_impact(["c", "b"]), ["d"])
+        self.assertEqual(self.graph.get_impact(["d", "x"]), [])
+
+    def test_cycle(self):
+        self.link("d", "a")
+        self.graph.refresh()
+        self.assertRaises(DependencyCycle, self.graph.topological_order)
+        try:
+            self.graph.get_impact(["x"])
+        except DependencyCycle, e:
+            for name in ("a", "b", "c", "d"):
+                self.assertTrue(name in str(e))
+            self.assertFalse("x" in str(e))
+        else:
+            self.fail("No DependencyCycle")
+        # In a cycle, a job reaches itself
+        self.assertEqual(self.graph.get_closure("a"), frozenset(["a", "b", "c", "d"]))
+
+    def test_refresh_forgets_only_the_affected_closures(self):
+        closures = dict((name, self.graph.get_closure(name)) for name in ("a", "b", "x"))
+        up_of_d = self.graph.get_closure("d", upstream=True)
+        self.assertEqual(self.graph.refresh(), set())
+        self.assertTrue(self.graph.get_closure("a") is closures["a"])
+        self.link("x", "y")
+        self.assertEqual(self.graph.refresh(), set(["x", "y"]))
+        self.assertEqual(self.graph.get_closure("x"), frozenset(["y"]))
+        # The closures which do not involve x nor y are kept
+        self.assertTrue(self.graph.get_closure("a") is closures["a"])
+        self.assertTrue(self.graph.get_closure("b") is closures["b"])
+        self.assertTrue(self.graph.get_closure("d", upstream=True) is up_of_d)
+        self.assertEqual(self.graph.topological_order(), ["a", "b", "c", "d", "x", "y"])
+        self.link("c", "y")
+        self.assertEqual(self.graph.refresh(), set(["c", "y"]))
+        # a reaches c, so its closure is computed again
+        self.assertEqual(self.graph.get_closure("a"), frozenset(["b", "c", "d", "y"]))
+        self.assertTrue(self.graph.get_closure("b") is closures["b"])
+
+    def test_refreshed_after_a_poll(self):
+        self.link("x", "y")
+        self.assertTrue(self.jenkins.get_job_graph() is self.graph)
+        self.assertEqual(self.graph.get_downstream("x"), [])
+        self.jenkins.poll()
+        self.assertEqual(self.jenkins.get_job_graph().get_downstream("x"), ["y"])
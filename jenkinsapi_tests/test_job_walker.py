@@ -0,0 +1,45 @@
+from jenkinsapi_tests.fakejenkins import JenkinsTestCase
+
+class TestWalkJobs(JenkinsTestCase):
+    def setUp(self):
+        JenkinsTestCase.setUp(self)
+        # a, f/b, f/g/c, f/g/h/d and an empty folder e
+        self.server.add_job("a")
+        def item(name, path, jobs=None):
+            data = {"name": name, "url": "BASE%s" % path, "color": "blue"}
+            if jobs is not None:
+                data["jobs"] = jobs
+            return data
+        h = item("h", "/job/f/job/g/job/h/", [item("d", "/job/f/job/g/job/h/job/d/")])
+        g = item("g", "/job/f/job/g/", [item("c", "/job/f/job/g/job/c/"), h])
+        f = item("f", "/job/f/", [item("b", "/job/f/job/b/"), g])
+        self.server.objects["/"]["jobs"] += [f, item("e", "/job/e/", [])]
+        for folder in (f, g, h):
+            self.server.objects[folder["url"][len("BASE"):]] = folder
+
+    def walk(self, **kwargs):
+        jenkins = self.get_jenkins()
+        self.server.reset()
+        return jenkins, sorted(jenkins.walk_jobs(**kwargs))
+
+    def test_walk_in_one_request(self):
+        jenkins, jobs = self.walk(depth=4)
+        self.assertEqual([name for name, _ in jobs], ["a", "f/b", "f/g/c", "f/g/h/d"])
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(jobs[3][1].baseurl, "%s/job/f/job/g/job/h/job/d/" % self.server.url)
+
+    def test_walk_level_by_level(self):
+        _, jobs = self.walk(depth=1)
+        self.assertEqual([name for name, _ in jobs], ["a", "f/b", "f/g/c", "f/g/h/d"])
+        # The root, then f, g and h
+        self.assertEqual(len(self.server.requests), 4)
+
+    def test_jobs_are_not_polled(self):
+        # Not a lazy Jenkins obj, the jobs are built from the walk all the same
+        jenkins, jobs = self.walk(fields=["color"])
+        self.assertFalse(jenkins.lazy)
+        self.assertEqual([job._data["color"] for _, job in jobs], ["blue"] * 4)
+        self.assertEqual(len(self.server.requests), 1)
+        # Other fields are read from the job
+        self.assertEqual(jobs[0][1]._data["description"], "")
+        self.assertEqual(len(self.server.requests), 2)
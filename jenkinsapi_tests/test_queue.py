@@ -0,0 +1,101 @@
+from jenkinsapi import config
+from jenkinsapi.aio import AsyncJob
+from jenkinsapi.exceptions import WillNotBuild
+from jenkinsapi.queue import QueueItem
+from jenkinsapi.utils.eventloop import get_event_loop
+from jenkinsapi_tests.fakejenkins import JenkinsTestCase, build_data
+
+class TestInvoke(JenkinsTestCase):
+    def setUp(self):
+        JenkinsTestCase.setUp(self)
+        self.min_interval = config.WAIT_MIN_INTERVAL
+        config.WAIT_MIN_INTERVAL = 0.01
+        self.server.add_job("foo", [build_data("foo", 1)])
+        self.job = self.get_jenkins().get_job("foo")
+        # Polls of the queue item left before the build starts
+        self.queued_polls = 2
+        self.item = {"id": 7, "why": "Waiting for next available executor", "blocked": False, "buildable": True,
+                     "stuck": False, "cancelled": False, "inQueueSince": 0, "executable": None}
+        self.server.objects["/queue/item/7/"] = self.poll_item
+
+    def tearDown(self):
+        config.WAIT_MIN_INTERVAL = self.min_interval
+        JenkinsTestCase.tearDown(self)
+
+    def poll_item(self):
+        if self.queued_polls:
+            self.queued_polls -= 1
+        elif self.item["executable"] is None and not self.item["cancelled"]:
+            self.start_build()
+            self.item["executable"] = {"number": 2, "url": "BASE/job/foo/2/"}
+            self.item["why"] = None
+        return self.item
+
+    def start_build(self):
+        job = self.server.objects["/job/foo/"]
+        build = build_data("foo", 2)
+        self.server.objects["/job/foo/2/"] = build
+        job["builds"].insert(0, build)
+        job["allBuilds"].insert(0, build)
+        job["lastBuild"] = job["lastCompletedBuild"] = {"number": 2, "url": build["url"]}
+
+    def serve_trigger(self, location=True):
+        def trigger(request):
+            if not location:
+                self.start_build()
+                return "Scheduled"
+            return "", 201, {"Location": "%s/queue/item/7/" % self.server.url}
+        self.server.handlers["/job/foo/build"] = trigger
+
+    def test_queue_item(self):
+        self.serve_trigger()
+        self.server.reset()
+        item = self.job.invoke(invoke_pre_check_delay=60)
+        self.assertTrue(isinstance(item, QueueItem))
+        self.assertEqual(item.id(), "7")
+        # The state of the job, and the trigger
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertTrue(item.is_queued())
+        self.assertEqual(item.get_why(), "Waiting for next available executor")
+        self.assertEqual(item.get_build(), None)
+        build = item.get_build()
+        self.assertEqual(build.buildno, 2)
+        self.assertEqual(build.get_status(), "SUCCESS")
+        self.assertTrue(all(p.startswith("/queue/item/7/") for p in self.server.get_paths()[2:5]))
+
+    def test_block_until_building(self):
+        self.serve_trigger()
+        self.queued_polls = 3
+        build = self.job.invoke().block_until_building(delay=0.05, timeout=5)
+        self.assertEqual(build.buildno, 2)
+        self.assertEqual(len([p for p in self.server.get_paths() if p.startswith("/queue/item/")]), 4)
+
+    def test_invoke_blocks_until_complete(self):
+        self.serve_trigger()
+        item = self.job.invoke(block=True, invoke_block_delay=0.05)
+        self.assertEqual(item.get_build().buildno, 2)
+        self.assertEqual(self.job.get_last_buildnumber(), 2)
+
+    def test_async_invoke_blocks_until_complete(self):
+        self.serve_trigger()
+        invoke = AsyncJob(self.job).invoke(block=True, invoke_block_delay=0.05)
+        item = get_event_loop().run_until_complete(invoke, timeout=10)
+        self.assertEqual(item.id(), "7")
+        self.assertEqual(self.job.get_last_buildnumber(), 2)
+
+    def test_cancelled(self):
+        self.serve_trigger()
+        self.item["cancelled"] = True
+        self.queued_polls = 0
+        item = self.job.invoke()
+        self.assertFalse(item.is_queued())
+        self.assertRaises(WillNotBuild, item.block_until_building, delay=0.05)
+
+    def test_without_location(self):
+        self.serve_trigger(location=False)
+        self.assertEqual(self.job.invoke(invoke_pre_check_delay=0), None)
+        self.assertEqual(self.job.get_last_buildnumber(), 2)
+
+    def test_without_location_and_no_build(self):
+        self.server.handlers["/job/foo/build"] = lambda request: "Scheduled"
+        self.assertRaises(AssertionError, self.job.invoke, invoke_pre_check_delay=0)
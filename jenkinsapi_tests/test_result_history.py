@@ -0,0 +1,88 @@
+import threading
+import time
+
+from jenkinsapi.result_history import ResultHistory
+from jenkinsapi_tests.fakejenkins import JenkinsTestCase, build_data
+from jenkinsapi_tests.test_result_set import make_case
+
+class TestResultHistory(JenkinsTestCase):
+    def setUp(self):
+        JenkinsTestCase.setUp(self)
+        builds = []
+        for number in range(1, 9):
+            # test1 fails in every other build, test2 from build 5 on
+            statuses = ["PASSED", "FAILED" if number % 2 else "PASSED", "FAILED" if number >= 5 else "PASSED"]
+            builds.append(build_data("foo", number, actions=[{"totalCount": len(statuses)}]))
+            self.server.objects["/job/foo/%i/testReport/" % number] = {
+                "suites": [{"cases": [make_case(0, i, status) for i, status in enumerate(statuses)]}]}
+        self.server.add_job("foo", builds)
+        self.history = ResultHistory(self.get_jenkins().get_job("foo"), parallel=4)
+
+    def tearDown(self):
+        self.history.close()
+        JenkinsTestCase.tearDown(self)
+
+    def test_update(self):
+        self.assertEqual(self.history.update(), 8)
+        self.assertEqual(self.history.update(), 0)
+        self.assertEqual(self.history.get_build_numbers(), range(1, 9))
+        self.assertEqual(self.history.get_test_names(), ["pkg.Test0.test0", "pkg.Test0.test1", "pkg.Test0.test2"])
+        self.assertEqual([status for _, status, _ in self.history.get_runs("pkg.Test0.test2")],
+                         ["PASSED"] * 4 + ["FAILED"] * 4)
+        self.assertEqual(self.history.first_failing_build("pkg.Test0.test2"), 5)
+        self.assertEqual(self.history.flaky_tests(), [("pkg.Test0.test1", 7)])
+        self.assertEqual(self.history.failure_rate("pkg.Test0.test0"), 0)
+
+    def test_slow_report_holds_up_no_others(self):
+        timeline = []
+        lock = threading.Lock()
+        def slow_report(number, delay):
+            report = self.server.objects["/job/foo/%i/testReport/" % number]
+            def get():
+                with lock:
+                    timeline.append(("start", number))
+                time.sleep(delay)
+                with lock:
+                    timeline.append(("end", number))
+                return report
+            return get
+        for number in range(1, 9):
+            delay = 0.3 if number == 8 else 0.02
+            self.server.objects["/job/foo/%i/testReport/" % number] = slow_report(number, delay)
+        self.assertEqual(self.history.update(), 8)
+        self.assertEqual(timeline[-1], ("end", 8))
+        in_flight = 0
+        for event, _ in timeline:
+            in_flight += 1 if event == "start" else -1
+            self.assertTrue(in_flight <= 4)
+
+    def test_reads_hold_the_lock(self):
+        self.history.update()
+        reads = [self.history.get_build_numbers, self.history.get_test_names, self.history.flaky_tests,
+                 self.history.failure_rates, lambda: self.history.get_runs("pkg.Test0.test1"),
+                 lambda: self.history.failure_rate("pkg.Test0.test1")]
+        for read in reads:
+            thread = threading.Thread(target=read)
+            self.history._lock.acquire()
+            try:
+                thread.start()
+                thread.join(0.05)
+                self.assertTrue(thread.isAlive())
+            finally:
+                self.history._lock.release()
+            thread.join()
+
+    def test_test_ids_from_many_threads(self):
+        names = ["Test%i" % i for i in range(200)]
+        def store(offset):
+            for i in range(len(names)):
+                self.history._get_test_id({"className": "pkg", "name": names[(i + offset) % len(names)]})
+        threads = [threading.Thread(target=store, args=(offset * 25,)) for offset in range(8)]
+        for thread in threads:
+            thread.start()
+        self.history.prune(0)
+        for thread in threads:
+            thread.join()
+        # Every name has one id, and it is the one in the database
+        ids = dict(("pkg.%s" % name, self.history._get_test_id({"className": "pkg", "name": name})) for name in names)
+        self.assertEqual(dict(self.history.db.execute("SELECT name, id FROM tests")), ids)
@@ -0,0 +1,198 @@
+import copy
+import pickle
+import threading
+import unittest
+from array import array
+
+from jenkinsapi import config
+from jenkinsapi.exceptions import ResultsChanged
+from jenkinsapi.result import Result
+from jenkinsapi.result_set import ResultQuery
+from jenkinsapi_tests.fakejenkins import JenkinsTestCase, build_data
+
+def make_case(suite, number, status="PASSED"):
+    case = {"className": "pkg.Test%i" % suite, "name": "test%i" % number, "status": status,
+            "duration": 0.5, "age": 0, "failedSince": 0, "skipped": False, "errorDetails": None,
+            "errorStackTrace": None, "stdout": "out %i.%i" % (suite, number), "stderr": ""}
+    if status in ("FAILED", "REGRESSION"):
+        case["errorStackTrace"] = "trace %i.%i" % (suite, number)
+    return case
+
+class ResultSetTestCase(JenkinsTestCase):
+    def serve_report(self, suites):
+        """
+        :param suites: the status of each case of each suite, [[str]]
+        """
+        self.report = {"suites": [{"name": "suite%i" % i, "cases": [make_case(i, j, status)
+                                                                  for j, status in enumerate(statuses)]}
+                                  for i, statuses in enumerate(suites)],
+                       "childReports": []}
+        count = sum(len(statuses) for statuses in suites)
+        self.server.add_job("foo", [build_data("foo", 1, actions=[{"totalCount": count}])])
+        self.server.objects["/job/foo/1/testReport/"] = self.report
+
+    def get_build(self, **kwargs):
+        return self.get_jenkins(**kwargs).get_job("foo").get_build(1)
+
+class TestStreamedResultSet(ResultSetTestCase):
+    def test_stream(self):
+        self.serve_report([["PASSED"] * 3, ["FAILED", "PASSED"]])
+        resultset = self.get_build().get_resultset(stream=True)
+        self.assertEqual([(case["className"], case["name"]) for case in resultset.iter_cases()],
+                         [("pkg.Test0", "test0"), ("pkg.Test0", "test1"), ("pkg.Test0", "test2"),
+                          ("pkg.Test1", "test0"), ("pkg.Test1", "test1")])
+        self.assertEqual(resultset.count(resultset.FAILED_STATUSES), 1)
+
+    def test_requests_while_streaming(self):
+        self.serve_report([["PASSED"] * 200])
+        build = self.get_build(max_concurrency=1)
+        jenkins = build.get_jenkins_obj()
+        resultset = build.get_resultset(stream=True)
+        statuses = []
+        def read():
+            for case in resultset.iter_cases():
+                # Another request, while the report is still being read
+                statuses.append(jenkins.get_data(build.python_api_url(build.baseurl, tree="result"))["result"])
+        thread = threading.Thread(target=read)
+        thread.daemon = True
+        thread.start()
+        thread.join(10)
+        self.assertFalse(thread.isAlive(), "Deadlocked on the request slot")
+        self.assertEqual(statuses, ["SUCCESS"] * 200)
+
+    def test_slot_is_free_between_cases(self):
+        self.serve_report([["PASSED"] * 10])
+        build = self.get_build(max_concurrency=1)
+        slots = build.get_jenkins_obj().request_slots
+        cases = build.get_resultset(stream=True).iter_cases()
+        cases.next()
+        self.assertTrue(slots.acquire(False))
+        slots.release()
+        self.assertEqual(len(list(cases)), 9)
+
+class TestResultQuery(ResultSetTestCase):
+    SUITES = [["PASSED", "FAILED", "FAILED", "PASSED"], ["PASSED"], ["REGRESSION", "PASSED", "FAILED"]]
+
+    def test_heavy_fields_of_failures(self):
+        self.serve_report(self.SUITES)
+        resultset = self.get_build().get_resultset(query=ResultQuery.failures())
+        failures = list(resultset.iter_cases())
+        self.assertEqual([(case["className"], case["name"], case["errorStackTrace"]) for case in failures],
+                         [("pkg.Test0", "test1", "trace 0.1"), ("pkg.Test0", "test2", "trace 0.2"),
+                          ("pkg.Test2", "test0", "trace 2.0"), ("pkg.Test2", "test2", "trace 2.2")])
+        self.assertEqual(failures[0]["stdout"], "out 0.1")
+        # The report, then a run of failures in the first suite and two single ones in the last
+        paths = [p for p in self.server.get_paths() if "/testReport/" in p]
+        self.assertEqual(len(paths), 4)
+
+    def test_streamed_heavy_fields_of_failures(self):
+        self.serve_report(self.SUITES)
+        self.report["childReports"] = [{"result": {"suites": [{"cases": [make_case(3, 0), make_case(3, 1, "FAILED")]}]}}]
+        resultset = self.get_build().get_resultset(stream=True, query=ResultQuery.failures())
+        self.server.reset()
+        failures = list(resultset.iter_cases())
+        self.assertEqual([(case["className"], case["name"], case["errorStackTrace"]) for case in failures],
+                         [("pkg.Test0", "test1", "trace 0.1"), ("pkg.Test0", "test2", "trace 0.2"),
+                          ("pkg.Test2", "test0", "trace 2.0"), ("pkg.Test2", "test2", "trace 2.2"),
+                          ("pkg.Test3", "test1", "trace 3.1")])
+        self.assertEqual(failures[4]["stdout"], "out 3.1")
+        # The light fields of every case, then the heavy ones of each run of failures
+        trees = [r.params["tree"][0] for r in self.server.requests]
+        self.assertEqual(len(trees), 5)
+        self.assertFalse("errorStackTrace" in trees[0])
+        self.assertTrue(all("errorStackTrace" in tree for tree in trees[1:]))
+
+    def test_streamed_runs_are_fetched_in_batches(self):
+        self.serve_report([["FAILED", "PASSED"] * 5])
+        resultset = self.get_build().get_resultset(stream=True, query=ResultQuery.failures())
+        saved = config.FETCH_PARALLEL
+        config.FETCH_PARALLEL = 2
+        try:
+            self.server.reset()
+            cases = resultset.iter_cases()
+            self.assertEqual(cases.next()["errorStackTrace"], "trace 0.0")
+            # The report, and the first batch of runs only
+            self.assertEqual(len(self.server.requests), 3)
+            self.assertEqual([case["name"] for case in cases], ["test2", "test4", "test6", "test8"])
+            self.assertEqual(len(self.server.requests), 6)
+        finally:
+            config.FETCH_PARALLEL = saved
+
+    def test_cases_of_the_report_are_left_unchanged(self):
+        self.serve_report(self.SUITES)
+        resultset = self.get_build().get_resultset(query=ResultQuery.failures())
+        data = resultset.get_data(resultset.python_api_url(resultset.baseurl, tree=resultset.TREE))
+        original = copy.deepcopy(data)
+        with_heavy_fields = resultset._add_heavy_fields(data)
+        self.assertEqual(data, original)
+        self.assertEqual(with_heavy_fields["suites"][0]["cases"][1]["errorStackTrace"], "trace 0.1")
+        self.assertTrue(with_heavy_fields["suites"][1] is not data["suites"][1])
+        self.assertTrue(with_heavy_fields["suites"][1]["cases"][0] is data["suites"][1]["cases"][0])
+
+    def test_cases_are_matched_by_name(self):
+        self.serve_report(self.SUITES)
+        resultset = self.get_build().get_resultset(query=ResultQuery.failures())
+        data = resultset.get_data(resultset.python_api_url(resultset.baseurl, tree=resultset.TREE))
+        self.report["suites"][0]["cases"].reverse()
+        cases = resultset._add_heavy_fields(data)["suites"][0]["cases"]
+        self.assertEqual([case.get("errorStackTrace") for case in cases], [None, "trace 0.1", "trace 0.2", None])
+        del self.report["suites"][0]["cases"][1]
+        self.assertRaises(ResultsChanged, resultset._add_heavy_fields, data)
+
+class TestResult(unittest.TestCase):
+    def test_fields(self):
+        case = make_case(0, 1, "FAILED")
+        case["testActions"] = []
+        result = Result(**case)
+        self.assertEqual((result.className, result.name, result.status), ("pkg.Test0", "test1", "FAILED"))
+        self.assertEqual(result.errorStackTrace, "trace 0.1")
+        # Fields Jenkins added, which are not slots
+        self.assertEqual(result.testActions, [])
+        self.assertEqual(result.as_dict(), dict((k, v) for k, v in case.items() if v is not None))
+        self.assertEqual(result.id(), "pkg.Test0.test1")
+        self.assertRaises(AttributeError, getattr, result, "missing")
+
+    def test_missing_known_fields_are_none(self):
+        result = Result(className="pkg.Test", name="test", status="PASSED")
+        self.assertEqual(result.stdout, None)
+        self.assertEqual(result.as_dict(), {"className": "pkg.Test", "name": "test", "status": "PASSED"})
+
+    def test_set_attributes(self):
+        result = Result(**make_case(0, 0))
+        result.status = "FIXED"
+        result.note = "seen"
+        self.assertEqual((result.status, result.note), ("FIXED", "seen"))
+        self.assertEqual(result.as_dict()["note"], "seen")
+        self.assertFalse(hasattr(result, "__dict__"))
+
+    def test_pickle(self):
+        case = make_case(0, 0)
+        case["extra"] = 1
+        result = pickle.loads(pickle.dumps(Result(**case), 2))
+        self.assertEqual(result.as_dict(), dict((k, v) for k, v in case.items() if v is not None))
+
+class TestResultSet(ResultSetTestCase):
+    def test_results(self):
+        self.serve_report([["PASSED", "FAILED"], ["SKIPPED"]])
+        resultset = self.get_build().get_resultset()
+        self.assertEqual(resultset.keys(), ["pkg.Test0.test0", "pkg.Test0.test1", "pkg.Test1.test0"])
+        failures = list(resultset.iter_failures(fields=["className", "name"]))
+        self.assertEqual([f.as_dict() for f in failures], [{"className": "pkg.Test0", "name": "test1"}])
+        self.assertEqual(len(resultset), 3)
+
+    def test_columns(self):
+        self.serve_report([["PASSED", "FAILED"], ["PASSED"]])
+        self.report["suites"][1]["cases"][0]["duration"] = None
+        columns = self.get_build().get_resultset().get_columns()
+        self.assertEqual(sorted(columns), ["className", "duration", "name", "status"])
+        self.assertEqual(columns["className"], ["pkg.Test0", "pkg.Test0", "pkg.Test1"])
+        # Equal strings are shared, numbers are doubles, and missing ones 0
+        self.assertTrue(columns["className"][0] is columns["className"][1])
+        self.assertEqual(columns["duration"], array("d", [0.5, 0.5, 0]))
+        failed = self.get_build().get_resultset().get_columns(["name", "age"], statuses=["FAILED"])
+        self.assertEqual(failed, {"name": ["test1"], "age": array("d", [0])})
+
+    def test_columns_of_streamed_report(self):
+        self.serve_report([["PASSED"] * 3])
+        columns = self.get_build().get_resultset(stream=True).get_columns(["name"])
+        self.assertEqual(columns, {"name": ["test0", "test1", "test2"]})
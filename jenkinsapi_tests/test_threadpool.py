@@ -0,0 +1,75 @@
+import threading
+import time
+import unittest
+
+from jenkinsapi.utils.threadpool import bounded_imap
+
+class Counter(object):
+    """
+    Counts the calls running at once
+    """
+    def __init__(self):
+        self.running = 0
+        self.most = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self._lock.acquire()
+        self.running += 1
+        self.most = max(self.most, self.running)
+        self._lock.release()
+
+    def __exit__(self, *exc_info):
+        self._lock.acquire()
+        self.running -= 1
+        self._lock.release()
+
+class TestBoundedImap(unittest.TestCase):
+    def test_ordered(self):
+        # The first items take the longest
+        def fn(item):
+            time.sleep(0.01 * (5 - item))
+            return item * 2
+        self.assertEqual(list(bounded_imap(fn, range(5), 5)), [0, 2, 4, 6, 8])
+
+    def test_unordered(self):
+        def fn(item):
+            time.sleep(0.02 * (2 - item))
+            return item
+        self.assertEqual(list(bounded_imap(fn, range(3), 3, ordered=False)), [2, 1, 0])
+
+    def test_workers_limit(self):
+        counter = Counter()
+        def fn(item):
+            with counter:
+                time.sleep(0.01)
+            return item
+        self.assertEqual(sorted(bounded_imap(fn, range(12), 3, ordered=False)), range(12))
+        self.assertEqual(counter.most, 3)
+
+    def test_error_raised_when_due(self):
+        def fn(item):
+            if item == 2:
+                raise ValueError(item)
+            return item
+        results = bounded_imap(fn, range(4), 2)
+        self.assertEqual([results.next(), results.next()], [0, 1])
+        self.assertRaises(ValueError, results.next)
+
+    def test_closing_stops_the_work(self):
+        calls = []
+        def fn(item):
+            calls.append(item)
+            time.sleep(0.01)
+            return item
+        results = bounded_imap(fn, range(50), 2)
+        results.next()
+        results.close()
+        time.sleep(0.05)
+        self.assertTrue(len(calls) < 10)
+
+    def test_no_items(self):
+        self.assertEqual(list(bounded_imap(lambda item: item, [], 4)), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import time
+import unittest
+
+from jenkinsapi.job import Job
+from jenkinsapi.waiter import BuildWaiter, get_check_interval, needs_backoff, split_job_url
+from jenkinsapi_tests.fakejenkins import JenkinsTestCase, build_data
+
+class TestCheckInterval(unittest.TestCase):
+    def test_halves_the_time_left(self):
+        data = {"timestamp": time.time() * 1000, "estimatedDuration": 100000}
+        self.assertFalse(needs_backoff(data))
+        self.assertAlmostEqual(get_check_interval(data, 0, 1, 600), 50, 0)
+        self.assertEqual(get_check_interval(data, 0, 1, 15), 15)
+
+    def test_backs_off_without_estimate(self):
+        for data in ({"timestamp": 0, "estimatedDuration": -1}, {"timestamp": 0, "estimatedDuration": 100},
+                     {"building": True}):
+            self.assertTrue(needs_backoff(data))
+            self.assertEqual([get_check_interval(data, n, 1, 10) for n in range(6)], [1, 2, 4, 8, 10, 10])
+
+    def test_split_job_url(self):
+        self.assertEqual(split_job_url("http://h/job/f/job/my%20job/"), ("http://h/job/f/", "my job"))
+        self.assertEqual(split_job_url("http://h/job/a"), ("http://h/", "a"))
+        self.assertEqual(split_job_url("http://h/other"), (None, "http://h/other"))
+
+class TestBuildWaiter(JenkinsTestCase):
+    def get_intervals(self, waiter, build, checks):
+        waiter.watch(build)
+        watch = waiter._watches[0]
+        intervals = []
+        for _ in range(checks):
+            watch.due = 0
+            waiter.check()
+            intervals.append(round(watch.due - time.time()))
+        return intervals
+
+    def test_backs_off_without_estimate(self):
+        self.server.add_job("foo", [build_data("foo", 1, building=True, estimatedDuration=-1)])
+        jenkins = self.get_jenkins()
+        build = jenkins.get_job("foo").get_build(1)
+        waiter = BuildWaiter(jenkins, min_interval=1, max_interval=10)
+        self.assertEqual(self.get_intervals(waiter, build, 5), [2, 4, 8, 10, 10])
+
+    def test_backs_off_when_polled_alone(self):
+        self.server.add_job("foo", [build_data("foo", 1, building=True, estimatedDuration=-1),
+                                    build_data("foo", 2, building=True)])
+        jenkins = self.get_jenkins()
+        build = jenkins.get_job("foo").get_build(1)
+        waiter = BuildWaiter(jenkins, min_interval=1, max_interval=10, batch_builds=1)
+        self.server.reset()
+        self.assertEqual(self.get_intervals(waiter, build, 5), [2, 4, 8, 10, 10])
+        self.assertEqual(len([p for p in self.server.get_paths() if p.startswith("/job/foo/1/")]), 5)
+
+    def test_finishes_watched_builds(self):
+        self.server.add_job("foo", [build_data("foo", 1, building=True)])
+        jenkins = self.get_jenkins()
+        build = jenkins.get_job("foo").get_build(1)
+        waiter = BuildWaiter(jenkins, min_interval=0.01, max_interval=0.05)
+        future = waiter.watch(build)
+        self.server.objects["/job/foo/"]["allBuilds"][0]["building"] = False
+        self.server.objects["/job/foo/"]["allBuilds"][0]["result"] = "FAILURE"
+        waiter.wait(timeout=5)
+        self.assertTrue(future.result() is build)
+        self.assertEqual(build.get_status(), "FAILURE")
+
+    def add_folder_job(self, folder, name):
+        path = "%s/job/%s" % (folder, name)
+        job = self.server.add_job(path, [build_data(path, 1, building=True)])
+        job["name"] = name
+        self.server.objects["/"]["jobs"].pop()
+        folder_data = self.server.objects.setdefault("/job/%s/" % folder, {
+            "name": folder, "url": "BASE/job/%s/" % folder, "jobs": []})
+        folder_data["jobs"].append(job)
+
+    def test_jobs_in_folders(self):
+        # Two jobs of a folder, and top level jobs, one of them with the name of a job of the folder
+        self.add_folder_job("f", "a")
+        self.add_folder_job("f", "b")
+        for name in ("a", "c"):
+            builds = self.server.add_job(name, [build_data(name, 1, building=True)])["builds"]
+            # Served with the job list of the root when asked for
+            self.server.objects["/"]["jobs"][-1]["builds"] = builds
+        jenkins = self.get_jenkins()
+        builds = [Job("%s/job/f/job/%s/" % (self.server.url, name), "f/%s" % name, jenkins).get_build(1)
+                  for name in ("a", "b")]
+        builds += [jenkins.get_job(name).get_build(1) for name in ("a", "c")]
+        waiter = BuildWaiter(jenkins, min_interval=0.01, max_interval=0.05)
+        futures = [waiter.watch(build) for build in builds]
+        for path in ("/job/f/job/a/1/", "/job/c/1/"):
+            self.server.objects[path].update(building=False, result="FAILURE")
+        self.server.reset()
+        for watch in waiter._watches:
+            watch.due = 0
+        waiter.check()
+        self.assertEqual([f.done() for f in futures], [True, False, False, True])
+        self.assertEqual([b.get_status() for b in (builds[0], builds[3])], ["FAILURE", "FAILURE"])
+        # The folder and the root
+        self.assertEqual(sorted(p.split("?")[0] for p in self.server.get_paths()), ["/api/json/", "/job/f/api/json/"])
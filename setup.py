@@ -28,6 +28,7 @@ setup(name=PROJECT_NAME.lower(),
       zip_safe=True,
       include_package_data=False,
       install_requires=['beautifulsoup4', 'lxml'],
+      extras_require={'streaming': ['ijson']},
       entry_points=GLOBAL_ENTRY_POINTS,
       url=PROJECT_URL,
       description=SHORT_DESCRIPTION,